@@ -3,8 +3,9 @@
 from langchain_core.prompts import PromptTemplate
 from langchain_classic.chains.llm import LLMChain
 from langchain_classic.chains.sequential import SequentialChain
-from Models.groq import llm
+from Models.registry import get_model
 name_prompt=PromptTemplate(input_variables=["country","gender"],template="suggest a name for a baby from country {country} and gender {gender}")
+llm = get_model("groq")
 name_chain=LLMChain(llm=llm,prompt=name_prompt,output_key="name")
 
 job_prompt=PromptTemplate(input_variables=["name","country","gender"],template="suggest a job for this baby with name {name} and from country {country} and gender {gender} and also provide the reason")
@@ -26,7 +27,7 @@ print("Job Suggestion:", result["job_reason"])
 # from langchain_core.output_parsers import StrOutputParser,PydanticOutputParser
 # from langchain_core.runnables import RunnableMap
 # from pydantic import BaseModel
-# from Models.groq import llm
+# from Models.registry import get_model
 # name_prompt=PromptTemplate.from_template("suggest a name for a baby from country {country} and gender {gender}")
 # job_prompt=PromptTemplate.from_template("suggest a job for this baby with name {name} and from country {country} and gender {gender} and also provide the reason")
 # parser=StrOutputParser()
@@ -65,7 +66,7 @@ print("Job Suggestion:", result["job_reason"])
 # from langchain_core.prompts import PromptTemplate
 # from langchain_core.output_parsers import PydanticOutputParser
 # from pydantic import BaseModel
-# from Models.groq import llm
+# from Models.registry import get_model
 # class Output(BaseModel):
 #     name: str
 #     job: str
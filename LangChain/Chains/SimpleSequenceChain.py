@@ -1,4 +1,4 @@
-from Models.groq import llm
+from Models.registry import get_model
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
@@ -13,6 +13,7 @@ job_prompt = PromptTemplate.from_template(
 )
 
 output_parser=StrOutputParser()
+llm = get_model("groq")
 chain=name_prompt|llm|output_parser|job_prompt|llm|output_parser
 country = input("Country: ").strip().lower()
 gender_input = int(input("Gender (1=Male, 2=Female): ").strip())
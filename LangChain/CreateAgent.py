@@ -1,7 +1,4 @@
-# from Models.flash import llm
-# from Models.local_llm import llm
-# from Mode.groq import llm
-from Models.groq import llm
+from Models.registry import get_model
 from langchain.agents import create_agent
 from langchain.tools import tool
 @tool
@@ -29,7 +26,8 @@ def find_numeric_value(a:int,b:int):
     """
     print("tool invoked")
     return a*b
-agent=create_agent(llm,tools=[find_value,find_numeric_value],system_prompt=system_prompt)
+# or get_model("flash") / get_model("local")
+agent=create_agent(get_model("groq"),tools=[find_value,find_numeric_value],system_prompt=system_prompt)
 
 question = "print the value of 5 and 5"
 for step in agent.stream({"messages": question},stream_mode="values"):
@@ -0,0 +1,192 @@
+import json
+import re
+import threading
+from collections import Counter, deque
+from typing import Optional
+
+# A SCAN only stops early at LIMIT if every row it reads is returned: no
+# aggregate, grouping/DISTINCT or WHERE filter in the query
+AGGREGATE = re.compile(r"(?i)\b(count|sum|avg|min|max|total|group_concat|string_agg)\s*\(|\bgroup\s+by\b|\bdistinct\b|\bhaving\b")
+WHERE = re.compile(r"(?i)\bwhere\b")
+
+# Plan nodes that stream rows and stop as soon as LIMIT is satisfied
+STREAMING_PG_NODES = {"Limit", "Result", "Subquery Scan", "Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+
+class CostGate:
+    """
+    Runs EXPLAIN before a query and blocks the expensive ones.
+
+    SQLite: EXPLAIN QUERY PLAN; every SCAN of a table with more than
+    max_scan_rows rows is flagged unless it is a lone scan that returns the
+    rows it reads (no aggregate, WHERE filter or sort), so the LIMIT cuts it
+    short. Table sizes come from sqlite_stat1 or max(rowid); a table whose
+    size can't be estimated cheaply counts as too large. The estimate for
+    nested loops is the product of the scanned tables' sizes.
+
+    Postgres: EXPLAIN (FORMAT JSON); Seq Scans over large relations below a
+    Sort/Aggregate/Join node, the largest per-node row estimate and the
+    total cost are checked.
+
+    Every reason comes with a fixed code (full_scan, nested_scan, large_step,
+    high_cost); metrics() counts blocked queries per code.
+
+    Args:
+        max_scan_rows: Largest table a blocking full scan may touch
+        max_estimated_rows: Largest row estimate for any plan step
+        max_cost: Largest Postgres total cost
+    """
+
+    def __init__(self, max_scan_rows: int = 100_000, max_estimated_rows: int = 1_000_000,
+                 max_cost: float = 1_000_000):
+        self.max_scan_rows = max_scan_rows
+        self.max_estimated_rows = max_estimated_rows
+        self.max_cost = max_cost
+        self._table_rows = {}
+        self.lock = threading.Lock()
+        self.stats = {"checked": 0, "blocked": 0, "explain_errors": 0, "reasons": Counter()}
+        self.blocked = deque(maxlen=50)  # recent blocked queries with their reasons
+
+    # SQLite
+
+    def _sqlite_table_rows(self, conn, table: str) -> Optional[int]:
+        """Row estimate without scanning: ANALYZE stats, else max(rowid) (a b-tree seek); None if unknown."""
+        if table not in self._table_rows:
+            rows = None
+            try:
+                stat = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? ORDER BY idx IS NOT NULL", (table,)).fetchone()
+                if stat:
+                    rows = int(stat[0].split()[0])
+            except Exception:
+                pass  # no ANALYZE data
+            if rows is None:
+                try:
+                    rows = conn.execute(f'SELECT max(rowid) FROM "{table}"').fetchone()[0] or 0
+                except Exception:
+                    pass  # WITHOUT ROWID table or view: unknown
+            self._table_rows[table] = rows
+        return self._table_rows[table]
+
+    def _explain_sqlite(self, conn, sql: str) -> dict:
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+        # Aliases: FROM/JOIN <table> [AS] <alias>
+        aliases = {
+            alias: table.strip('"')
+            for table, alias in re.findall(r'(?i)\b(?:from|join)\s+("?\w+"?)\s+(?:as\s+)?(\w+)', sql)
+        }
+
+        scans, loops = [], 0
+        for detail in plan:
+            match = re.match(r"(SCAN|SEARCH) (?:TABLE )?(\S+)(?: AS (\S+))?", detail)
+            if not match:
+                continue
+            loops += 1
+            name = match.group(2)
+            table = name if name in tables else aliases.get(name, name)
+            if match.group(1) == "SCAN" and table in tables:
+                scans.append((table, self._sqlite_table_rows(conn, table)))
+
+        streaming = (loops == 1 and not any("TEMP B-TREE" in d for d in plan)
+                     and not AGGREGATE.search(sql) and not WHERE.search(sql))
+        estimated = 1
+        for _, rows in scans:
+            # Unknown size fails closed
+            estimated *= max(rows if rows is not None else self.max_scan_rows + 1, 1)
+
+        reasons = []
+        if not streaming:
+            for table, rows in scans:
+                if rows is None:
+                    reasons.append(("full_scan", f"full scan of {table} (size unknown)"))
+                elif rows > self.max_scan_rows:
+                    reasons.append(("full_scan", f"full scan of {table} ({rows} rows)"))
+            if len(scans) > 1 and estimated > self.max_estimated_rows:
+                reasons.append(("nested_scan", f"nested scans over ~{estimated} row combinations"))
+        return {"plan": plan, "estimated_rows": estimated if scans else 0, "reasons": reasons}
+
+    # Postgres
+
+    def _pg_table_rows(self, conn, table: str) -> int:
+        if table not in self._table_rows:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", (table,))
+                row = cursor.fetchone()
+            self._table_rows[table] = max(int(row[0]), 0) if row else 0
+        return self._table_rows[table]
+
+    def _explain_postgres(self, conn, sql: str) -> dict:
+        with conn.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            raw = cursor.fetchone()[0]
+        root = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+
+        reasons, plan, max_rows = [], [], 0
+
+        def walk(node, streaming):
+            nonlocal max_rows
+            node_type = node["Node Type"]
+            streaming = streaming and node_type in STREAMING_PG_NODES
+            max_rows = max(max_rows, node.get("Plan Rows", 0))
+            plan.append(f"{node_type} {node.get('Relation Name', '')}".strip())
+            if node_type == "Seq Scan" and not streaming:
+                rows = self._pg_table_rows(conn, node["Relation Name"])
+                if rows > self.max_scan_rows:
+                    reasons.append(("full_scan", f"full scan of {node['Relation Name']} ({rows} rows)"))
+            for child in node.get("Plans", []):
+                walk(child, streaming)
+
+        walk(root, True)
+        if max_rows > self.max_estimated_rows:
+            reasons.append(("large_step", f"a plan step estimates {max_rows} rows"))
+        if root.get("Total Cost", 0) > self.max_cost:
+            reasons.append(("high_cost", f"estimated cost {root['Total Cost']:.0f}"))
+        return {"plan": plan, "estimated_rows": max_rows, "reasons": reasons}
+
+    # Entry point
+
+    def check(self, conn, dialect: str, sql: str) -> Optional[dict]:
+        """
+        EXPLAIN the query on a DB-API connection.
+
+        Returns:
+            None if the query may run, otherwise the structured refusal
+            for the agent.
+        """
+        try:
+            if dialect == "sqlite":
+                verdict = self._explain_sqlite(conn, sql)
+            elif dialect == "postgresql":
+                verdict = self._explain_postgres(conn, sql)
+            else:
+                return None
+        except Exception as e:
+            # Let the real execution report syntax errors and the like
+            with self.lock:
+                self.stats["explain_errors"] += 1
+            print(f"⚠️ EXPLAIN failed: {e}")
+            return None
+
+        with self.lock:
+            self.stats["checked"] += 1
+            if not verdict["reasons"]:
+                return None
+            self.stats["blocked"] += 1
+            codes = [code for code, _ in verdict["reasons"]]
+            reasons = [text for _, text in verdict["reasons"]]
+            self.stats["reasons"].update(codes)  # counts per reason code, not per message
+            self.blocked.append({"sql": sql, "codes": codes, "reasons": reasons})
+
+        return {
+            "status": "too_expensive",
+            "codes": codes,
+            "reasons": reasons,
+            "estimated_rows": verdict["estimated_rows"],
+            "plan": verdict["plan"][:10],
+            "hint": "Refine the query: filter on indexed/key columns, join on keys, "
+                    "avoid cross joins and sorting/grouping whole large tables.",
+        }
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {**self.stats, "reasons": dict(self.stats["reasons"]), "recent_blocked": list(self.blocked)}
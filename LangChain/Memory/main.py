@@ -1,28 +1,59 @@
 # sql_related imports
 from langchain_community.utilities import SQLDatabase
 from dataclasses import dataclass
-from Models.groq import llm
+from pathlib import Path
+from Models.registry import get_model
 # langchain related imports
 from langchain.tools import tool
 from langchain.agents import create_agent
+from langchain.agents.middleware import dynamic_prompt, ModelRequest
+from LangChain.Memory.schema_cache import LazyEmbeddings, SchemaCache
+from LangChain.Memory.sql_executor import SQLExecutor
+from LangChain.Memory.cost_gate import CostGate
+from LangChain.Memory.sql_templates import TemplateCache
+import importlib.util
+import json
 import os
+import sys
 from dotenv import load_dotenv
 load_dotenv()
-db_url=os.getenv("POSTGRES_URL")
-db=SQLDatabase.from_uri(db_url)
+# Falls back to the local Chinook sample database
+db_url=os.getenv("POSTGRES_URL") or f"sqlite:///{Path(__file__).parents[2] / 'Chinook.db'}"
+# Lazy reflection: only column lists are read at startup; DDL and sample rows when the schema cache is (re)built
+db=SQLDatabase.from_uri(db_url, lazy_table_reflection=True)
 
 @dataclass
 class RuntimeContext:
     db:SQLDatabase
 
-schema_info = db.get_table_info()
+# Optional semantic table matching (keyword matching only without it);
+# the model is only loaded when something is first embedded
+if importlib.util.find_spec("langchain_huggingface") is not None:
+    schema_embeddings = LazyEmbeddings("all-mpnet-base-v2")
+else:
+    schema_embeddings = None
 
-print(schema_info)
+# Built once, persisted under LangChain/Memory/.schema_cache/
+schema_cache = SchemaCache(db, embeddings=schema_embeddings)
+
+# Agent queries run on their own read-only pool: time limit, row cap, result cache.
+# Every query is EXPLAINed first; expensive plans come back as a refusal to refine.
+cost_gate = CostGate(
+    max_scan_rows=int(os.getenv("SQL_MAX_SCAN_ROWS", "100000")),
+    max_estimated_rows=int(os.getenv("SQL_MAX_ESTIMATED_ROWS", "1000000")),
+)
+sql_executor = SQLExecutor(
+    db_url,
+    timeout_s=float(os.getenv("SQL_TIMEOUT_S", "5")),
+    max_rows=int(os.getenv("SQL_MAX_ROWS", "20")),
+    cost_gate=cost_gate,
+)
 
 # ===============================
 # System Prompt
 # ===============================
-SYSTEM_PROMPT = f"""
+# Only the tables relevant to the question go into the prompt
+SYSTEM_PROMPT_TEMPLATE = """
 You are a careful SQLite analyst.
 
 Database schema (authoritative — do NOT guess anything not listed):
@@ -36,34 +67,83 @@ Rules:
 - Use JOINs where required.
 - Read-only queries only.
 - Limit to 5 rows unless explicitly asked.
+- Results are paged; pass page=1, 2, ... only if you really need more rows.
 - Prefer explicit column lists.
 - If a query fails, fix it USING THE SCHEMA ABOVE.
+- If a query is refused as too expensive, narrow it as the hint says; do not resend it unchanged.
 """
 
-def execute_query(db):
+def _latest_question(messages) -> str:
+    for message in reversed(messages):
+        if getattr(message, "type", None) == "human":
+            return message.content if isinstance(message.content, str) else str(message.content)
+    return ""
+
+@dynamic_prompt
+def schema_prompt(request: ModelRequest) -> str:
+    question = _latest_question(request.state["messages"])
+    return SYSTEM_PROMPT_TEMPLATE.format(schema_info=schema_cache.schema_for(question))
+
+def execute_query(executor: SQLExecutor):
     @tool
-    def perform_query(query:str):
+    def perform_query(query:str, page:int=0):
         """
-        This is will peform db operations 
+        This is will peform read-only db operations
         
-        :param query: Description
+        :param query: ONE SELECT query
         :type query: str
+        :param page: Result page, 0 for the first rows
+        :type page: int
         """
-        try:
-            return db.run(query)
-        except Exception as e:
-            return f"Error occured ${e}"
+        return executor.run_for_agent(query, page)
     
     return perform_query
-execute=execute_query(db)
-agent=create_agent(llm,tools=[execute],system_prompt=SYSTEM_PROMPT,context_schema=RuntimeContext)
+execute=execute_query(sql_executor)
+
+# Built on the first question the templates can't answer, so template hits never load the LLM
+_agent = None
+
+def get_agent():
+    global _agent
+    if _agent is None:
+        _agent = create_agent(get_model("groq"), tools=[execute], middleware=[schema_prompt], context_schema=RuntimeContext)
+    return _agent
+
+# Recurring question shapes are answered from validated SQL templates, no LLM turns
+template_cache = TemplateCache(sql_executor, embeddings=schema_embeddings)
+
+def ask_agent(question: str, verbose: bool = False) -> str:
+    """Run the agent and return its final answer text."""
+    last = None
+    for step in get_agent().stream(
+        {"messages": [{"role": "user", "content": question}]},
+        stream_mode="values",
+        context=RuntimeContext(db=db),
+    ):
+        last = step["messages"][-1]
+        if verbose:
+            last.pretty_print()
+    return last.content if isinstance(last.content, str) else str(last.content)
 
+def ask(question: str) -> str:
+    answer = template_cache.try_answer(question)
+    if answer is not None:
+        print(answer)
+        return answer
+    return ask_agent(question, verbose=True)
 
-question = "This is Frank Harris, What was the total on my last invoice?"
+# python -m LangChain.Memory.main --validate-templates
+# checks every template against the agent and marks the ones that agree as validated
+if "--validate-templates" in sys.argv[1:]:
+    print(json.dumps(template_cache.validate(ask_agent), indent=2))
+else:
+    unchecked = template_cache.unchecked()
+    if unchecked:
+        # Validation costs an agent run per example, so it only happens on request
+        print(f"⚠️ {len(unchecked)} SQL templates not validated yet (run with --validate-templates); the agent answers those questions")
+    question = "This is Frank Harris, What was the total on my last invoice?"
+    ask(question)
 
-for step in agent.stream(
-    {"messages": [{"role": "user", "content": question}]},
-    stream_mode="values",
-    context=RuntimeContext(db=db),
-):
-    step["messages"][-1].pretty_print()
+print("Templates:", template_cache.metrics())
+print("SQL executor stats:", sql_executor.stats)
+print("Cost gate:", cost_gate.metrics())
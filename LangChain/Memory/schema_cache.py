@@ -0,0 +1,187 @@
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_community.utilities import SQLDatabase
+
+CACHE_DIR = Path(__file__).parent / ".schema_cache"
+
+
+def _words(text: str) -> set:
+    """Lowercase word set; splits CamelCase/snake_case and drops a plural 's'."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    words = set()
+    for word in re.findall(r"[a-zA-Z]+", text.lower()):
+        words.add(word)
+        if len(word) > 3 and word.endswith("s"):
+            words.add(word[:-1])
+    return words
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class LazyEmbeddings:
+    """
+    HuggingFaceEmbeddings that loads the model on the first embed call, so
+    importing the agent doesn't pay for it (or at all when the cache already
+    holds the table vectors and no question is asked).
+
+    Args:
+        model_name: sentence-transformers model
+    """
+
+    def __init__(self, model_name: str = "all-mpnet-base-v2"):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+                self._model = HuggingFaceEmbeddings(model_name=self.model_name)
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._load().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._load().embed_query(text)
+
+
+class SchemaCache:
+    """
+    Per-table DDL (with sample rows), columns and foreign keys, built once
+    and persisted to disk. select_tables() picks the tables relevant to a
+    question so the prompt carries only their DDL.
+
+    The cache file is rebuilt when a table or a column was added, dropped
+    or renamed; checking that only reads the column lists, not the DDL and
+    sample rows.
+
+    Args:
+        db: The database (use lazy_table_reflection=True so nothing is reflected up front)
+        embeddings: Optional LangChain Embeddings for semantic table matching
+        refresh: Rebuild even if a cache file exists
+        max_selections: Questions whose schema text is kept in memory
+    """
+
+    def __init__(self, db: SQLDatabase, embeddings=None, refresh: bool = False, max_selections: int = 256):
+        self.db = db
+        self.embeddings = embeddings
+        # One file per database (URL without password)
+        url = db._engine.url.render_as_string(hide_password=True)
+        self.path = CACHE_DIR / f"{hashlib.sha256(url.encode()).hexdigest()[:16]}.json"
+        self.tables = {}
+        # (question, max_tables) -> schema text, LRU; the agent asks once per turn
+        self._selections = OrderedDict()
+        self.max_selections = max_selections
+        self.lock = threading.Lock()
+        if not refresh and self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.tables = json.load(f)["tables"]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Unreadable schema cache {self.path}, rebuilding: {e}")
+                self.tables = {}
+        columns = self._read_columns()
+        if {name: table["columns"] for name, table in self.tables.items()} != columns:
+            self.build(columns)
+        if embeddings is not None and any("embedding" not in t for t in self.tables.values()):
+            self._embed_tables()
+
+    def _read_columns(self) -> dict:
+        """Table -> column names, straight from the catalog."""
+        inspector = self.db._inspector
+        return {
+            table: [c["name"] for c in inspector.get_columns(table, schema=self.db._schema)]
+            for table in self.db.get_usable_table_names()
+        }
+
+    def build(self, columns: Optional[dict] = None):
+        """Read every table's DDL, columns and foreign keys (the slow part, done once)."""
+        inspector = self.db._inspector
+        columns = columns or self._read_columns()
+        self.tables = {}
+        with self.lock:
+            self._selections.clear()
+        for table in columns:
+            foreign_keys = sorted({
+                fk["referred_table"] for fk in inspector.get_foreign_keys(table, schema=self.db._schema)
+                if fk.get("referred_table")
+            })
+            self.tables[table] = {
+                "ddl": self.db.get_table_info([table]),
+                "columns": columns[table],
+                "foreign_keys": foreign_keys,
+            }
+        if self.embeddings is not None:
+            self._embed_tables()
+        else:
+            self._save()
+        print(f"🗂️ Schema cache: {len(self.tables)} tables -> {self.path}")
+
+    def _embed_tables(self):
+        names = list(self.tables)
+        texts = [f"{name}: {', '.join(self.tables[name]['columns'])}" for name in names]
+        for name, vector in zip(names, self.embeddings.embed_documents(texts)):
+            self.tables[name]["embedding"] = vector
+        self._save()
+
+    def _save(self):
+        CACHE_DIR.mkdir(exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"tables": self.tables}, f)
+
+    def select_tables(self, question: str, max_tables: int = 4, min_score: float = 0.25) -> List[str]:
+        """
+        Tables relevant to a question, plus the tables they reference.
+
+        Score = keyword hits on the table name (x2) and column names, plus
+        cosine similarity to the table description when embeddings are set.
+        """
+        question_words = _words(question)
+        question_vector = self.embeddings.embed_query(question) if self.embeddings is not None else None
+
+        scored = []
+        for name, table in self.tables.items():
+            score = 2 * len(question_words & _words(name))
+            score += len(question_words & set().union(*(_words(c) for c in table["columns"]))) * 0.5
+            if question_vector is not None and "embedding" in table:
+                score += _cosine(question_vector, table["embedding"])
+            scored.append((score, name))
+        scored.sort(reverse=True)
+
+        selected = [name for score, name in scored[:max_tables] if score >= min_score]
+        if not selected:
+            return list(self.tables)  # nothing matched - fall back to the full schema
+
+        # Foreign-key targets are needed for the JOINs
+        for name in list(selected):
+            for referred in self.tables[name]["foreign_keys"]:
+                if referred not in selected and referred in self.tables:
+                    selected.append(referred)
+        return selected
+
+    def schema_for(self, question: str, max_tables: int = 4) -> str:
+        """DDL of the selected tables, ready for the system prompt."""
+        key = (question, max_tables)
+        with self.lock:
+            if key in self._selections:
+                self._selections.move_to_end(key)
+                return self._selections[key]
+        schema = "\n\n".join(self.tables[name]["ddl"] for name in self.select_tables(question, max_tables))
+        with self.lock:
+            self._selections[key] = schema
+            while len(self._selections) > self.max_selections:
+                self._selections.popitem(last=False)
+        return schema
@@ -0,0 +1,208 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from LangChain.Memory.cost_gate import CostGate
+
+
+def strip_sql(query: str) -> str:
+    """Drop comments, surrounding whitespace and trailing semicolons."""
+    query = re.sub(r"--[^\n]*", " ", query)
+    query = re.sub(r"/\*.*?\*/", " ", query, flags=re.S)
+    return query.strip().rstrip(";").strip()
+
+
+def normalize_sql(query: str) -> str:
+    """Cache key: collapsed whitespace, lowercase outside string literals and quoted identifiers."""
+    parts = re.split(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")", strip_sql(query))
+    return "".join(p if p[:1] in ("'", '"') else re.sub(r"\s+", " ", p.lower()) for p in parts)
+
+
+class QueryRejected(Exception):
+    """The query was not run (not read-only, too expensive, ...)."""
+
+    def __init__(self, message: str, details: dict = None):
+        super().__init__(message)
+        self.details = details
+
+
+class SQLExecutor:
+    """
+    Read-only, pooled, time-limited SQL execution for agent tools.
+
+    - own connection pool; read-only at the connection level (SQLite mode=ro,
+      Postgres default_transaction_read_only) plus a SELECT/WITH-only check
+    - statement timeout (Postgres statement_timeout, SQLite progress handler)
+    - LIMIT injected so at most max_rows rows come back per page
+    - results cached by normalized SQL + page for cache_ttl seconds
+    - output truncated to max_chars so tool messages stay small
+    - optional CostGate: EXPLAIN first, refuse expensive plans
+
+    Args:
+        url: SQLAlchemy URL of the database
+        timeout_s: Per-statement time limit
+        max_rows: Rows per page
+        max_chars: Maximum characters of the rendered result
+        cache_ttl: Seconds a cached result stays valid
+        cache_size: Maximum cached results
+        pool_size: Pooled connections
+        cost_gate: CostGate to EXPLAIN queries with before running them
+    """
+
+    def __init__(self, url: str, timeout_s: float = 5, max_rows: int = 20, max_chars: int = 4000,
+                 cache_ttl: float = 300, cache_size: int = 256, pool_size: int = 5,
+                 cost_gate: CostGate = None):
+        self.url = make_url(str(url))
+        self.dialect = self.url.get_backend_name()
+        self.timeout_s = timeout_s
+        self.max_rows = max_rows
+        self.max_chars = max_chars
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.cost_gate = cost_gate
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"executed": 0, "cache_hits": 0, "rejected": 0, "timeouts": 0, "truncated": 0}
+        self.engine = self._create_engine(pool_size)
+
+    def _create_engine(self, pool_size: int):
+        if self.dialect == "sqlite":
+            path = self.url.database
+            # Read-only at the file level; one pool shared across agent threads
+            return create_engine(
+                "sqlite://",
+                creator=lambda: sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False),
+                poolclass=QueuePool, pool_size=pool_size, max_overflow=0,
+            )
+
+        engine = create_engine(self.url, pool_size=pool_size, max_overflow=0, pool_pre_ping=True)
+        if self.dialect == "postgresql":
+            timeout_ms = int(self.timeout_s * 1000)
+
+            @event.listens_for(engine, "connect")
+            def _read_only(dbapi_connection, connection_record):
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute("SET default_transaction_read_only = on")
+                    cursor.execute(f"SET statement_timeout = {timeout_ms}")
+                dbapi_connection.commit()
+        return engine
+
+    # Query shaping
+
+    def check_read_only(self, query: str) -> str:
+        sql = strip_sql(query)
+        if not re.match(r"(?is)^\s*(select|with)\b", sql):
+            raise QueryRejected("Only SELECT (or WITH ... SELECT) queries are allowed.")
+        if ";" in re.sub(r"'(?:[^']|'')*'", "", sql):
+            raise QueryRejected("Send ONE statement per call.")
+        return sql
+
+    def paged_sql(self, sql: str, page: int) -> str:
+        """Append LIMIT/OFFSET, or wrap the query if it already has its own LIMIT."""
+        limit = self.max_rows + 1  # one extra row tells us there is another page
+        offset = page * self.max_rows
+        if re.search(r"(?is)\blimit\s+\d+(\s*(,|offset)\s*\d+)?\s*$", sql):
+            return f"SELECT * FROM ({sql}) AS _capped LIMIT {limit} OFFSET {offset}"
+        return f"{sql}\nLIMIT {limit} OFFSET {offset}"
+
+    # Execution
+
+    def _execute(self, sql: str):
+        with self.engine.connect() as conn:
+            raw = conn.connection.dbapi_connection
+            if self.dialect == "sqlite":
+                deadline = time.monotonic() + self.timeout_s
+                raw.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+            try:
+                if self.cost_gate is not None:
+                    refusal = self.cost_gate.check(raw, self.dialect, sql)
+                    if refusal is not None:
+                        raise QueryRejected("Query is too expensive, refine it.", details=refusal)
+                result = conn.execute(text(sql))
+                columns = list(result.keys())
+                rows = [tuple(row) for row in result.fetchall()]
+            finally:
+                if self.dialect == "sqlite":
+                    raw.set_progress_handler(None, 0)
+                conn.rollback()
+        return columns, rows
+
+    def run(self, query: str, page: int = 0) -> dict:
+        """
+        Run a query and return {"columns", "rows", "page", "has_more"}.
+
+        Raises:
+            QueryRejected: not read-only / multiple statements / too expensive / timed out
+            Exception: other database errors pass through
+        """
+        try:
+            sql = self.check_read_only(query)
+        except QueryRejected:
+            self.stats["rejected"] += 1
+            raise
+
+        key = (normalize_sql(sql), page)
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                self.cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return cached[1]
+
+        try:
+            columns, rows = self._execute(self.paged_sql(sql, page))
+        except QueryRejected:
+            self.stats["rejected"] += 1
+            raise
+        except Exception as e:
+            if "interrupted" in str(e) or "statement timeout" in str(e):
+                self.stats["timeouts"] += 1
+                raise QueryRejected(f"Query exceeded the {self.timeout_s}s time limit. Narrow it down (filters, fewer joins).")
+            raise
+        self.stats["executed"] += 1
+
+        result = {
+            "columns": columns,
+            "rows": rows[:self.max_rows],
+            "page": page,
+            "has_more": len(rows) > self.max_rows,
+        }
+        with self.lock:
+            self.cache[key] = (time.monotonic() + self.cache_ttl, result)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def render(self, result: dict) -> str:
+        """Compact text for the agent, cut at max_chars."""
+        lines = [f"columns: {result['columns']}"]
+        for row in result["rows"]:
+            lines.append(str(tuple(v[:200] + "..." if isinstance(v, str) and len(v) > 200 else v for v in row)))
+        out = "\n".join(lines)
+        if len(out) > self.max_chars:
+            out = out[:self.max_chars] + "\n... (output truncated)"
+            self.stats["truncated"] += 1
+        if result["has_more"]:
+            out += f"\n(more rows available: call again with page={result['page'] + 1}, or refine the query)"
+        elif not result["rows"]:
+            out += "\n(no rows)"
+        return out
+
+    def run_for_agent(self, query: str, page: int = 0) -> str:
+        """run() + render(), with errors turned into messages the agent can act on."""
+        try:
+            return self.render(self.run(query, page))
+        except QueryRejected as e:
+            if e.details:
+                return json.dumps(e.details)
+            return f"Query rejected: {e}"
+        except Exception as e:
+            return f"Error occured ${e}"
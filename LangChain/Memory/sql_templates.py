@@ -0,0 +1,205 @@
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from LangChain.Memory.schema_cache import _cosine, _words
+from LangChain.Memory.sql_executor import SQLExecutor
+
+TEMPLATES_PATH = Path(__file__).parent / "sql_templates.json"
+
+
+def _literal(value: str, kind: str) -> str:
+    """Slot value as a SQL literal; ints are validated, strings quoted."""
+    if kind == "int":
+        return str(int(value))
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _mentions(text: str, numbers: List[float], value) -> bool:
+    """Numbers compare by value (8.91 == "$8.910"), text as a whole word/phrase."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return any(abs(n - value) < 0.005 for n in numbers)
+    return re.search(r"(?<!\w)" + re.escape(str(value).lower()) + r"(?!\w)", text) is not None
+
+
+def answers_agree(result: dict, agent_answer: str, columns: Optional[List[str]] = None) -> bool:
+    """
+    The answer columns of the template's first rows all show up in the agent's answer.
+
+    Args:
+        result: Executor result of the template SQL
+        agent_answer: The agent's final answer text
+        columns: Columns that carry the answer (default: all); ids and dates
+            a template selects for its own rendering are rarely repeated in prose
+    """
+    text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", agent_answer.lower())  # 1,234.50 -> 1234.50
+    numbers = [float(n) for n in re.findall(r"\d+(?:\.\d+)?", text)]
+    rows = [dict(zip(result["columns"], row)) for row in result["rows"][:5]]
+    return bool(rows) and all(
+        _mentions(text, numbers, value)
+        for row in rows for column, value in row.items()
+        if value is not None and (columns is None or column in columns)
+    )
+
+
+class TemplateCache:
+    """
+    Validated question -> parameterized SQL templates.
+
+    A question matches a template when it is similar enough to one of the
+    template's example questions (embeddings, or keyword overlap without
+    them) AND its slot_pattern extracts every slot. A hit runs the SQL
+    directly through the executor, so no LLM turn is spent; anything else
+    goes to the agent.
+
+    Templates only serve traffic once validate() has seen them agree with
+    the agent on their examples, compared on the template's answer_columns.
+    "validated" is null until a template has been checked, false when it
+    disagreed or failed, true when it agreed; unchecked() lists the ones
+    still to validate.
+
+    Args:
+        executor: SQLExecutor the template SQL runs on
+        embeddings: Optional LangChain Embeddings for matching
+        min_similarity: Threshold for cosine (embeddings) or keyword overlap
+        path: Template file
+    """
+
+    def __init__(self, executor: SQLExecutor, embeddings=None, min_similarity: float = None,
+                 path: Path = TEMPLATES_PATH):
+        self.executor = executor
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity if min_similarity is not None else (0.75 if embeddings else 0.4)
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.templates = json.load(f)["templates"]
+        self._vectors = {}  # template id -> example vectors
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "slot_misses": 0, "errors": 0, "checked": 0, "agreed": 0,
+                      "validation_errors": 0}
+
+    def _similarity(self, question: str, template: dict, question_vector=None) -> float:
+        if question_vector is not None:
+            if template["id"] not in self._vectors:
+                self._vectors[template["id"]] = self.embeddings.embed_documents(template["examples"])
+            return max(_cosine(question_vector, v) for v in self._vectors[template["id"]])
+        words = _words(question)
+        best = 0.0
+        for example in template["examples"]:
+            union = words | _words(example)
+            if union:
+                best = max(best, len(words & _words(example)) / len(union))
+        return best
+
+    def match(self, question: str, include_unvalidated: bool = False) -> Optional[tuple]:
+        """(template, sql) for the best matching template with all slots filled, or None."""
+        question_vector = self.embeddings.embed_query(question) if self.embeddings is not None else None
+        candidates = sorted(
+            (
+                (self._similarity(question, t, question_vector), i)
+                for i, t in enumerate(self.templates)
+                if t["validated"] or include_unvalidated
+            ),
+            reverse=True,
+        )
+        for score, i in candidates:
+            if score < self.min_similarity:
+                break
+            template = self.templates[i]
+            found = re.search(template["slot_pattern"], question)
+            if not found:
+                with self.lock:
+                    self.stats["slot_misses"] += 1
+                continue
+            try:
+                slots = {
+                    name: _literal(found.group(name), kind)
+                    for name, kind in template["slots"].items()
+                }
+            except (IndexError, ValueError):
+                continue
+            return template, template["sql"].format(**slots)
+        return None
+
+    def run(self, template: dict, sql: str) -> dict:
+        return self.executor.run(sql)
+
+    def answer(self, template: dict, result: dict) -> str:
+        if template.get("answer") and result["rows"]:
+            return template["answer"].format(**dict(zip(result["columns"], result["rows"][0])))
+        return self.executor.render(result)
+
+    def try_answer(self, question: str) -> Optional[str]:
+        """The template answer, or None when the agent has to handle the question."""
+        matched = self.match(question)
+        if matched is None:
+            with self.lock:
+                self.stats["misses"] += 1
+            return None
+        template, sql = matched
+        try:
+            result = self.run(template, sql)
+        except Exception as e:
+            print(f"⚠️ Template {template['id']} failed, falling back to the agent: {e}")
+            with self.lock:
+                self.stats["errors"] += 1
+            return None
+        with self.lock:
+            self.stats["hits"] += 1
+        print(f"📋 Template hit: {template['id']}")
+        return self.answer(template, result)
+
+    def unchecked(self) -> List[dict]:
+        """Templates validate() has never run."""
+        return [t for t in self.templates if t.get("validated") is None]
+
+    def validate(self, ask_agent: Callable[[str], str], save: bool = True,
+                 templates: Optional[List[dict]] = None) -> dict:
+        """
+        Run every template example through the template AND the agent;
+        templates whose results agree on all examples become validated.
+        A template whose SQL (or the agent) fails is marked not validated.
+
+        Args:
+            ask_agent: question -> the agent's final answer text
+            save: Write the validated flags back to the template file
+            templates: Only these templates (default: all)
+        """
+        report = {}
+        for template in self.templates if templates is None else templates:
+            outcomes = []
+            for example in template["examples"]:
+                matched = self.match(example, include_unvalidated=True)
+                if matched is None or matched[0] is not template:
+                    outcomes.append({"question": example, "matched": False, "agreed": False})
+                    continue
+                try:
+                    result = self.run(template, matched[1])
+                    agreed = answers_agree(result, ask_agent(example), template.get("answer_columns"))
+                except Exception as e:
+                    print(f"⚠️ Template {template['id']} failed on {example!r}: {e}")
+                    with self.lock:
+                        self.stats["validation_errors"] += 1
+                    outcomes.append({"question": example, "matched": True, "agreed": False, "error": str(e)})
+                    continue
+                with self.lock:
+                    self.stats["checked"] += 1
+                    self.stats["agreed"] += agreed
+                outcomes.append({"question": example, "matched": True, "agreed": agreed})
+            template["validated"] = all(o["agreed"] for o in outcomes)
+            report[template["id"]] = {"validated": template["validated"], "examples": outcomes}
+        if save:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"templates": self.templates}, f, indent=2)
+        return report
+
+    def metrics(self) -> dict:
+        with self.lock:
+            asked = self.stats["hits"] + self.stats["misses"] + self.stats["errors"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / asked, 4) if asked else 0.0,
+                "agreement_rate": round(self.stats["agreed"] / self.stats["checked"], 4) if self.stats["checked"] else 0.0,
+            }
@@ -0,0 +1,68 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Repo root, so LangChain.Memory imports resolve when pytest runs from anywhere
+sys.path.insert(0, str(Path(__file__).parents[3]))
+
+# A few Chinook tables and rows: enough for table selection, foreign keys and
+# the invoice templates (the bundled Chinook.db is only a placeholder)
+CHINOOK_SQL = """
+CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name TEXT);
+CREATE TABLE Album (
+    AlbumId INTEGER PRIMARY KEY, Title TEXT NOT NULL,
+    ArtistId INTEGER NOT NULL REFERENCES Artist (ArtistId)
+);
+CREATE TABLE Genre (GenreId INTEGER PRIMARY KEY, Name TEXT);
+CREATE TABLE Track (
+    TrackId INTEGER PRIMARY KEY, Name TEXT NOT NULL,
+    AlbumId INTEGER REFERENCES Album (AlbumId),
+    GenreId INTEGER REFERENCES Genre (GenreId),
+    Milliseconds INTEGER NOT NULL, UnitPrice NUMERIC(10,2) NOT NULL
+);
+CREATE TABLE Customer (
+    CustomerId INTEGER PRIMARY KEY, FirstName TEXT NOT NULL, LastName TEXT NOT NULL,
+    City TEXT, Country TEXT, Email TEXT NOT NULL
+);
+CREATE TABLE Invoice (
+    InvoiceId INTEGER PRIMARY KEY,
+    CustomerId INTEGER NOT NULL REFERENCES Customer (CustomerId),
+    InvoiceDate DATETIME NOT NULL, BillingCountry TEXT, Total NUMERIC(10,2) NOT NULL
+);
+CREATE TABLE InvoiceLine (
+    InvoiceLineId INTEGER PRIMARY KEY,
+    InvoiceId INTEGER NOT NULL REFERENCES Invoice (InvoiceId),
+    TrackId INTEGER NOT NULL REFERENCES Track (TrackId),
+    UnitPrice NUMERIC(10,2) NOT NULL, Quantity INTEGER NOT NULL
+);
+
+INSERT INTO Artist VALUES (1, 'AC/DC'), (2, 'Accept'), (3, 'Aerosmith');
+INSERT INTO Album VALUES (1, 'For Those About To Rock We Salute You', 1), (2, 'Balls to the Wall', 2),
+    (3, 'Restless and Wild', 2), (4, 'Let There Be Rock', 1), (5, 'Big Ones', 3);
+INSERT INTO Genre VALUES (1, 'Rock'), (2, 'Metal');
+INSERT INTO Track VALUES (1, 'For Those About To Rock', 1, 1, 343719, 0.99), (2, 'Balls to the Wall', 2, 2, 342562, 0.99),
+    (3, 'Fast As a Shark', 3, 2, 230619, 0.99), (4, 'Go Down', 4, 1, 331180, 0.99), (5, 'Walk On Water', 5, 1, 295680, 0.99);
+INSERT INTO Customer VALUES (1, 'Luis', 'Goncalves', 'Sao Jose dos Campos', 'Brazil', 'luisg@embraer.com.br'),
+    (2, 'Leonie', 'Kohler', 'Stuttgart', 'Germany', 'leonekohler@surfeu.de'),
+    (16, 'Frank', 'Harris', 'Mountain View', 'USA', 'fharris@google.com');
+INSERT INTO Invoice VALUES (1, 2, '2021-01-01 00:00:00', 'Germany', 1.98), (2, 1, '2021-02-11 00:00:00', 'Brazil', 3.96),
+    (3, 16, '2021-03-04 00:00:00', 'USA', 5.94), (4, 16, '2021-09-16 00:00:00', 'USA', 8.91),
+    (5, 2, '2021-10-02 00:00:00', 'Germany', 1.98);
+INSERT INTO InvoiceLine VALUES (1, 1, 1, 0.99, 2), (2, 2, 2, 0.99, 4), (3, 3, 3, 0.99, 6), (4, 4, 4, 0.99, 9),
+    (5, 5, 5, 0.99, 2);
+"""
+
+
+def make_chinook(path: Path) -> Path:
+    conn = sqlite3.connect(path)
+    conn.executescript(CHINOOK_SQL)
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def chinook_path(tmp_path) -> Path:
+    return make_chinook(tmp_path / "chinook.db")
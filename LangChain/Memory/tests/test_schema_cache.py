@@ -0,0 +1,92 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+utilities = pytest.importorskip("langchain_community.utilities")
+
+from LangChain.Memory import schema_cache as schema_cache_module
+from LangChain.Memory.schema_cache import SchemaCache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_cache_module, "CACHE_DIR", tmp_path / ".schema_cache")
+
+
+def open_db(path):
+    return utilities.SQLDatabase.from_uri(f"sqlite:///{path}", lazy_table_reflection=True)
+
+
+def test_selects_matching_tables_and_their_foreign_keys(chinook_path):
+    cache = SchemaCache(open_db(chinook_path))
+
+    selected = cache.select_tables("What was the total on my last invoice?", max_tables=1)
+
+    assert selected == ["Invoice", "Customer"]
+
+
+def test_column_names_count_towards_the_score(chinook_path):
+    cache = SchemaCache(open_db(chinook_path))
+
+    assert cache.select_tables("Which tracks are longer than 300000 milliseconds?", max_tables=1)[0] == "Track"
+
+
+def test_falls_back_to_every_table_when_nothing_matches(chinook_path):
+    cache = SchemaCache(open_db(chinook_path))
+
+    assert set(cache.select_tables("hello there")) == set(cache.tables)
+
+
+def test_schema_for_only_carries_the_selected_ddl(chinook_path):
+    cache = SchemaCache(open_db(chinook_path))
+
+    schema = cache.schema_for("How many albums does each artist have?", max_tables=2)
+
+    assert "CREATE TABLE" in schema and '"Album"' in schema and '"Artist"' in schema
+    assert '"InvoiceLine"' not in schema
+
+
+def test_loads_from_disk_without_rebuilding(chinook_path, monkeypatch):
+    first = SchemaCache(open_db(chinook_path))
+    assert first.path.exists()
+
+    def fail(self, columns=None):
+        raise AssertionError("rebuilt an up-to-date cache")
+
+    monkeypatch.setattr(SchemaCache, "build", fail)
+    second = SchemaCache(open_db(chinook_path))
+
+    assert second.tables == first.tables
+
+
+def test_rebuilds_when_a_column_changes(chinook_path):
+    SchemaCache(open_db(chinook_path))
+    conn = sqlite3.connect(chinook_path)
+    conn.execute("ALTER TABLE Customer ADD COLUMN Loyalty TEXT")
+    conn.commit()
+    conn.close()
+
+    cache = SchemaCache(open_db(chinook_path))
+
+    assert "Loyalty" in cache.tables["Customer"]["columns"]
+    assert "Loyalty" in cache.tables["Customer"]["ddl"]
+
+
+def test_rebuilds_when_a_table_is_added(chinook_path):
+    SchemaCache(open_db(chinook_path))
+    conn = sqlite3.connect(chinook_path)
+    conn.execute("CREATE TABLE Playlist (PlaylistId INTEGER PRIMARY KEY, Name TEXT)")
+    conn.commit()
+    conn.close()
+
+    assert "Playlist" in SchemaCache(open_db(chinook_path)).tables
+
+
+def test_selection_memo_is_bounded(chinook_path):
+    cache = SchemaCache(open_db(chinook_path), max_selections=2)
+
+    for question in ("invoice totals", "album titles", "track names", "invoice totals"):
+        cache.schema_for(question)
+
+    assert list(cache._selections) == [("track names", 4), ("invoice totals", 4)]
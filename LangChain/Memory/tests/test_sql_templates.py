@@ -0,0 +1,137 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("langchain_community")
+
+from LangChain.Memory.sql_executor import SQLExecutor
+from LangChain.Memory.sql_templates import TEMPLATES_PATH, TemplateCache, answers_agree
+
+LAST_INVOICE_ANSWERS = {
+    "This is Frank Harris, What was the total on my last invoice?": "Your last invoice was $8.91.",
+    "What was the total of the last invoice for Luis Goncalves?": "Luis Goncalves' most recent invoice came to 3.96.",
+    "I am Leonie Kohler, how much was my most recent invoice?": "Your most recent invoice totalled $1.98.",
+}
+
+
+class FailingExecutor:
+    def run(self, sql: str, page: int = 0) -> dict:
+        raise RuntimeError("no such table: Invoice")
+
+
+@pytest.fixture
+def templates_path(tmp_path):
+    return Path(shutil.copy(TEMPLATES_PATH, tmp_path / "sql_templates.json"))
+
+
+@pytest.fixture
+def cache(chinook_path, templates_path):
+    return TemplateCache(SQLExecutor(f"sqlite:///{chinook_path}"), path=templates_path)
+
+
+def template(cache: TemplateCache, template_id: str) -> dict:
+    return next(t for t in cache.templates if t["id"] == template_id)
+
+
+# Slot extraction
+
+def test_string_slots_are_extracted_and_quoted(cache):
+    matched = cache.match("This is Frank Harris, What was the total on my last invoice?", include_unvalidated=True)
+
+    assert matched[0]["id"] == "last_invoice_total"
+    assert "c.FirstName = 'Frank' AND c.LastName = 'Harris'" in matched[1]
+
+
+def test_quotes_in_string_slots_are_escaped(cache):
+    matched = cache.match("This is Frank O'Brien, what was the total on my last invoice?", include_unvalidated=True)
+
+    assert "c.LastName = 'O''Brien'" in matched[1]
+
+
+def test_int_slots_are_extracted(cache):
+    matched = cache.match("Top 3 artists by sales", include_unvalidated=True)
+
+    assert matched[0]["id"] == "top_selling_artists"
+    assert matched[1].endswith("LIMIT 3")
+
+
+def test_missing_slot_is_a_miss(cache):
+    assert cache.match("What was the total on my last invoice?", include_unvalidated=True) is None
+    assert cache.stats["slot_misses"] > 0
+
+
+def test_unvalidated_templates_are_not_served(cache):
+    assert cache.match("Top 3 artists by sales") is None
+    assert cache.try_answer("Top 3 artists by sales") is None
+
+
+# answers_agree
+
+def test_answers_agree_when_every_value_is_in_the_answer():
+    result = {"columns": ["InvoiceDate", "Total"], "rows": [("2021-09-16 00:00:00", 8.91)]}
+
+    assert answers_agree(result, "Your last invoice (2021-09-16 00:00:00) came to $8.91.")
+
+
+def test_answers_disagree_on_a_missing_value():
+    result = {"columns": ["InvoiceDate", "Total"], "rows": [("2021-09-16 00:00:00", 8.91)]}
+
+    assert not answers_agree(result, "Your last invoice (2021-09-16 00:00:00) came to $5.94.")
+
+
+def test_answers_agree_normalizes_floats_case_and_thousands():
+    result = {"columns": ["Name", "Sales"], "rows": [("AC/DC", 1234.5), ("Accept", 12.0)]}
+
+    assert answers_agree(result, "ac/dc sold 1,234.50 and Accept sold 12")
+
+
+def test_answers_agree_only_on_the_answer_columns():
+    result = {"columns": ["InvoiceId", "InvoiceDate", "Total"], "rows": [(4, "2021-09-16 00:00:00", 8.91)]}
+
+    assert answers_agree(result, "Your last invoice was $8.91.", columns=["Total"])
+    assert not answers_agree(result, "Your last invoice was $8.91.")
+
+
+def test_short_numbers_match_whole_numbers_only():
+    result = {"columns": ["Invoices"], "rows": [(1,)]}
+
+    assert not answers_agree(result, "Frank Harris has 12 invoices, the latest from 2021.")
+    assert answers_agree(result, "Frank Harris has 1 invoice.")
+
+
+def test_empty_result_never_agrees():
+    assert not answers_agree({"columns": ["Total"], "rows": []}, "nothing")
+
+
+# validate
+
+def test_validate_marks_agreeing_templates(cache, templates_path):
+    last_invoice = template(cache, "last_invoice_total")
+
+    report = cache.validate(LAST_INVOICE_ANSWERS.__getitem__, templates=[last_invoice])
+
+    assert report["last_invoice_total"]["validated"] is True
+    assert json.loads(templates_path.read_text())["templates"][0]["validated"] is True
+    assert cache.try_answer("This is Frank Harris, What was the total on my last invoice?") == \
+        "The total on the last invoice (2021-09-16 00:00:00) was 8.91."
+
+
+def test_validate_rejects_a_disagreeing_agent(cache):
+    report = cache.validate(lambda question: "I don't know.", save=False, templates=[template(cache, "invoice_count")])
+
+    assert report["invoice_count"]["validated"] is False
+    assert cache.unchecked() and all(t["id"] != "invoice_count" for t in cache.unchecked())
+
+
+def test_validate_marks_a_failing_template_and_carries_on(templates_path):
+    cache = TemplateCache(FailingExecutor(), path=templates_path)
+
+    report = cache.validate(lambda question: "unused", save=False)
+
+    assert all(entry["validated"] is False for entry in report.values())
+    assert all("no such table" in o["error"] for entry in report.values() for o in entry["examples"] if o["matched"])
+    assert cache.stats["validation_errors"] > 0
+    assert not cache.unchecked()
@@ -1,11 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import List
-from langchain_community.tools import WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
+import sys
+import time
 from langchain.agents import create_agent
-from Models.groq import llm
+from Models.registry import get_model
 from tools_client.Tavily import tavily_tool
-wiki_tool=WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(top_k_results=2,doc_content_chars_max=2000))
+from tools_client.Wikipedia import wiki_tool
 
 
 SYSTEM_PROMPT="""
@@ -22,8 +22,14 @@ class Output(BaseModel):
     states:List[str]
     cms:List[str]
 
+    @model_validator(mode="after")
+    def same_length(self):
+        if len(self.states) != len(self.cms):
+            raise ValueError(f"{len(self.states)} states but {len(self.cms)} chief ministers")
+        return self
 
 
+llm = get_model("groq")
 research_agent = create_agent(
     llm,
     tools=[wiki_tool, tavily_tool],
@@ -40,10 +46,87 @@ research_agent = create_agent(
     ,response_format=Output
 )
 
-research_result = research_agent.invoke(
-    {"messages": "List current chief ministers of Indian states"}
+def context_chars(result) -> int:
+    """Characters of every message the agent run carried (a proxy for context size)."""
+    return sum(len(str(m.content)) for m in result["messages"])
+
+
+def run_single(question: str) -> Output:
+    """One agent run for the whole list (the original mode)."""
+    start = time.perf_counter()
+    result = research_agent.invoke({"messages": question})
+    print(f"⏱️ single: {time.perf_counter() - start:.1f}s, context {context_chars(result)} chars")
+    return result["structured_response"]
+
+
+# ===============================
+# Map-reduce mode
+# ===============================
+# plan: the entity list, with no tool calls
+class Entities(BaseModel):
+    """every entity the question asks about, one per item"""
+    entities:List[str]
+
+planner = llm.with_structured_output(Entities)
+
+# map: one small agent run per entity, each with its own short context
+class EntityResult(BaseModel):
+    """the state and its current chief minister"""
+    state:str
+    cm:str
+
+entity_agent = create_agent(
+    llm,
+    tools=[wiki_tool, tavily_tool],
+    system_prompt=SYSTEM_PROMPT,
+    response_format=EntityResult
 )
 
-raw_text = research_result["structured_response"]
 
-print(raw_text)
\ No newline at end of file
+def run_map_reduce(question: str, max_concurrency: int = 8) -> Output:
+    """
+    Plan the entity list, research each entity concurrently, merge into Output.
+
+    Each per-entity run only carries its own lookups, so the largest context
+    stays flat as the entity count grows, and wall time is bounded by
+    ceil(entities / max_concurrency) rounds instead of one long sequential run.
+    """
+    start = time.perf_counter()
+    entities = planner.invoke(
+        f"List every entity this question is about (e.g. every Indian state). Question: {question}"
+    ).entities
+    print(f"🗺️ {len(entities)} entities planned")
+
+    results = entity_agent.batch(
+        [{"messages": f"Who is the current chief minister of {entity}?"} for entity in entities],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True,
+    )
+
+    # reduce: typed partials -> one validated Output, in planner order
+    states, cms, failed, contexts = [], [], [], []
+    for entity, result in zip(entities, results):
+        if isinstance(result, Exception) or "structured_response" not in result:
+            failed.append(entity)
+            continue
+        contexts.append(context_chars(result))
+        partial = result["structured_response"]
+        if partial.state not in states:
+            states.append(partial.state)
+            cms.append(partial.cm)
+    output = Output(states=states, cms=cms)
+
+    print(
+        f"⏱️ map-reduce: {time.perf_counter() - start:.1f}s, "
+        f"largest context {max(contexts, default=0)} chars, total {sum(contexts)} chars"
+    )
+    if failed:
+        print(f"⚠️ No result for: {', '.join(failed)}")
+    return output
+
+
+# python -m LangChain.StructuredOutput.StructuredOutput [--single]
+question = "List current chief ministers of Indian states"
+raw_text = run_single(question) if "--single" in sys.argv[1:] else run_map_reduce(question)
+
+print(raw_text)
@@ -1,4 +1,4 @@
-from Models.groq import llm
+from Models.registry import get_model
 from langchain.agents import create_agent
 from langchain.tools import tool
 from tools_client.Tavily import tavily_tool
@@ -36,7 +36,7 @@ def multiply_number(x:int,y:int):
     """
     return x*y
 
-agent=create_agent(llm,tools=[tavily_tool,sum_of_digits,multiply_number])
+agent=create_agent(get_model("groq"),tools=[tavily_tool,sum_of_digits,multiply_number])
 
 for token in agent.stream({"messages":"return the sum of digits of the year where italy won the first football world cup and multiply with the sum of digits of the year germany won their last football world cup"},stream_mode="values"):
     print(token["messages"][-1].pretty_print())
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Per-process embedding vs the shared micro-batching embedding service.
+
+"local":   N client processes, each loading its own HuggingFaceEmbeddings
+"service": one embedding_service.py process, N client processes using
+           EmbeddingServiceClient
+
+Every client embeds --texts single queries one call at a time (the
+request-path pattern). Reports texts/s and the summed RSS of all
+processes that hold a model.
+
+Usage (from langchain-expirements/):
+    python benchmarks/bench_embedding_service.py --clients 8 --texts 100
+"""
+import argparse
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MAIN_DIR = Path(__file__).parent.parent / "graphs" / "main"
+sys.path.insert(0, str(MAIN_DIR))
+from warmup import rss_mb
+
+SOCKET = "/tmp/bench_embedding.sock"
+SENTENCE = "Why does my solution get TLE when N is {}?"
+
+
+def _client(mode: str, texts: int, ready, start, done):
+    if mode == "local":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        from embedding_service import DEFAULT_MODEL_NAME
+        model = HuggingFaceEmbeddings(model_name=DEFAULT_MODEL_NAME)
+        model.embed_query("warm up")
+    else:
+        from embedding_service import EmbeddingServiceClient
+        model = EmbeddingServiceClient(SOCKET)
+    ready.put((os.getpid(), rss_mb(os.getpid())))
+    start.wait()
+    for i in range(texts):
+        model.embed_query(SENTENCE.format(i))
+    done.put(os.getpid())
+
+
+def run(mode: str, clients: int, texts: int) -> dict:
+    ctx = mp.get_context("spawn")
+    ready, done, start = ctx.Queue(), ctx.Queue(), ctx.Event()
+    server = None
+    model_rss = 0.0
+    if mode == "service":
+        server = subprocess.Popen([sys.executable, str(MAIN_DIR / "embedding_service.py"), "--socket", SOCKET],
+                                  stdout=subprocess.PIPE, text=True)
+        server.stdout.readline()  # "ready" line
+    try:
+        procs = [ctx.Process(target=_client, args=(mode, texts, ready, start, done)) for _ in range(clients)]
+        for p in procs:
+            p.start()
+        client_rss = [ready.get()[1] for _ in procs]
+
+        started = time.perf_counter()
+        start.set()
+        for _ in procs:
+            done.get()
+        elapsed = time.perf_counter() - started
+        for p in procs:
+            p.join()
+
+        if mode == "service":
+            model_rss = rss_mb(server.pid)
+        return {
+            "mode": mode,
+            "texts_per_s": round(clients * texts / elapsed, 1),
+            "total_rss_mb": round(sum(client_rss) + model_rss, 1),
+        }
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--texts", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'texts/s':>9} {'total RSS MB':>13}")
+    for mode in ("local", "service"):
+        r = run(mode, args.clients, args.texts)
+        print(f"{r['mode']:<8} {r['texts_per_s']:>9} {r['total_rss_mb']:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Code fingerprint benchmark on large generated submissions.
+
+For Python (ast path) and C++ (token path) submissions of increasing size
+this measures cold fingerprint latency (lru_cache bypassed) and checks:
+  invariant - reformatted, re-commented and (Python) renamed variants
+              hash the same
+  distinct  - a one-operator change hashes differently
+and that small programs which only look alike after renaming (a name that
+is also spelled out as a keyword argument, attribute or class member) hash
+differently.
+
+Usage (from langchain-expirements/):
+    python benchmarks/bench_fingerprint.py [--sizes 100 1000 5000] [--repeat 20]
+"""
+import argparse
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "graphs" / "main"))
+from code_fingerprint import fingerprint
+
+cold_fingerprint = fingerprint.__wrapped__
+
+
+def python_submission(functions: int) -> str:
+    parts = ['import sys\ninput = sys.stdin.readline\n']
+    for i in range(functions):
+        parts.append(
+            f"def helper_{i}(values, limit):\n"
+            f"    total = 0\n"
+            f"    for idx, value in enumerate(values):\n"
+            f"        if value % {i + 2} == 0 and idx < limit:\n"
+            f"            total += value * {i + 1}\n"
+            f"        else:\n"
+            f"            total -= 1\n"
+            f"    return total\n"
+        )
+    parts.append("n = int(input())\nnums = list(map(int, input().split()))\n")
+    parts.append("print(" + " + ".join(f"helper_{i}(nums, n)" for i in range(min(functions, 50))) + ")\n")
+    return "\n".join(parts)
+
+
+def python_variant(code: str) -> str:
+    """Same program: comments, blank lines, spacing and different local names."""
+    code = re.sub(r"\btotal\b", "acc", code)
+    code = re.sub(r"\bvalue\b", "v", code)
+    code = code.replace("    return", "    # done\n\n    return")
+    return code.replace(" = ", "=").replace(" += ", "+=")
+
+
+def cpp_submission(functions: int) -> str:
+    parts = ["#include <bits/stdc++.h>\nusing namespace std;\n"]
+    for i in range(functions):
+        parts.append(
+            f"long long helper_{i}(const vector<long long>& a, int limit) {{\n"
+            f"    long long total = 0; // running sum\n"
+            f"    for (int i = 0; i < (int)a.size(); i++) {{\n"
+            f"        if (a[i] % {i + 2} == 0 && i < limit) total += a[i] * {i + 1};\n"
+            f"        else total -= 1;\n"
+            f"    }}\n"
+            f"    return total;\n"
+            f"}}\n"
+        )
+    parts.append("int main() {\n    int n; cin >> n;\n    vector<long long> a(n);\n"
+                 "    for (auto& x : a) cin >> x;\n    cout << helper_0(a, n) << endl;\n}\n")
+    return "\n".join(parts)
+
+
+def cpp_variant(code: str) -> str:
+    """Same program: comments and whitespace only."""
+    code = code.replace("// running sum", "/* acc */")
+    return code.replace("    ", "\t").replace(" = ", "=")
+
+
+def measure(code: str, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cold_fingerprint(code)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)
+
+
+# Different programs that a naive renaming would merge
+LOOKALIKES = [
+    ("x = 1\nprint(x)", "x = 1\nprint(v0)"),
+    ("def f(a):\n    return a\nf(a=1)", "def f(b):\n    return b\nf(a=1)"),
+    ("class A:\n    x = 1\nA.y", "class A:\n    y = 1\nA.y"),
+    ("class A:\n    def __init__(self):\n        print(1)\nA()", "class A:\n    def setup(self):\n        print(1)\nA()"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="functions per submission")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'lang':<5} {'funcs':>6} {'lines':>7} {'KB':>7} {'p50 ms':>8} {'p95 ms':>8} {'invariant':>10} {'distinct':>9}")
+    for lang, make, variant in (("py", python_submission, python_variant), ("cpp", cpp_submission, cpp_variant)):
+        for size in args.sizes:
+            code = make(size)
+            timings = measure(code, args.repeat)
+            invariant = cold_fingerprint(code) == cold_fingerprint(variant(code))
+            distinct = cold_fingerprint(code) != cold_fingerprint(code.replace("total -= 1", "total += 1", 1))
+            print(f"{lang:<5} {size:>6} {code.count(chr(10)):>7} {len(code) / 1024:>7.1f} "
+                  f"{statistics.median(timings):>8.2f} {timings[min(len(timings) - 1, int(len(timings) * 0.95))]:>8.2f} "
+                  f"{str(invariant):>10} {str(distinct):>9}")
+
+    collisions = [a for a, b in LOOKALIKES if cold_fingerprint(a) == cold_fingerprint(b)]
+    print(f"lookalike pairs kept apart: {len(LOOKALIKES) - len(collisions)}/{len(LOOKALIKES)}")
+    for code in collisions:
+        print(f"  ❌ collides: {code!r}")
+
+
+if __name__ == "__main__":
+    main()
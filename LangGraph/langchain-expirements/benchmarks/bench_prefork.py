@@ -0,0 +1,125 @@
+"""
+Throughput scaling and per-worker memory of the prefork server.
+
+For each worker count this starts graphs/main/prefork_server.py, drives it
+with concurrent clients and reads RSS / PSS / shared memory of every
+worker from /proc (Linux only). PSS splits shared pages between the
+processes that map them, so a falling PSS per worker is the
+copy-on-write sharing showing up.
+
+Usage (from langchain-expirements/):
+    RAG_BACKEND=numpy python benchmarks/bench_prefork.py --workers 1 2 4 --requests 400
+    python benchmarks/bench_prefork.py --endpoint /invoke --payload payload.json   # full graph (calls the LLM)
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SERVER = Path(__file__).parent.parent / "graphs" / "main" / "prefork_server.py"
+
+DEFAULT_PAYLOAD = {"problem_id": 2, "query": "What are the constraints on the input size?", "k": 8}
+
+
+def proc_memory_mb(pid: int) -> dict:
+    """RSS, PSS and shared memory of a process from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024
+    return {
+        "rss": round(fields.get("Rss", 0), 1),
+        "pss": round(fields.get("Pss", 0), 1),
+        "shared": round(fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0), 1),
+    }
+
+
+def children_of(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_ready(base_url: str, workers: int, timeout: float = 300):
+    """Wait until /health has been answered by every worker (they serve only after warm-up)."""
+    seen = set()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            seen.add(json.loads(urllib.request.urlopen(f"{base_url}/health", timeout=2).read())["pid"])
+            if len(seen) >= workers:
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError("server did not become ready")
+
+
+def post(url: str, body: bytes) -> float:
+    start = time.perf_counter()
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    urllib.request.urlopen(req, timeout=120).read()
+    return time.perf_counter() - start
+
+
+def run(workers: int, args, payload: dict) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, str(SERVER), "--workers", str(workers), "--port", str(args.port), "--preload", "0"],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(base_url, workers)
+        body = json.dumps(payload).encode("utf-8")
+        url = base_url + args.endpoint
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = list(pool.map(lambda _: post(url, body), range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+        memory = [proc_memory_mb(pid) for pid in children_of(server.pid)]
+        latencies.sort()
+        return {
+            "workers": workers,
+            "rps": round(args.requests / elapsed, 1),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+            "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+            "parent": proc_memory_mb(server.pid),
+            "worker_rss_mb": round(sum(m["rss"] for m in memory) / len(memory), 1),
+            "worker_pss_mb": round(sum(m["pss"] for m in memory) / len(memory), 1),
+            "worker_shared_mb": round(sum(m["shared"] for m in memory) / len(memory), 1),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--endpoint", default="/retrieve", choices=["/retrieve", "/invoke"])
+    parser.add_argument("--payload", help="JSON file with the request body")
+    parser.add_argument("--port", type=int, default=8199)
+    args = parser.parse_args()
+
+    payload = DEFAULT_PAYLOAD
+    if args.payload:
+        with open(args.payload, encoding="utf-8") as f:
+            payload = json.load(f)
+
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'RSS/wkr':>8} {'PSS/wkr':>8} {'shared':>8}")
+    for workers in args.workers:
+        r = run(workers, args, payload)
+        print(f"{r['workers']:>7} {r['rps']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['worker_rss_mb']:>8} {r['worker_pss_mb']:>8} {r['worker_shared_mb']:>8}")
+
+
+if __name__ == "__main__":
+    main()
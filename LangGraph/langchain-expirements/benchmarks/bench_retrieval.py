@@ -0,0 +1,116 @@
+"""
+Chroma vs NumPy-snapshot retrieval benchmark.
+
+Each backend runs in its own subprocess so RSS numbers are not mixed.
+Query embeddings are computed once and reused, so the numbers compare the
+search path itself (client/collection/ANN vs mmap + mat-vec).
+
+Usage (from langchain-expirements/):
+    python graphs/main/snapshot_store.py        # export snapshots first
+    python benchmarks/bench_retrieval.py [--repeat 200] [--k 8]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MAIN_DIR = Path(__file__).parent.parent / "graphs" / "main"
+
+QUERIES = [
+    "What are the constraints on N?",
+    "I don't understand the example output",
+    "How should I approach this problem?",
+    "Why does my solution get TLE on large inputs?",
+    "Explain the time complexity of my code",
+    "Is a greedy approach correct here?",
+    "What edge cases am I missing?",
+    "for i in range(n):\n    for j in range(n):\n        ans += a[i] * a[j]",
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run_backend(backend: str, repeat: int, k: int):
+    """Worker mode: load one backend, time searches, print a JSON line."""
+    os.environ["RAG_BACKEND"] = backend
+    sys.path.insert(0, str(MAIN_DIR))
+    import numpy as np
+    from rag_layer import retriever, NumpySnapshotRetriever
+    from warmup import rss_mb
+
+    base_rss = rss_mb()
+    problem_ids = retriever.list_problem_ids()
+    vectors = [np.asarray(v, dtype=np.float32) for v in retriever.embeddings.embed_documents(QUERIES)]
+
+    if backend == "numpy":
+        assert isinstance(retriever, NumpySnapshotRetriever)
+
+        def search(pid, vec):
+            snapshot = retriever._get_snapshot(pid)
+            scores = snapshot["matrix"] @ (vec / np.linalg.norm(vec))
+            if snapshot["scales"] is not None:
+                scores = scores * snapshot["scales"]
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            return top[np.argsort(-scores[top])]
+    else:
+        def search(pid, vec):
+            collection = retriever._get_collection(pid)
+            return collection.similarity_search_by_vector_with_relevance_scores(vec.tolist(), k=k)
+
+    # Cold: first search per problem (opens the collection / maps the files)
+    cold = []
+    for pid in problem_ids:
+        start = time.perf_counter()
+        search(pid, vectors[0])
+        cold.append((time.perf_counter() - start) * 1000)
+
+    warm = []
+    for _ in range(repeat):
+        for pid in problem_ids:
+            for vec in vectors:
+                start = time.perf_counter()
+                search(pid, vec)
+                warm.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        "backend": backend,
+        "problems": len(problem_ids),
+        "searches": len(warm),
+        "cold_ms_max": round(max(cold), 3) if cold else None,
+        "p50_ms": round(percentile(warm, 50), 3),
+        "p99_ms": round(percentile(warm, 99), 3),
+        "rss_after_model_mb": round(base_rss, 1),
+        "rss_after_search_mb": round(rss_mb(), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--backend", choices=["chroma", "numpy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        run_backend(args.backend, args.repeat, args.k)
+        return
+
+    print(f"{'backend':<8} {'searches':>9} {'cold max':>10} {'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>8} {'Δ RSS':>7}")
+    for backend in ("chroma", "numpy"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--backend", backend, "--repeat", str(args.repeat), "--k", str(args.k)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['backend']:<8} {r['searches']:>9} {r['cold_ms_max']:>10} {r['p50_ms']:>9} {r['p99_ms']:>9} "
+              f"{r['rss_after_search_mb']:>8} {r['rss_after_search_mb'] - r['rss_after_model_mb']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
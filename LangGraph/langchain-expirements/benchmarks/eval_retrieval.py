@@ -0,0 +1,85 @@
+"""
+Offline retrieval evaluation: sweep k and compare with the adaptive-k policy.
+
+For every labelled query (JSONL: problem_id, intent, query,
+relevant_sections) and every policy this measures:
+  fetched  - chunks pulled from the store (the final k)
+  yield    - distinct chunks left after filter_by_section
+  empty    - share of queries where nothing survived the filter
+  recall   - share of labelled sections present in the chunks that reach
+             the prompt (top 3, top 2 for clarification), substring match
+  latency  - retrieve_for_intent wall time (embedding + search)
+
+Usage (from langchain-expirements/):
+    python benchmarks/eval_retrieval.py [--labels benchmarks/retrieval_labels.jsonl] [--ks 2 4 8 10 16]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "graphs" / "main"))
+from rag_layer import retrieve_for_intent, deduplicate_context, ADAPTIVE_K
+
+PROMPT_CHUNKS = {"clarification_request": 2}  # build_prompt default is 3
+
+
+def load_labels(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(labels: list, policy_for) -> dict:
+    fetched, yields, recalls, latencies = [], [], [], []
+    for item in labels:
+        intent = item["intent"]
+        start = time.perf_counter()
+        all_chunks, filtered = retrieve_for_intent(item["problem_id"], intent, item["query"], policy=policy_for(intent))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        distinct = deduplicate_context(filtered)
+        prompt_chunks = distinct[:PROMPT_CHUNKS.get(intent, 3)]
+        found = [
+            label for label in item["relevant_sections"]
+            if any(label.lower() in chunk["section"].lower() for chunk in prompt_chunks)
+        ]
+        fetched.append(len(all_chunks))
+        yields.append(len(distinct))
+        recalls.append(len(found) / len(item["relevant_sections"]))
+
+    latencies.sort()
+    return {
+        "fetched": statistics.mean(fetched),
+        "yield": statistics.mean(yields),
+        "empty": sum(1 for y in yields if y == 0) / len(yields),
+        "recall": statistics.mean(recalls),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", default=str(Path(__file__).parent / "retrieval_labels.jsonl"))
+    parser.add_argument("--ks", type=int, nargs="+", default=[2, 4, 6, 8, 10, 12, 16])
+    args = parser.parse_args()
+
+    labels = load_labels(args.labels)
+    # Warm the model and collections so the first policy isn't penalised
+    evaluate(labels[:1], lambda intent: None)
+
+    policies = [(f"k={k}", lambda intent, k=k: (k, k, 0)) for k in args.ks]
+    policies.append(("adaptive", lambda intent: ADAPTIVE_K[intent]))
+
+    print(f"{len(labels)} labelled queries")
+    print(f"{'policy':<10} {'fetched':>8} {'yield':>7} {'empty':>7} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, policy_for in policies:
+        r = evaluate(labels, policy_for)
+        print(f"{name:<10} {r['fetched']:>8.1f} {r['yield']:>7.1f} {r['empty']:>7.0%} {r['recall']:>7.0%} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Prefix-cache friendliness of the tutor prompts: build_prompt (one string,
+history inside the system part) vs build_prompt_messages (static system ->
+problem -> history -> query).
+
+Offline (default): replays simulated sessions (several users per problem,
+multi-turn, intents from the labelled queries) through both layouts and
+measures, against a prefix cache that has seen every earlier prompt:
+  cached share  - prompt tokens covered by the longest cached prefix
+  prefix tokens - mean cached prefix length per request
+Provider caches work in blocks; --block rounds cached prefixes down.
+
+Live (--live N): sends N requests per layout, interleaved, to the handlers'
+LLM and reports latency plus the provider's cached-token counts when it
+reports them.
+
+Problem text comes from the problem's knowledge-base chunks (the problems
+table is not needed). Context is what the handlers would send: the
+precomputed bundle where the intent has one, otherwise retrieve_for_intent
+on the query.
+
+Usage (from langchain-expirements/):
+    python benchmarks/prompt_cache_stats.py [--users 4] [--turns 4] [--block 1] [--live 0]
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "graphs" / "main"))
+from langchain_core.messages import AIMessage, HumanMessage
+from rag_layer import build_prompt, build_prompt_messages, deduplicate_context, retrieve_for_intent, retriever
+from context_store import context_store
+
+LABELS = Path(__file__).parent / "retrieval_labels.jsonl"
+FAKE_ANSWER = "Think about what the loop accumulates and which edge case breaks it. " * 8
+SAMPLE_CODE = "n = int(input())\nnums = list(map(int, input().split()))\nprint(sum(nums))"
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def tokenize(text: str) -> list:
+        return _encoding.encode(text)
+except ImportError:
+    def tokenize(text: str) -> list:
+        return re.findall(r"\w+|[^\w\s]|\s+", text)
+
+
+def serialize(messages) -> str:
+    """Roughly what a chat template sends: role header + content per message."""
+    if isinstance(messages, str):
+        messages = [HumanMessage(content=messages)]
+    return "".join(f"<|{m.type}|>\n{m.content}\n" for m in messages)
+
+
+class PrefixCache:
+    """Token trie of every prompt seen so far; lookup = longest cached prefix."""
+
+    def __init__(self):
+        self.root = {}
+
+    def lookup_and_insert(self, tokens: list) -> int:
+        node, matched, matching = self.root, 0, True
+        for token in tokens:
+            if matching and token in node:
+                matched += 1
+            else:
+                matching = False
+            node = node.setdefault(token, {})
+        return matched
+
+
+def problem_description(problem_id: int) -> str:
+    chunks = deduplicate_context(retriever.get_all_chunks(problem_id))
+    return "\n\n".join(chunk["content"] for chunk in chunks)[:4000]
+
+
+def sessions(problems: dict, users: int, turns: int):
+    """(problem, intent, query, code, history) per request, interleaved across users like real traffic."""
+    with open(LABELS, encoding="utf-8") as f:
+        labels = [json.loads(line) for line in f if line.strip()]
+    by_problem = {pid: [l for l in labels if l["problem_id"] == pid] or labels for pid in problems}
+
+    histories = {(pid, u): [] for pid in problems for u in range(users)}
+    for turn in range(turns):
+        for (pid, user), history in histories.items():
+            label = by_problem[pid][(user * turns + turn) % len(by_problem[pid])]
+            history.append(HumanMessage(content=label["query"]))
+            yield problems[pid], label["intent"], label["query"], SAMPLE_CODE, list(history)
+            history.append(AIMessage(content=FAKE_ANSWER))
+
+
+def handler_context(problem_id: int, intent: str, query: str, code: str):
+    """(chunks, context_text) as the handler for this intent would pass them."""
+    bundle = context_store.get_bundle(problem_id, intent)
+    if bundle is not None:
+        return bundle["chunks"], bundle.get("context_text")
+    if intent == "why_my_code_failed":
+        query = f"{query}\n\nCode:\n{code}"
+    _, filtered = retrieve_for_intent(problem_id=problem_id, intent=intent, query=query)
+    return filtered, None
+
+
+def build_both(problem, intent, query, code, history):
+    chunks, context_text = handler_context(problem["id"], intent, query, code)
+    args = dict(intent=intent, problem=problem, user_query=query, user_code=code,
+                context_chunks=chunks, conversation_context=history)
+    return build_prompt(**args), build_prompt_messages(**args, context_text=context_text)
+
+
+def parity(old: str, new: list) -> bool:
+    """Every word of the old prompt is still in the new one (content moved, not dropped)."""
+    new_text = serialize(new)
+    old = re.sub(r"(?m)^(User|AI): ", "", old)  # history speakers are message roles now
+    return all(word in new_text for word in set(re.findall(r"\w+", old)))
+
+
+def offline(problems: dict, users: int, turns: int, block: int):
+    caches = {"build_prompt": PrefixCache(), "build_prompt_messages": PrefixCache()}
+    totals = {name: {"tokens": 0, "cached": 0, "prefix": []} for name in caches}
+    parity_ok = True
+
+    for request in sessions(problems, users, turns):
+        old, new = build_both(*request)
+        parity_ok &= parity(old, new)
+        for name, prompt in (("build_prompt", old), ("build_prompt_messages", new)):
+            tokens = tokenize(serialize(prompt))
+            cached = caches[name].lookup_and_insert(tokens) // block * block
+            totals[name]["tokens"] += len(tokens)
+            totals[name]["cached"] += cached
+            totals[name]["prefix"].append(cached)
+
+    print(f"{len(totals['build_prompt']['prefix'])} requests, {len(problems)} problems, "
+          f"{users} users x {turns} turns, block={block}, content parity: {parity_ok}")
+    print(f"{'layout':<24} {'prompt tokens':>14} {'cached share':>13} {'mean prefix':>12}")
+    for name, t in totals.items():
+        print(f"{name:<24} {t['tokens']:>14} {t['cached'] / t['tokens']:>13.1%} {statistics.mean(t['prefix']):>12.0f}")
+
+
+def cached_tokens(response) -> int:
+    usage = getattr(response, "usage_metadata", None) or {}
+    cached = (usage.get("input_token_details") or {}).get("cache_read")
+    if cached is None:
+        details = (response.response_metadata.get("token_usage") or {}).get("prompt_tokens_details") or {}
+        cached = details.get("cached_tokens", 0)
+    return cached or 0
+
+
+def live(problems: dict, users: int, turns: int, n: int):
+    from handlers_with_rag import handler_llm
+    llm = handler_llm()
+
+    results = {"build_prompt": [], "build_prompt_messages": []}
+    for i, request in enumerate(sessions(problems, users, turns)):
+        if i >= n:
+            break
+        for name, prompt in zip(results, build_both(*request)):
+            start = time.perf_counter()
+            response = llm.invoke(prompt)
+            results[name].append((time.perf_counter() - start, cached_tokens(response),
+                                  (response.usage_metadata or {}).get("input_tokens", 0)))
+
+    print(f"{'layout':<24} {'p50 s':>7} {'mean s':>7} {'cached tokens':>14}")
+    for name, rows in results.items():
+        latencies = sorted(r[0] for r in rows)
+        share = sum(r[1] for r in rows) / max(1, sum(r[2] for r in rows))
+        print(f"{name:<24} {latencies[len(latencies) // 2]:>7.2f} {statistics.mean(latencies):>7.2f} {share:>14.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--problems", type=int, nargs="*", help="problem ids (default: all collections)")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--block", type=int, default=1, help="cache granularity in tokens")
+    parser.add_argument("--live", type=int, default=0, help="requests per layout against the real LLM")
+    args = parser.parse_args()
+
+    problem_ids = args.problems or retriever.list_problem_ids()
+    problems = {pid: {"id": pid, "description": problem_description(pid)} for pid in problem_ids}
+    offline(problems, args.users, args.turns, args.block)
+    if args.live:
+        live(problems, args.users, args.turns, args.live)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Replay captured traffic against the compiled graph.
+
+Reads a capture log (graphs/main/capture.py, CAPTURE_SAMPLE_RATE > 0) and
+re-drives `graph` open-loop: requests arrive at their original relative
+times divided by --speed, whatever the previous ones are doing. LLMs are
+replaced so runs are repeatable and free:
+  recorded - each request gets its own captured guard decision and LLM
+             replies, after the captured latency (x --llm-latency-scale)
+  fake     - every guard accepts, every reply is canned, after
+             --fake-latency-ms
+  live     - the real providers (not deterministic, costs tokens)
+Everything else (setup/DB, static analysis, sandbox, retrieval,
+singleflight) runs for real.
+
+Reports latency percentiles (from scheduled arrival, so queueing counts),
+overall and per intent, per-node p50/p95, cache outcomes, and the captured
+latencies next to them. --out writes the report as JSON for comparing runs.
+
+Usage (from langchain-expirements/):
+    python benchmarks/replay_traffic.py captures/traffic.jsonl [--speed 10] [--llm recorded|fake|live]
+        [--repeat 1] [--limit N] [--concurrency 64] [--out report.json]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "graphs" / "main"))
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+import LearnWithAI_
+import handlers_with_rag
+from LearnWithAI_ import graph
+from capture import invoke_recording
+
+FAKE_ANSWER = "Replay answer."
+# The captured request being replayed on this thread (LangGraph copies it into node threads)
+_replaying: ContextVar = ContextVar("replaying", default=None)
+
+
+def load_log(path: str, limit: int = None) -> list:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # torn last line
+    records.sort(key=lambda r: r["ts"])
+    return records[:limit] if limit else records
+
+
+class ReplayLLM:
+    """Per-request LLM script: recorded guard decision and replies, or fakes."""
+
+    def __init__(self, record: dict, mode: str, fake_latency_s: float, latency_scale: float):
+        self.mode = mode
+        self.fake_latency_s = fake_latency_s
+        self.latency_scale = latency_scale
+        calls = record.get("llm_calls", [])
+        self.guard_calls = deque(c for c in calls if c["node"].startswith("guard_"))
+        self.other_calls = deque(c for c in calls if not c["node"].startswith("guard_"))
+        self.decisions = list(record.get("decisions", {}).values())
+
+    def _next(self, calls: deque) -> dict:
+        if self.mode == "fake" or not calls:
+            return {"ms": self.fake_latency_s * 1000, "content": FAKE_ANSWER}
+        return calls.popleft()
+
+    def guard(self) -> dict:
+        call = self._next(self.guard_calls)
+        time.sleep(call["ms"] / 1000 * self.latency_scale)
+        if self.mode == "recorded" and self.decisions:
+            return {"is_valid": True, "fallback_message": "", "violation_type": "ok", **self.decisions[0]}
+        return {"is_valid": True, "fallback_message": "", "violation_type": "ok"}
+
+    def reply(self) -> tuple:
+        call = self._next(self.other_calls)
+        time.sleep(call["ms"] / 1000 * self.latency_scale)
+        return call.get("content") or FAKE_ANSWER, call.get("input_tokens", 0), call.get("output_tokens", 0)
+
+
+class ReplayChat(BaseChatModel):
+    """Stands in for the handler LLM; answers from the current request's ReplayLLM."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        script = _replaying.get()
+        content, input_tokens, output_tokens = script.reply() if script else (FAKE_ANSWER, 0, 0)
+        message = AIMessage(content=content, usage_metadata={
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def install_fakes():
+    """Swap the guard and handler LLMs for the per-request replay script."""
+    def run_guard_llm(system_prompt: str, user_input: str) -> dict:
+        script = _replaying.get()
+        return script.guard() if script else {"is_valid": True, "fallback_message": "", "violation_type": "ok"}
+
+    LearnWithAI_.run_guard_llm = run_guard_llm
+    replay_chat = ReplayChat()
+    handlers_with_rag.handler_llm = lambda: replay_chat
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"n": 0}
+    values = sorted(values)
+
+    def rank(p):
+        return values[min(len(values) - 1, int(len(values) * p))]
+
+    return {"n": len(values), "p50": rank(0.5), "p90": rank(0.9), "p95": rank(0.95), "p99": rank(0.99),
+            "max": values[-1], "mean": round(sum(values) / len(values), 1)}
+
+
+def replay(records: list, speed: float, mode: str, fake_latency_s: float, latency_scale: float,
+           concurrency: int, repeat: int) -> list:
+    """Drive the graph open-loop; one result per replayed request."""
+    results = []
+    results_lock = threading.Lock()
+    span = records[-1]["ts"] - records[0]["ts"] if records else 0.0
+
+    def run(record: dict, scheduled: float):
+        started = time.perf_counter()
+        token = _replaying.set(ReplayLLM(record, mode, fake_latency_s, latency_scale) if mode != "live" else None)
+        try:
+            payload = {k: v for k, v in record["input"].items() if v not in (None, "")}
+            _, replayed, error = invoke_recording(graph, payload)
+        finally:
+            _replaying.reset(token)
+        finished = time.perf_counter()
+        with results_lock:
+            results.append({
+                "intent": record["input"].get("user_intent"),
+                "latency_ms": round((finished - scheduled) * 1000, 1),
+                "lag_ms": round((started - scheduled) * 1000, 1),
+                "captured_ms": record.get("total_ms"),
+                "nodes": replayed["nodes"],
+                "cache": replayed["cache"],
+                "error": replayed["error"] if error is not None else None,
+            })
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        for round_no in range(repeat):
+            base = round_no * (span + 1.0)  # back-to-back passes, 1s apart in log time
+            for record in records:
+                scheduled = start + (base + record["ts"] - records[0]["ts"]) / speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(run, record, scheduled)
+    return results
+
+
+def build_report(results: list, records: list, wall_s: float, args) -> dict:
+    by_intent = defaultdict(list)
+    nodes = defaultdict(list)
+    cache = defaultdict(Counter)
+    for r in results:
+        by_intent[r["intent"]].append(r["latency_ms"])
+        for node, ms in r["nodes"].items():
+            nodes[node].append(ms)
+        for key, value in r["cache"].items():
+            cache[key][json.dumps(value, sort_keys=True) if isinstance(value, dict) else str(value)] += 1
+    return {
+        "log": args.log, "llm": args.llm, "speed": args.speed, "repeat": args.repeat,
+        "requests": len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "wall_s": round(wall_s, 2),
+        "throughput_rps": round(len(results) / wall_s, 2) if wall_s else 0.0,
+        "latency_ms": percentiles([r["latency_ms"] for r in results]),
+        "schedule_lag_ms": percentiles([r["lag_ms"] for r in results]),
+        "captured_latency_ms": percentiles([r["total_ms"] for r in records if r.get("total_ms") is not None]),
+        "by_intent": {intent: percentiles(v) for intent, v in sorted(by_intent.items(), key=lambda kv: str(kv[0]))},
+        "nodes_ms": {node: percentiles(v) for node, v in sorted(nodes.items())},
+        "cache": {key: dict(counter) for key, counter in sorted(cache.items())},
+    }
+
+
+def print_report(report: dict):
+    def row(name, p):
+        if not p.get("n"):
+            return f"{name:<28} {'-':>6}"
+        return f"{name:<28} {p['n']:>6} {p['p50']:>9.1f} {p['p95']:>9.1f} {p['p99']:>9.1f} {p['max']:>9.1f}"
+
+    print(f"\n📊 {report['requests']} requests, {report['errors']} errors, {report['wall_s']}s, "
+          f"{report['throughput_rps']} req/s (llm={report['llm']}, speed x{report['speed']})")
+    print(f"{'':<28} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    print(row("replayed", report["latency_ms"]))
+    print(row("captured", report["captured_latency_ms"]))
+    print(row("schedule lag", report["schedule_lag_ms"]))
+    for intent, p in report["by_intent"].items():
+        print(row(f"  {intent}", p))
+    print("nodes:")
+    for node, p in report["nodes_ms"].items():
+        print(row(f"  {node}", p))
+    print("cache outcomes:")
+    for key, counter in report["cache"].items():
+        print(f"  {key:<26} {counter}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="capture JSONL")
+    parser.add_argument("--speed", type=float, default=1.0, help="arrival rate multiplier (10 = 10x the captured rate)")
+    parser.add_argument("--llm", choices=["recorded", "fake", "live"], default="recorded")
+    parser.add_argument("--fake-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-latency-scale", type=float, default=1.0, help="recorded mode: scale captured LLM latency")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the log this many times back to back")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    parser.add_argument("--out", help="write the report as JSON")
+    args = parser.parse_args()
+
+    records = load_log(args.log, args.limit)
+    if not records:
+        print(f"❌ No records in {args.log}")
+        return
+    if args.llm != "live":
+        install_fakes()
+    print(f"🔁 Replaying {len(records)} requests x{args.repeat} "
+          f"(captured over {records[-1]['ts'] - records[0]['ts']:.1f}s) at x{args.speed}")
+
+    start = time.perf_counter()
+    results = replay(records, args.speed, args.llm, args.fake_latency_ms / 1000, args.llm_latency_scale,
+                     args.concurrency, max(1, args.repeat))
+    report = build_report(results, records, time.perf_counter() - start, args)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
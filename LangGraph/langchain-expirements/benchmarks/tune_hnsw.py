@@ -0,0 +1,227 @@
+"""
+HNSW parameter sweep for the problem_{id} Chroma collections.
+
+For every combination of space / M / construction_ef / search_ef this
+copies the collections (stored embeddings, no re-embedding) into a fresh
+temporary Chroma store built with those index settings and measures (the
+temporary store uses a tiny hnsw:batch_size / sync_threshold, otherwise
+collections smaller than the batch (100) are served from Chroma's
+brute-force buffer and the HNSW settings change nothing):
+  recall@k  - overlap of the ANN top-k with the exact top-k (by content,
+              problem 2 stores every chunk several times)
+  hit@k     - labelled queries whose relevant section is in the top-k
+  p50/p95   - query latency (ms), query embeddings computed once up front
+  build     - time to add every collection (s)
+  disk      - size of the temporary store (MB)
+
+--apply writes the best setting (highest recall, then hit rate, then p95)
+to hnsw_settings.json; rag_layer passes it as collection_metadata when a
+collection is created. It refuses when the runner-up ties on recall and
+hit rate and is within --noise of the best p95: the pick would be noise.
+--rebuild also rebuilds the live collections with it, in a copy of
+chroma_db that is swapped in (chroma_db becomes a symlink to
+chroma_db.<version>) only once every collection is written; the previous
+version is kept, older ones are removed. Restart running servers after.
+
+Usage (from langchain-expirements/):
+    python benchmarks/tune_hnsw.py [--k 5] [--space cosine l2] [--M 8 16 32]
+        [--construction-ef 100 200] [--search-ef 10 50 100] [--noise 0.1] [--apply [--rebuild]]
+"""
+import argparse
+import itertools
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "graphs" / "main"))
+import chromadb
+from rag_layer import ROOT_DIR, HNSW_SETTINGS_PATH, retriever
+from snapshot_store import _swap_link
+
+CHROMA_DIR = ROOT_DIR / "chroma_db"
+LABELS = Path(__file__).parent / "retrieval_labels.jsonl"
+BATCH = 256
+# Temporary stores only: index every vector into HNSW right away
+MEASURE_METADATA = {"hnsw:batch_size": 2, "hnsw:sync_threshold": 2}
+
+
+def load_collections(problem_ids) -> dict:
+    """problem_id -> everything needed to rebuild the collection."""
+    client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+    data = {}
+    for problem_id in problem_ids:
+        got = client.get_collection(f"problem_{problem_id}").get(include=["embeddings", "documents", "metadatas"])
+        data[problem_id] = {
+            "ids": got["ids"],
+            "embeddings": np.asarray(got["embeddings"], dtype=np.float32),
+            "documents": got["documents"],
+            "metadatas": got["metadatas"],
+        }
+    return data
+
+
+def build(path: str, data: dict, metadata: dict) -> chromadb.api.ClientAPI:
+    client = chromadb.PersistentClient(path=path)
+    for problem_id, d in data.items():
+        name = f"problem_{problem_id}"
+        try:
+            client.delete_collection(name)
+        except Exception:
+            pass  # not there yet
+        collection = client.create_collection(name, metadata=metadata)
+        for i in range(0, len(d["ids"]), BATCH):
+            collection.add(
+                ids=d["ids"][i:i + BATCH],
+                embeddings=d["embeddings"][i:i + BATCH].tolist(),
+                documents=d["documents"][i:i + BATCH],
+                metadatas=d["metadatas"][i:i + BATCH],
+            )
+    return client
+
+
+def exact_top_k(d: dict, vector: np.ndarray, space: str, k: int) -> set:
+    matrix = d["embeddings"]
+    if space == "l2":
+        scores = -np.linalg.norm(matrix - vector, axis=1)
+    elif space == "cosine":
+        scores = matrix @ vector / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector) + 1e-12)
+    else:  # ip
+        scores = matrix @ vector
+    order = np.argsort(-scores)[:k]
+    return {d["documents"][i] for i in order}
+
+
+def disk_mb(path: str) -> float:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file()) / 1e6
+
+
+def evaluate(data: dict, queries: list, metadata: dict, k: int, repeat: int) -> dict:
+    tmp = tempfile.mkdtemp(prefix="hnsw_")
+    try:
+        start = time.perf_counter()
+        client = build(tmp, data, {**metadata, **MEASURE_METADATA})
+        build_s = time.perf_counter() - start
+
+        recalls, hits, latencies = [], [], []
+        for query in queries:
+            d = data[query["problem_id"]]
+            collection = client.get_collection(f"problem_{query['problem_id']}")
+            n = min(k, len(d["ids"]))
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = collection.query(query_embeddings=[query["vector"].tolist()], n_results=n,
+                                          include=["documents", "metadatas"])
+                latencies.append((time.perf_counter() - start) * 1000)
+            found = set(result["documents"][0])
+            truth = exact_top_k(d, query["vector"], metadata["hnsw:space"], n)
+            recalls.append(len(found & truth) / len(truth))
+            if query.get("relevant_sections"):
+                sections = [m.get("section", "") for m in result["metadatas"][0]]
+                hits.append(any(label.lower() in s.lower() for label in query["relevant_sections"] for s in sections))
+
+        latencies.sort()
+        return {
+            "recall": statistics.mean(recalls),
+            "hit": statistics.mean(hits) if hits else 0.0,
+            "p50_ms": latencies[len(latencies) // 2],
+            "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "build_s": build_s,
+            "disk_mb": disk_mb(tmp),
+        }
+    finally:
+        _clear_clients()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _clear_clients():
+    # PersistentClient caches one system per path; drop them before moving or deleting directories
+    from chromadb.api.client import SharedSystemClient
+    SharedSystemClient.clear_system_cache()
+
+
+def rebuild_live(data: dict, metadata: dict) -> Path:
+    """Rebuild the collections in a copy of chroma_db, then swap it in."""
+    live = CHROMA_DIR.resolve()
+    version_dir = CHROMA_DIR.with_name(f"{CHROMA_DIR.name}.{time.time_ns()}")
+    shutil.copytree(live, version_dir)  # keeps any collection this script doesn't rebuild
+    try:
+        build(str(version_dir), data, metadata)
+    except Exception:
+        _clear_clients()
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+    _clear_clients()
+
+    _swap_link(CHROMA_DIR, version_dir)
+    previous = CHROMA_DIR.with_name(f"{CHROMA_DIR.name}.0") if live == CHROMA_DIR else live
+    for old in CHROMA_DIR.parent.glob(f"{CHROMA_DIR.name}.*"):
+        if old not in (version_dir, previous) and old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+    return version_dir
+
+
+def clear_winner(rows: list, noise: float) -> bool:
+    """Best row beats the runner-up on recall/hit, or on p95 by more than noise."""
+    if len(rows) < 2:
+        return True
+    (_, best), (_, second) = rows[0], rows[1]
+    if (round(best["recall"], 3), best["hit"]) != (round(second["recall"], 3), second["hit"]):
+        return True
+    return second["p95_ms"] - best["p95_ms"] > noise * best["p95_ms"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20, help="timed queries per labelled query (>= 1)")
+    parser.add_argument("--space", nargs="+", default=["cosine", "l2"])
+    parser.add_argument("--M", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--noise", type=float, default=0.1, help="p95 difference (fraction) treated as a tie")
+    parser.add_argument("--apply", action="store_true", help="write the best setting to hnsw_settings.json")
+    parser.add_argument("--rebuild", action="store_true", help="with --apply: rebuild chroma_db with it")
+    args = parser.parse_args()
+    args.repeat = max(1, args.repeat)
+
+    with open(LABELS, encoding="utf-8") as f:
+        labels = [json.loads(line) for line in f if line.strip()]
+    data = load_collections(retriever.list_problem_ids())
+    labels = [label for label in labels if label["problem_id"] in data]
+    vectors = retriever.embeddings.embed_documents([label["query"] for label in labels])
+    queries = [{**label, "vector": np.asarray(v, dtype=np.float32)} for label, v in zip(labels, vectors)]
+    print(f"{len(data)} collections, {sum(len(d['ids']) for d in data.values())} chunks, {len(queries)} labelled queries")
+
+    rows = []
+    print(f"{'space':<7} {'M':>3} {'c_ef':>5} {'s_ef':>5} {'recall':>7} {'hit':>6} {'p50 ms':>7} {'p95 ms':>7} {'build s':>8} {'disk MB':>8}")
+    for space, m, construction_ef, search_ef in itertools.product(args.space, args.M, args.construction_ef, args.search_ef):
+        metadata = {"hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef}
+        r = evaluate(data, queries, metadata, args.k, args.repeat)
+        rows.append((metadata, r))
+        print(f"{space:<7} {m:>3} {construction_ef:>5} {search_ef:>5} {r['recall']:>7.1%} {r['hit']:>6.0%} "
+              f"{r['p50_ms']:>7.2f} {r['p95_ms']:>7.2f} {r['build_s']:>8.2f} {r['disk_mb']:>8.1f}")
+
+    rows.sort(key=lambda row: (round(row[1]["recall"], 3), row[1]["hit"], -row[1]["p95_ms"]), reverse=True)
+    best_metadata, best = rows[0]
+    print(f"✅ Best: {best_metadata}")
+
+    if args.apply and not clear_winner(rows, args.noise):
+        print(f"⚠️ Runner-up {rows[1][0]} ties with the best within noise ({args.noise:.0%} of p95); "
+              "not applying. Re-run with more --repeat or a narrower grid.")
+    elif args.apply:
+        with open(HNSW_SETTINGS_PATH, "w", encoding="utf-8") as f:
+            json.dump({"metadata": best_metadata, "k": args.k, "results": best}, f, indent=2)
+        print(f"📝 Wrote {HNSW_SETTINGS_PATH}")
+        if args.rebuild:
+            version_dir = rebuild_live(data, best_metadata)
+            print(f"🔁 Rebuilt {len(data)} collections in {version_dir}; {CHROMA_DIR} now points to it")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Optional, Literal, NotRequired, Annotated, List
-from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langgraph.graph.message import add_messages
 from pydantic import BaseModel, Field
 from sqlalchemy.engine import URL
 from sqlalchemy import create_engine, text
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 import os
@@ -23,12 +22,16 @@ from handlers_with_rag import (
     handle_validate_my_approach_with_rag,
     handle_clarification_request_with_rag,
 )
+from warmup import warm_up, traffic_stats, TTLCache
+from singleflight import coalesce, GUARD_FIELDS, HANDLER_FIELDS
+from static_analysis import analyze
+from capture import note, TrafficSampler
+from rag_layer import retriever
+from llm_factory import get_llm
 
 load_dotenv()
 
 # 1. SETUP
-GROQ_KEY = os.getenv("GROQ_API_KEY")
-llm = ChatGroq(api_key=GROQ_KEY, model_name="llama-3.1-8b-instant", temperature=0)
 
 url = URL.create(
     drivername="postgresql+psycopg2",
@@ -40,7 +43,13 @@ url = URL.create(
 )
 engine = create_engine(url)
 
-def get_problem_by_id(problem_id: int):
+# Problem rows rarely change - keep them per process (filled by warm-up or first request).
+# Bounded LRU; entries expire after PROBLEM_CACHE_TTL_S so edited problems show up.
+PROBLEM_CACHE_SIZE = int(os.getenv("PROBLEM_CACHE_SIZE", "1024"))
+PROBLEM_CACHE_TTL_S = float(os.getenv("PROBLEM_CACHE_TTL_S", "600"))
+_problem_cache = TTLCache(PROBLEM_CACHE_SIZE, PROBLEM_CACHE_TTL_S)
+
+def _load_problem(problem_id: int):
     with engine.connect() as conn:
         result = conn.execute(
             text("SELECT id, title, description FROM problems WHERE id = :pid"),
@@ -50,6 +59,24 @@ def get_problem_by_id(problem_id: int):
         if not row: return None
         return {"id": row.id, "title": row.title, "description": row.description}
 
+def get_problem_by_id(problem_id: int):
+    return _problem_cache.get(problem_id, lambda: _load_problem(problem_id))
+
+_constraints_cache = TTLCache(PROBLEM_CACHE_SIZE, PROBLEM_CACHE_TTL_S)
+
+def get_constraints_text(problem_id: int, problem: Optional[dict]) -> str:
+    """Description plus the stored Constraints chunks (bounds and time limit for static analysis)."""
+    def load():
+        chunks = [c["content"] for c in retriever.get_all_chunks(problem_id) if "constraint" in c["section"].lower()]
+        description = problem["description"] if problem else ""
+        return "\n".join([description, *dict.fromkeys(chunks)])
+    return _constraints_cache.get(problem_id, load)
+
+def invalidate_problem(problem_id: Optional[int] = None):
+    """Forget a problem's cached row and constraints (all problems if None), e.g. after re-ingesting it."""
+    _problem_cache.invalidate(problem_id)
+    _constraints_cache.invalidate(problem_id)
+
 # 2. STATE DEFINITIONS
 class InputState(TypedDict):
     user_intent: Literal[
@@ -77,6 +104,8 @@ class GraphState(TypedDict):
         "ambiguous",
         "ok"
     ]
+    # Finding from static_analysis, passed to the why_failed prompt ("" if none)
+    static_hint: str
     # NEW: The Memory Log
     messages: Annotated[List[BaseMessage], add_messages]
 
@@ -105,6 +134,7 @@ def setup_node(state: InputState) -> GraphState:
     Creates a complete GraphState with all required fields initialized.
     """
     problem = get_problem_by_id(state["problem_id"])
+    traffic_stats.record(state["problem_id"])
     
     # Get input values
     user_intent = state.get("user_intent") or ""
@@ -139,6 +169,7 @@ def setup_node(state: InputState) -> GraphState:
         "is_valid": True,
         "fallback_message": "",
         "violation_type": "ok",
+        "static_hint": "",
         # NEW: Append user input to history
         "messages": [HumanMessage(content=user_query)]
     }
@@ -156,7 +187,7 @@ AMBIGUOUS_CLARIFY = (
 
 # 5. LLM GUARDRAILS (WITH STRICT FALLBACKS)
 def run_guard_llm(system_prompt: str, user_input: str) -> dict:
-    structured_llm = llm.with_structured_output(GuardDecision)
+    structured_llm = get_llm(temperature=0).with_structured_output(GuardDecision)
     prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", user_input)])
     try:
         result: GuardDecision = (prompt | structured_llm).invoke({})
@@ -211,6 +242,30 @@ If VALID:
     res = run_guard_llm(prompt, f"Query: {state['user_query']}")
     return {**state, **res}
 
+def analyze_why_failed(state: GraphState) -> GraphState:
+    """
+    Local pre-analysis of the submission (syntax, recursion, nested loops vs constraints),
+    after guard_why_failed has accepted it. A confident finding answers right away;
+    otherwise it rides along as a hint.
+    """
+    try:
+        constraints = get_constraints_text(state["problem_id"], state["problem"])
+        result = analyze(state["user_code"], constraints, state["user_query"])
+    except Exception as e:
+        print(f"⚠️ Static analysis failed: {e}")
+        return {**state, "static_hint": ""}
+
+    note("static_analysis", {"finding": result["finding"], "answered": bool(result["answer"])})
+    if result["finding"]:
+        print(f"🔎 Static analysis: {result['finding']} ({'answered' if result['answer'] else 'hint'})")
+    if result["answer"]:
+        return {**state, "answer": result["answer"], "static_hint": result["hint"],
+                "messages": [AIMessage(content=result["answer"])]}
+    return {**state, "static_hint": result["hint"]}
+
+def route_after_analysis(state: GraphState):
+    return "answered" if state["answer"] else "handler"
+
 def guard_why_failed(state: GraphState) -> GraphState:
     # Check if code was provided
     code = state['user_code'].strip()
@@ -417,20 +472,22 @@ def handle_fallback(state: GraphState) -> GraphState:
 build = StateGraph(GraphState, input_schema=InputState, output_schema=OutputState)
 
 build.add_node("setup", setup_node)
+build.add_node("analyze_why_failed", analyze_why_failed)
 
+# Guards and handlers: identical concurrent requests share one run (see singleflight.py)
 # Guards
-build.add_node("guard_how_to_solve", guard_how_to_solve)
-build.add_node("guard_why_failed", guard_why_failed)
-build.add_node("guard_explain_code", guard_explain_code)
-build.add_node("guard_validate", guard_validate_approach)
-build.add_node("guard_clarification", guard_clarification)
+build.add_node("guard_how_to_solve", coalesce("guard_how_to_solve", guard_how_to_solve, GUARD_FIELDS))
+build.add_node("guard_why_failed", coalesce("guard_why_failed", guard_why_failed, GUARD_FIELDS))
+build.add_node("guard_explain_code", coalesce("guard_explain_code", guard_explain_code, GUARD_FIELDS))
+build.add_node("guard_validate", coalesce("guard_validate", guard_validate_approach, GUARD_FIELDS))
+build.add_node("guard_clarification", coalesce("guard_clarification", guard_clarification, GUARD_FIELDS))
 
 # Handlers
-build.add_node("handle_how_to_solve", handle_how_to_solve_this)
-build.add_node("handle_why_failed", handle_why_my_code_failed)
-build.add_node("handle_explain", handle_explain_my_code)
-build.add_node("handle_validate", handle_validate_my_approach)
-build.add_node("handle_clarification", handle_clarification_request)
+build.add_node("handle_how_to_solve", coalesce("handle_how_to_solve", handle_how_to_solve_this, HANDLER_FIELDS))
+build.add_node("handle_why_failed", coalesce("handle_why_failed", handle_why_my_code_failed, HANDLER_FIELDS))
+build.add_node("handle_explain", coalesce("handle_explain", handle_explain_my_code, HANDLER_FIELDS))
+build.add_node("handle_validate", coalesce("handle_validate", handle_validate_my_approach, HANDLER_FIELDS))
+build.add_node("handle_clarification", coalesce("handle_clarification", handle_clarification_request, HANDLER_FIELDS))
 build.add_node("handle_fallback", handle_fallback)
 
 build.add_edge(START, "setup")
@@ -459,14 +516,20 @@ guards_to_handlers = {
     "guard_clarification": "handle_clarification"
 }
 
+# why_my_code_failed: static analysis runs once the guard has accepted the
+# request (no-input / trivial-code / off-topic checks apply to it too)
+guard_targets = {**guards_to_handlers, "guard_why_failed": "analyze_why_failed"}
+
 for guard, handler in guards_to_handlers.items():
     build.add_conditional_edges(
         guard,
         check_validity,
-        {"proceed": handler, "fallback": "handle_fallback"}
+        {"proceed": guard_targets[guard], "fallback": "handle_fallback"}
     )
     build.add_edge(handler, END)
 
+build.add_conditional_edges("analyze_why_failed", route_after_analysis, {"answered": END, "handler": "handle_why_failed"})
+
 build.add_edge("handle_fallback", END)
 
 # 8. COMPILE GRAPH
@@ -484,4 +547,15 @@ build.add_edge("handle_fallback", END)
 
 # graph = build.compile(checkpointer=checkpointer)
 
-graph=build.compile()
\ No newline at end of file
+# Traffic capture (CAPTURE_SAMPLE_RATE) rides on the compiled graph, so every entry point is sampled
+graph=build.compile().with_config(callbacks=[TrafficSampler()])
+
+# 9. WARM-UP (before the server reports ready)
+# WARMUP_TOP_N=0 disables it; WARMUP_PROBLEM_IDS=1,2,3 pins the list
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "0"))
+if WARMUP_TOP_N > 0:
+    warm_up(
+        load_problem=get_problem_by_id,
+        top_n=WARMUP_TOP_N,
+        with_bundles=os.getenv("WARMUP_BUNDLES", "1") == "1",
+    )
\ No newline at end of file
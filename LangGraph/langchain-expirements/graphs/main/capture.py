@@ -0,0 +1,288 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+from rag_layer import ROOT_DIR
+
+# TRAFFIC CAPTURE
+# Samples graph requests into a JSONL log that benchmarks/replay_traffic.py
+# can re-drive. Per request: the (scrubbed) input, arrival time, per-node
+# wall time, every LLM call (node, latency, tokens, scrubbed reply), guard
+# decisions and cache outcomes (singleflight, static analysis, sandbox,
+# precomputed bundles) noted by the nodes themselves.
+#
+# TrafficSampler is attached to the compiled graph (graph.with_config), so
+# every entry point is sampled: the LangGraph server (langgraph.json),
+# prefork_server and direct graph.invoke / stream callers alike.
+#
+# CAPTURE_SAMPLE_RATE=0.05 records 5% of requests (0, the default, is off).
+# CAPTURE_PATH overrides the log location.
+
+SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", "0"))
+CAPTURE_PATH = Path(os.getenv("CAPTURE_PATH") or ROOT_DIR / "captures" / "traffic.jsonl")
+GUARD_DECISION_FIELDS = ("is_valid", "violation_type", "fallback_message")
+
+# The record of the request being captured; LangGraph copies the context into
+# node threads, so nodes can note() into it
+_current: ContextVar[Optional[dict]] = ContextVar("capture_record", default=None)
+
+
+# PII SCRUBBING
+
+SCRUB_PATTERNS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"\b(?:sk|gsk|tvly|pk|rk|ghp|hf|xox[abp])[-_][A-Za-z0-9_-]{12,}"), "<api_key>"),
+    (re.compile(r"(?i)\bbearer\s+[A-Za-z0-9._~+/-]+=*"), "Bearer <token>"),
+    (re.compile(r"(\w+://)[^/\s:@]+:[^/\s@]+@"), r"\1<credentials>@"),
+    (re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b"), "<ip>"),
+]
+# Only for free text: code is full of digit runs (sample inputs) and `token = ...`
+FREE_TEXT_PATTERNS = [
+    (re.compile(r"(?i)\b(password|passwd|pwd|secret|token|api_key)\s*[:=]\s*\S+"), r"\1=<secret>"),
+    (re.compile(r"(?<![\w.])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{3}\)|\d{3})[\s.-]\d{3}[\s.-]\d{4}(?![\w.])"), "<phone>"),
+]
+
+
+def scrub(text: str, free_text: bool = True) -> str:
+    """Mask emails, keys/tokens, URL credentials, IPs (and passwords, phone numbers in free text)."""
+    if not text:
+        return text
+    for pattern, replacement in SCRUB_PATTERNS + (FREE_TEXT_PATTERNS if free_text else []):
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def scrub_input(payload: dict) -> dict:
+    return {
+        "user_intent": payload.get("user_intent"),
+        "user_query": scrub(payload.get("user_query") or ""),
+        "user_code": scrub(payload.get("user_code") or "", free_text=False),
+        "problem_id": payload.get("problem_id"),
+    }
+
+
+# RECORDING
+
+def note(key: str, value):
+    """Record a cache outcome (or similar) for the request being captured; no-op otherwise."""
+    record = _current.get() or _sampled_record()
+    if record is not None:
+        record["cache"][key] = value
+
+
+def _sampled_record() -> Optional[dict]:
+    """The TrafficSampler record of the run this node belongs to (via LangChain's run config)."""
+    from langchain_core.runnables.config import var_child_runnable_config
+    callbacks = (var_child_runnable_config.get() or {}).get("callbacks")
+    handlers = getattr(callbacks, "handlers", None) or (callbacks if isinstance(callbacks, list) else [])
+    for handler in handlers:
+        if isinstance(handler, TrafficSampler):
+            return handler.record_for(getattr(callbacks, "parent_run_id", None))
+    return None
+
+
+class CaptureHandler(BaseCallbackHandler):
+    """Node wall times, LLM calls (latency, tokens, reply) and guard decisions for one request."""
+
+    def __init__(self, record: dict):
+        self.record = record
+        self.started = {}
+        self.llm_started = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # The node's own run, not the runnables it calls (they inherit the metadata)
+        if node and kwargs.get("name") == node:
+            self.started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id not in self.started:
+            return
+        node, start = self.started.pop(run_id)
+        self.record["nodes"][node] = round((time.perf_counter() - start) * 1000, 1)
+        if node.startswith("guard_") and isinstance(outputs, dict):
+            self.record["decisions"][node] = {f: outputs[f] for f in GUARD_DECISION_FIELDS if f in outputs}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self.llm_started[run_id] = ((metadata or {}).get("langgraph_node", ""), time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        if run_id not in self.llm_started:
+            return
+        node, start = self.llm_started.pop(run_id)
+        message = getattr(response.generations[0][0], "message", None) if response.generations and response.generations[0] else None
+        usage = getattr(message, "usage_metadata", None) or {}
+        self.record["llm_calls"].append({
+            "node": node,
+            "ms": round((time.perf_counter() - start) * 1000, 1),
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "content": scrub(message.content if message is not None and isinstance(message.content, str) else ""),
+        })
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        if run_id in self.llm_started:
+            node, start = self.llm_started.pop(run_id)
+            self.record["llm_calls"].append({"node": node, "ms": round((time.perf_counter() - start) * 1000, 1),
+                                             "error": type(error).__name__})
+
+
+class TrafficSampler(BaseCallbackHandler):
+    """
+    Graph-level capture: samples top-level runs at sample_rate and writes
+    each sampled request to path when it ends. Every run under a sampled
+    root is forwarded to that request's CaptureHandler.
+
+    Args:
+        sample_rate: Fraction of requests to record (default CAPTURE_SAMPLE_RATE)
+        path: Log file (default CAPTURE_PATH)
+    """
+
+    run_inline = True  # keep start/end order under async entry points
+
+    def __init__(self, sample_rate: float = None, path: Path = None):
+        self.sample_rate = SAMPLE_RATE if sample_rate is None else sample_rate
+        self.path = path
+        self.lock = threading.Lock()
+        self.requests = {}  # root run_id -> (record, CaptureHandler, start)
+        self.roots = {}     # run_id -> root run_id, for runs under a sampled root
+
+    def record_for(self, run_id) -> Optional[dict]:
+        with self.lock:
+            request = self.requests.get(self.roots.get(run_id))
+        return request[0] if request else None
+
+    def _start(self, run_id, parent_run_id, inputs) -> Optional[CaptureHandler]:
+        with self.lock:
+            if parent_run_id is not None:
+                root = self.roots.get(parent_run_id)
+                if root is None:
+                    return None
+                self.roots[run_id] = root
+                request = self.requests.get(root)
+                return request[1] if request else None
+        # A new request; invoke_recording (replay) records its own
+        if _current.get() is not None or self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        record = new_record(inputs if isinstance(inputs, dict) else {})
+        with self.lock:
+            self.requests[run_id] = (record, CaptureHandler(record), time.perf_counter())
+            self.roots[run_id] = run_id
+        return None
+
+    def _end(self, run_id, outputs=None, error=None) -> Optional[CaptureHandler]:
+        with self.lock:
+            root = self.roots.pop(run_id, None)
+            if root is None:
+                return None
+            if root != run_id:
+                request = self.requests.get(root)
+                return request[1] if request else None
+            record, _, start = self.requests.pop(root)
+        finish_record(record, start, outputs if isinstance(outputs, dict) else None, error)
+        write_record(record, self.path)
+        return None
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        handler = self._start(run_id, parent_run_id, inputs)
+        if handler is not None:
+            handler.on_chain_start(serialized, inputs, run_id=run_id, parent_run_id=parent_run_id, **kwargs)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        handler = self._end(run_id, outputs=outputs)
+        if handler is not None:
+            handler.on_chain_end(outputs, run_id=run_id, **kwargs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, None)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        handler = self._start(run_id, parent_run_id, None)
+        if handler is not None:
+            handler.on_chat_model_start(serialized, messages, run_id=run_id, **kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        handler = self._end(run_id)
+        if handler is not None:
+            handler.on_llm_end(response, run_id=run_id, **kwargs)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        handler = self._end(run_id)
+        if handler is not None:
+            handler.on_llm_error(error, run_id=run_id, **kwargs)
+
+
+_write_lock = threading.Lock()
+
+
+def write_record(record: dict, path: Path = None):
+    path = Path(path or CAPTURE_PATH)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with _write_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError as e:
+        print(f"⚠️ Could not write capture record: {e}")
+
+
+def new_record(payload: dict) -> dict:
+    return {
+        "ts": time.time(), "pid": os.getpid(), "input": scrub_input(payload),
+        "total_ms": None, "nodes": {}, "llm_calls": [], "decisions": {}, "cache": {},
+        "tokens": {"input": 0, "output": 0}, "answer_chars": 0, "error": None,
+    }
+
+
+def finish_record(record: dict, start: float, result: Optional[dict], error: Optional[BaseException]):
+    record["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    record["tokens"] = {
+        "input": sum(c.get("input_tokens", 0) for c in record["llm_calls"]),
+        "output": sum(c.get("output_tokens", 0) for c in record["llm_calls"]),
+    }
+    record["answer_chars"] = len((result or {}).get("answer", "") or "")
+    if error is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+
+
+def invoke_recording(graph, payload: dict, config: Optional[dict] = None) -> tuple:
+    """
+    graph.invoke(payload) with a capture record (not written anywhere).
+
+    Returns:
+        (result or None, record, exception or None)
+    """
+    record = new_record(payload)
+    config = dict(config or {})
+    config["callbacks"] = [*(config.get("callbacks") or []), CaptureHandler(record)]
+    token = _current.set(record)
+    start = time.perf_counter()
+    result, error = None, None
+    try:
+        result = graph.invoke(payload, config=config)
+    except Exception as e:
+        error = e
+    finally:
+        _current.reset(token)
+    finish_record(record, start, result, error)
+    return result, record, error
@@ -0,0 +1,177 @@
+import ast
+import hashlib
+import re
+from functools import lru_cache
+
+# CODE FINGERPRINT
+# Stable identity for a code submission, used in cache/coalescing keys so
+# formatting, comments and variable names don't split identical requests.
+#   Python: parsed with ast; comments, formatting and docstrings vanish and
+#           the names the submission binds are renamed to $0, $1, ... in
+#           order of first appearance ($ can't occur in a Python name, so a
+#           renamed name never meets one from the source). Names that are
+#           also spelled out elsewhere keep their spelling: attributes
+#           (obj.name), keyword arguments (f(name=...)), anything bound in
+#           a class body and dunders. Programs that only differ in
+#           variable names merge; programs that look names up by string
+#           (globals()["x"], getattr(obj, "x"), **kwargs keys) can still
+#           collide.
+#   Other languages / code that doesn't parse: tokens with comments and
+#           whitespace dropped. No renaming here - without scopes it could
+#           merge programs that differ.
+
+class _BoundNames(ast.NodeVisitor):
+    """Names the submission itself binds (assignments, params, defs, loop/with targets)."""
+
+    def __init__(self):
+        self.order = []
+        self.seen = set()
+        self.pinned = set()  # spelled out as attributes, keyword arguments or class members
+
+    def renamable(self) -> list:
+        return [n for n in self.order if n not in self.pinned and not (n.startswith("__") and n.endswith("__"))]
+
+    def _add(self, name: str):
+        if name not in self.seen:
+            self.seen.add(name)
+            self.order.append(name)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, (ast.Store, ast.Del)):
+            self._add(node.id)
+
+    def visit_arg(self, node):
+        self._add(node.arg)
+        self.generic_visit(node)
+
+    def _visit_def(self, node):
+        self._add(node.name)
+        self.generic_visit(node)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = _visit_def
+
+    def visit_ClassDef(self, node):
+        # Class members are reached as attributes (or implicitly, like __eq__)
+        for statement in node.body:
+            if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.pinned.add(statement.name)
+            elif isinstance(statement, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+                self.pinned.update(n.id for n in ast.walk(statement) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store))
+        self._visit_def(node)
+
+    def visit_Attribute(self, node):
+        self.pinned.add(node.attr)
+        self.generic_visit(node)
+
+    def visit_keyword(self, node):
+        if node.arg:
+            self.pinned.add(node.arg)
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self._add(node.name)
+        self.generic_visit(node)
+
+
+class _Renamer(ast.NodeTransformer):
+    def __init__(self, mapping: dict):
+        self.mapping = mapping
+
+    def visit_Name(self, node):
+        node.id = self.mapping.get(node.id, node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self.mapping.get(node.arg, node.arg)
+        self.generic_visit(node)
+        return node
+
+    def _visit_def(self, node):
+        node.name = self.mapping.get(node.name, node.name)
+        # Docstrings don't change behaviour
+        if node.body and isinstance(node.body[0], ast.Expr) and isinstance(getattr(node.body[0], "value", None), ast.Constant) \
+                and isinstance(node.body[0].value.value, str) and len(node.body) > 1:
+            node.body = node.body[1:]
+        self.generic_visit(node)
+        return node
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _visit_def
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            node.name = self.mapping.get(node.name, node.name)
+        self.generic_visit(node)
+        return node
+
+    def visit_Global(self, node):
+        node.names = [self.mapping.get(n, n) for n in node.names]
+        return node
+
+    visit_Nonlocal = visit_Global
+
+
+def python_canonical(code: str, rename: bool = True) -> str:
+    """ast dump of the (alpha-renamed) module; raises SyntaxError if it isn't Python."""
+    tree = ast.parse(code)
+    mapping = {}
+    if rename:
+        collector = _BoundNames()
+        collector.visit(tree)
+        # Shadowed builtins are renamed too (the binding is the submission's own)
+        mapping = {name: f"${i}" for i, name in enumerate(collector.renamable())}
+    tree = _Renamer(mapping).visit(tree)
+    if tree.body and isinstance(tree.body[0], ast.Expr) and isinstance(getattr(tree.body[0], "value", None), ast.Constant) \
+            and isinstance(tree.body[0].value.value, str):
+        tree.body = tree.body[1:]  # module docstring
+    return ast.dump(tree, annotate_fields=False, include_attributes=False)
+
+
+_TOKEN = re.compile(
+    r'"(?:\\.|[^"\\\n])*"'        # "string"
+    r"|'(?:\\.|[^'\\\n])*'"       # 'string' / char
+    r"|/\*.*?\*/"                 # /* block comment */
+    r"|//[^\n]*"                  # // line comment
+    r"|#[^\n]*"                   # # comment or preprocessor line
+    r"|\w+"                       # identifiers, keywords, numbers
+    r"|(?:(?!//|/\*)[^\w\s\"'#])+"   # operator runs (i++ + j != i + ++j)
+    r"|\S",
+    re.S,
+)
+_PREPROCESSOR = re.compile(r"#\s*(include|define|undef|if|ifdef|ifndef|elif|else|endif|pragma|error|import)\b")
+
+
+def token_canonical(code: str) -> str:
+    """Tokens without comments or whitespace; preprocessor lines are kept."""
+    tokens = []
+    for token in _TOKEN.findall(code):
+        if token.startswith(("/*", "//")):
+            continue
+        if token.startswith("#"):
+            if not _PREPROCESSOR.match(token):
+                continue
+            token = " ".join(token.split())
+        tokens.append(token)
+    return " ".join(tokens)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(code: str, rename: bool = True) -> str:
+    """
+    Stable hash of a submission.
+
+    Args:
+        code: The user's code (any language)
+        rename: Alpha-rename Python names. Turn it off where the result
+            quotes the code back (handler answers mention variable names).
+
+    Returns:
+        "py:<hash>" for Python that parses, "tok:<hash>" otherwise, "" for no code
+    """
+    if not code or not code.strip():
+        return ""
+    try:
+        kind, canonical = "py", python_canonical(code, rename)
+    except (SyntaxError, ValueError, RecursionError):
+        kind, canonical = "tok", token_canonical(code)
+    return f"{kind}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:20]}"
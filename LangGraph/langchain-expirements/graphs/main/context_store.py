@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Optional, List, Dict
+
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+from rag_layer import retriever, INTENT_TO_SECTIONS, ROOT_DIR, format_context, content_hash
+
+# BUNDLED INTENTS
+# Intents whose context barely depends on the query. For these we
+# precompute the context block once per problem at ingestion time and
+# skip embedding + ANN search on the request path.
+# Value = how many chunks the handler would have kept anyway.
+BUNDLE_INTENTS = {
+    "clarification_request": 2,
+    "how_to_solve_this": 3,
+}
+
+
+def _config_hash(intent: str) -> str:
+    """Hash of the selection rules, so editing them invalidates old bundles."""
+    payload = json.dumps([INTENT_TO_SECTIONS[intent], BUNDLE_INTENTS[intent]])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def select_bundle_chunks(chunks: List[dict], intent: str) -> List[dict]:
+    """
+    Pick the chunks for an intent without a query.
+
+    Chunks are ranked by the position of their section in
+    INTENT_TO_SECTIONS (so "Problem Description" beats "Observation"),
+    then by insertion order.
+
+    Args:
+        chunks: All chunks of a problem
+        intent: One of BUNDLE_INTENTS
+
+    Returns:
+        At most BUNDLE_INTENTS[intent] chunks
+    """
+    allowed_sections = [s.lower() for s in INTENT_TO_SECTIONS[intent]]
+    ranked = []
+    seen_content = set()
+    for position, chunk in enumerate(chunks):
+        # Some problems were ingested more than once - skip repeated chunks
+        content = chunk["content"].strip()
+        if content in seen_content:
+            continue
+        seen_content.add(content)
+        section = chunk["section"].lower()
+        matches = [rank for rank, keyword in enumerate(allowed_sections) if keyword in section]
+        if matches:
+            ranked.append((min(matches), position, chunk))
+    ranked.sort(key=lambda x: (x[0], x[1]))
+    return [chunk for _, _, chunk in ranked[:BUNDLE_INTENTS[intent]]]
+
+
+# CONTEXT STORE
+
+class ContextStore:
+    """Precomputed per-(problem_id, intent) context bundles, persisted as JSON."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else ROOT_DIR / "context_bundles.json"
+        self.problems: Dict[str, dict] = {}
+        self._loaded_mtime = None
+
+    def _reload_if_changed(self):
+        """Pick up bundles rebuilt by an ingestion job in another process."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            self.problems = {}
+            self._loaded_mtime = None
+            return
+        if mtime != self._loaded_mtime:
+            with open(self.path, encoding="utf-8") as f:
+                self.problems = json.load(f).get("problems", {})
+            self._loaded_mtime = mtime
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "problems": self.problems}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)  # atomic, readers never see half a file
+        self._loaded_mtime = os.stat(self.path).st_mtime
+
+    def get_bundle(self, problem_id: int, intent: str) -> Optional[dict]:
+        """
+        Return the precomputed bundle for (problem_id, intent): its "chunks"
+        and "context_text", the rendered context block for the prompt.
+
+        Returns None when there is no valid bundle, so the caller falls
+        back to normal retrieval.
+        """
+        if intent not in BUNDLE_INTENTS:
+            return None
+        try:
+            self._reload_if_changed()
+        except Exception as e:
+            print(f"Context store error: {e}")
+            return None
+
+        bundle = self.problems.get(str(problem_id), {}).get("bundles", {}).get(intent)
+        if not bundle or bundle["config_hash"] != _config_hash(intent):
+            return None
+        return bundle
+
+    def get_chunks(self, problem_id: int, intent: str) -> Optional[List[dict]]:
+        """The precomputed chunks for (problem_id, intent), or None (see get_bundle)."""
+        bundle = self.get_bundle(problem_id, intent)
+        return bundle["chunks"] if bundle else None
+
+    def refresh(self, problem_id: int, force: bool = False) -> bool:
+        """
+        Rebuild a problem's bundles if its content changed.
+
+        Call this at the end of ingestion for every (re)ingested problem.
+
+        Returns:
+            True if bundles were rebuilt, False if they were already current
+        """
+        self._reload_if_changed()
+        chunks = retriever.get_all_chunks(problem_id)
+        if not chunks:
+            # Problem removed (or empty) - drop stale bundles
+            if self.problems.pop(str(problem_id), None) is not None:
+                self._save()
+            return False
+
+        new_hash = content_hash(chunks)
+        entry = self.problems.get(str(problem_id))
+        config_hashes = {intent: _config_hash(intent) for intent in BUNDLE_INTENTS}
+        if (
+            not force and entry
+            and entry["content_hash"] == new_hash
+            and all(entry["bundles"].get(i, {}).get("config_hash") == h for i, h in config_hashes.items())
+        ):
+            return False
+
+        bundles = {}
+        for intent in BUNDLE_INTENTS:
+            selected = select_bundle_chunks(chunks, intent)
+            bundles[intent] = {
+                "config_hash": config_hashes[intent],
+                "chunks": selected,
+                "context_text": format_context(selected),
+            }
+        self.problems[str(problem_id)] = {"content_hash": new_hash, "bundles": bundles}
+        self._save()
+        return True
+
+    def refresh_all(self, problem_ids: Optional[List[int]] = None, force: bool = False) -> List[int]:
+        """Refresh bundles for the given problems (default: every collection)."""
+        if problem_ids is None:
+            problem_ids = retriever.list_problem_ids()
+        rebuilt = [pid for pid in problem_ids if self.refresh(pid, force=force)]
+        print(f"📦 Context bundles: rebuilt {len(rebuilt)}/{len(problem_ids)} problems -> {self.path}")
+        return rebuilt
+
+
+context_store = ContextStore()
+
+
+if __name__ == "__main__":
+    # Usage: python context_store.py [--force] [problem_id ...]
+    args = sys.argv[1:]
+    force = "--force" in args
+    ids = [int(a) for a in args if a != "--force"] or None
+    context_store.refresh_all(ids, force=force)
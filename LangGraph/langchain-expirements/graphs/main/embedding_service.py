@@ -0,0 +1,224 @@
+"""
+Local embedding service shared by the tutor graph, ingestion jobs and experiments.
+
+One process holds the sentence-transformers model. Clients connect over a
+Unix socket (or localhost TCP) and send newline-delimited JSON; concurrent
+requests are micro-batched into single model passes.
+
+    python embedding_service.py                       # unix socket at ./embedding.sock
+    python embedding_service.py --tcp 127.0.0.1:8765  # or TCP
+
+Clients use EmbeddingServiceClient as a drop-in embedding_function:
+
+    ChromaRetriever(embedding_function=EmbeddingServiceClient())
+
+The graph picks it up automatically when EMBEDDING_SERVICE is set
+(socket path or host:port).
+
+Protocol (one JSON object per line):
+    -> {"id": 1, "texts": ["..."]}
+    <- {"id": 1, "embeddings": [[...]]}   or   {"id": 1, "error": "..."}
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# Must match rag_layer.EMBEDDING_MODEL_NAME (not imported: that module loads its own model)
+DEFAULT_MODEL_NAME = "all-mpnet-base-v2"
+DEFAULT_SOCKET = Path(__file__).parent.parent.parent / "embedding.sock"  # langchain-expirements/
+
+
+# SERVER
+
+class MicroBatcher:
+    """Collects concurrent requests and runs them as one model pass."""
+
+    def __init__(self, model, max_batch: int = 64, max_wait_ms: float = 5):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.stats = {"requests": 0, "texts": 0, "batches": 0}
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Block for the first request, then gather more until full or timed out
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            all_texts = [text for texts, _ in batch for text in texts]
+            try:
+                # Model pass off the event loop; one at a time (default executor + await)
+                vectors = await loop.run_in_executor(None, self.model.embed_documents, all_texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+            self.stats["requests"] += len(batch)
+            self.stats["texts"] += len(all_texts)
+            self.stats["batches"] += 1
+
+
+async def _handle_client(batcher: MicroBatcher, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            request = json.loads(line)
+            try:
+                if request.get("stats"):
+                    response = {"id": request.get("id"), "stats": batcher.stats}
+                else:
+                    response = {"id": request.get("id"), "embeddings": await batcher.embed(request["texts"])}
+            except Exception as e:
+                response = {"id": request.get("id"), "error": str(e)}
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+    except (ConnectionError, json.JSONDecodeError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(socket_path: Optional[str], tcp: Optional[str], model_name: str, max_batch: int, max_wait_ms: float):
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    started = time.perf_counter()
+    model = HuggingFaceEmbeddings(model_name=model_name)
+    model.embed_documents(["warm up"])
+    batcher = MicroBatcher(model, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    batch_task = asyncio.create_task(batcher.run())  # keep a reference so it isn't collected
+
+    handler = lambda r, w: _handle_client(batcher, r, w)
+    if tcp:
+        host, port = tcp.rsplit(":", 1)
+        server = await asyncio.start_server(handler, host, int(port), limit=2 ** 26)
+        where = tcp
+    else:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(handler, socket_path, limit=2 ** 26)
+        where = socket_path
+    print(f"🧠 Embedding service ({model_name}) ready on {where} in {time.perf_counter() - started:.1f}s", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+# CLIENT
+
+class EmbeddingServiceClient(Embeddings):
+    """
+    LangChain Embeddings backed by the embedding service.
+
+    Thread-safe: each thread keeps its own persistent connection.
+
+    Args:
+        address: Unix socket path or "host:port" (default: EMBEDDING_SERVICE env, then ./embedding.sock)
+        timeout: Socket timeout in seconds
+    """
+
+    def __init__(self, address: Optional[str] = None, timeout: float = 60):
+        self.address = address or os.getenv("EMBEDDING_SERVICE") or str(DEFAULT_SOCKET)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        if ":" in self.address and not os.path.exists(self.address):
+            host, port = self.address.rsplit(":", 1)
+            sock = socket.create_connection((host, int(port)), timeout=self.timeout)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.address)
+        self._local.sock = sock
+        self._local.file = sock.makefile("rb")
+        self._local.next_id = 0
+
+    def _close(self):
+        """Close this thread's connection (the next request reconnects)."""
+        for name in ("file", "sock"):
+            handle = getattr(self._local, name, None)
+            if handle is not None:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+            setattr(self._local, name, None)
+
+    def _request(self, payload: dict) -> dict:
+        for attempt in range(2):
+            try:
+                if getattr(self._local, "sock", None) is None:
+                    self._connect()
+                self._local.next_id += 1
+                payload["id"] = self._local.next_id
+                self._local.sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+                line = self._local.file.readline()
+                if not line:
+                    raise ConnectionError("embedding service closed the connection")
+                response = json.loads(line)
+                break
+            except (OSError, ValueError):
+                # Stale connection (service restarted) or a garbled reply that
+                # leaves the stream out of step - close it and reconnect once
+                self._close()
+                if attempt == 1:
+                    raise
+        if "error" in response:
+            raise RuntimeError(f"Embedding service error: {response['error']}")
+        return response
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._request({"texts": list(texts)})["embeddings"]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        return self._request({"stats": True})["stats"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local micro-batching embedding service")
+    parser.add_argument("--socket", default=str(DEFAULT_SOCKET))
+    parser.add_argument("--tcp", help="host:port to listen on instead of a unix socket")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket, args.tcp, args.model, args.max_batch, args.max_wait_ms))
@@ -3,17 +3,17 @@ from pathlib import Path
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 from rag_layer import (
-    retriever, INTENT_TO_SECTIONS, filter_by_section, 
-    build_prompt
+    retrieve_for_intent,
+    build_prompt_messages
 )
-from langchain_groq import ChatGroq
+from context_store import context_store
+from sandbox import run_samples, format_report
+from capture import note
+from llm_factory import get_llm
 from langchain_core.messages import AIMessage
-import os
-from dotenv import load_dotenv
-load_dotenv()
-# LLM 
-GROQ_KEY = os.getenv("GROQ_API_KEY")
-llm = ChatGroq(api_key=GROQ_KEY, model_name="llama-3.1-8b-instant", temperature=0.5)
+# LLM (built on the first handler call)
+def handler_llm():
+    return get_llm(temperature=0.5)
 
 # HANDLER 1: why_my_code_failed (FULL EXAMPLE)
 def handle_why_my_code_failed_with_rag(state) -> dict:
@@ -21,7 +21,8 @@ def handle_why_my_code_failed_with_rag(state) -> dict:
     Debug handler: Identify bug, explain cause, guide fix.
     
     Flow:
-    1. Retrieve all relevant chunks
+    0. Run the code on the sample tests in the sandbox
+    1. Retrieve all relevant chunks (skipped when step 0 or static analysis found the bug)
     2. Filter to edge cases + pitfalls + failure scenarios
     3. Build debug-focused prompt
     4. LLM analyzes their code against these patterns
@@ -33,37 +34,53 @@ def handle_why_my_code_failed_with_rag(state) -> dict:
     user_code = state["user_code"]
     problem = state["problem"]
     
-    # STEP 1: Retrieve relevant chunks
-    # Search for their issue in the knowledge base
-    all_chunks = retriever.retrieve(
-        problem_id=problem_id,
-        query=f"{user_query}\n\nCode:\n{user_code}",  # Query includes context
-        k=10  # Get more, then filter
-    )
-    
-    # STEP 2: Filter to intent-specific sections
-    allowed_sections = INTENT_TO_SECTIONS["why_my_code_failed"]
-    filtered_chunks = filter_by_section(all_chunks, allowed_sections)
+    static_hint = state.get("static_hint", "")
     
-    # Log for debugging
-    print(f"[DEBUG] why_failed: Retrieved {len(all_chunks)} chunks, filtered to {len(filtered_chunks)}")
-    if filtered_chunks:
-        print(f"[DEBUG] Top sections: {[c['section'] for c in filtered_chunks[:3]]}")
+    # STEP 0: Run the code on the sample tests (sandboxed) - an observed failure beats a guess
+    try:
+        samples = run_samples(user_code, problem_id, problem)
+        test_report = format_report(samples)
+        print(f"[DEBUG] why_failed: samples {samples['status']} ({samples['passed']}/{samples['total']}, {samples['ms']}ms) {samples['reason']}")
+    except Exception as e:
+        print(f"⚠️ Sandbox run failed: {e}")
+        samples, test_report = {"status": "skipped"}, ""
+    note("sandbox", samples["status"])
+    
+    # STEP 1 + 2: Retrieve relevant chunks, filtered to intent-specific sections
+    # Search for their issue in the knowledge base (k widens only if too few survive the filter)
+    # A static analysis finding or a failing sample already points at the bug, so retrieval is skipped
+    if static_hint or samples["status"] == "failed":
+        all_chunks, filtered_chunks = [], []
+        print(f"[DEBUG] why_failed: skipping retrieval: {static_hint or 'failing sample test'}")
+        note("retrieval", "skipped")
+    else:
+        all_chunks, filtered_chunks = retrieve_for_intent(
+            problem_id=problem_id,
+            intent="why_my_code_failed",
+            query=f"{user_query}\n\nCode:\n{user_code}"  # Query includes context
+        )
+    
+        # Log for debugging
+        print(f"[DEBUG] why_failed: Retrieved {len(all_chunks)} chunks, filtered to {len(filtered_chunks)}")
+        if filtered_chunks:
+            print(f"[DEBUG] Top sections: {[c['section'] for c in filtered_chunks[:3]]}")
     
     # STEP 3: Build the prompt (now with conversation context if available)
     conversation_context = state.get("messages", [])
-    prompt_text = build_prompt(
+    prompt_messages = build_prompt_messages(
         intent="why_my_code_failed",
         problem=problem,
         user_query=user_query,
         user_code=user_code,
         context_chunks=filtered_chunks,
-        conversation_context=conversation_context
+        conversation_context=conversation_context,
+        static_hint=static_hint,
+        test_report=test_report
     )
     
     # STEP 4: Call LLM
     try:
-        response = llm.invoke(prompt_text)
+        response = handler_llm().invoke(prompt_messages)
         answer = response.content
     except Exception as e:
         answer = f"Error analyzing your code: {str(e)}\n\nTry describing the error you're seeing (TLE, WA, RE, etc.)"
@@ -77,7 +94,7 @@ def handle_how_to_solve_this_with_rag(state) -> dict:
     Hint handler: Provide progressive hints without giving solution.
     
     Flow:
-    1. Retrieve approach/intuition sections
+    1. Load precomputed approach/intuition sections (or retrieve them)
     2. Build hint-focused prompt
     3. LLM provides Socratic hints
     """
@@ -86,33 +103,37 @@ def handle_how_to_solve_this_with_rag(state) -> dict:
     user_query = state["user_query"]
     problem = state["problem"]
     
-    # Retrieve approach/intuition chunks
-    all_chunks = retriever.retrieve(
-        problem_id=problem_id,
-        query=user_query,
-        k=8
-    )
-    
-    # Filter to approach/intuition sections
-    allowed_sections = INTENT_TO_SECTIONS["how_to_solve_this"]
-    filtered_chunks = filter_by_section(all_chunks, allowed_sections)
-    
-    print(f"[DEBUG] how_to_solve: Retrieved {len(all_chunks)} chunks, filtered to {len(filtered_chunks)}")
+    # Approach/intuition barely depends on the query: use the precomputed bundle if there is one
+    bundle = context_store.get_bundle(problem_id, "how_to_solve_this")
+    note("context_bundle", "hit" if bundle is not None else "miss")
+    if bundle is not None:
+        filtered_chunks = bundle["chunks"]
+        print(f"[DEBUG] how_to_solve: Using precomputed bundle ({len(filtered_chunks)} chunks)")
+    else:
+        # Retrieve approach/intuition chunks, filtered to approach/intuition sections
+        all_chunks, filtered_chunks = retrieve_for_intent(
+            problem_id=problem_id,
+            intent="how_to_solve_this",
+            query=user_query
+        )
+        
+        print(f"[DEBUG] how_to_solve: Retrieved {len(all_chunks)} chunks, filtered to {len(filtered_chunks)}")
     
     # Build prompt with conversation context
     conversation_context = state.get("messages", [])
-    prompt_text = build_prompt(
+    prompt_messages = build_prompt_messages(
         intent="how_to_solve_this",
         problem=problem,
         user_query=user_query,
         user_code=None,
         context_chunks=filtered_chunks,
-        conversation_context=conversation_context
+        conversation_context=conversation_context,
+        context_text=bundle.get("context_text") if bundle else None
     )
     
     # Call LLM
     try:
-        response = llm.invoke(prompt_text)
+        response = handler_llm().invoke(prompt_messages)
         answer = response.content
     except Exception as e:
         answer = f"Error generating hint: {str(e)}\n\nTry asking about a specific part of the problem."
@@ -136,22 +157,18 @@ def handle_explain_my_code_with_rag(state) -> dict:
     user_code = state["user_code"]
     problem = state["problem"]
     
-    # Retrieve code + complexity sections
-    all_chunks = retriever.retrieve(
+    # Retrieve code + complexity sections, filtered to code + explanation sections
+    all_chunks, filtered_chunks = retrieve_for_intent(
         problem_id=problem_id,
-        query=user_code,  # Search by their code
-        k=8
+        intent="explain_my_code",
+        query=user_code  # Search by their code
     )
     
-    # Filter to code + explanation sections
-    allowed_sections = INTENT_TO_SECTIONS["explain_my_code"]
-    filtered_chunks = filter_by_section(all_chunks, allowed_sections)
-    
     print(f"[DEBUG] explain_code: Retrieved {len(all_chunks)} chunks, filtered to {len(filtered_chunks)}")
     
     # Build prompt with conversation context
     conversation_context = state.get("messages", [])
-    prompt_text = build_prompt(
+    prompt_messages = build_prompt_messages(
         intent="explain_my_code",
         problem=problem,
         user_query=user_query or "Please explain my code",
@@ -162,7 +179,7 @@ def handle_explain_my_code_with_rag(state) -> dict:
     
     # Call LLM
     try:
-        response = llm.invoke(prompt_text)
+        response = handler_llm().invoke(prompt_messages)
         answer = response.content
     except Exception as e:
         answer = f"Error explaining code: {str(e)}\n\nTry asking about a specific part of your code."
@@ -189,21 +206,18 @@ def handle_validate_my_approach_with_rag(state) -> dict:
     # Search by their code or query
     search_text = user_code if user_code else user_query
     
-    all_chunks = retriever.retrieve(
+    # Retrieve, filtered to validation-relevant sections
+    all_chunks, filtered_chunks = retrieve_for_intent(
         problem_id=problem_id,
-        query=search_text,
-        k=10
+        intent="validate_my_approach",
+        query=search_text
     )
     
-    # Filter to validation-relevant sections
-    allowed_sections = INTENT_TO_SECTIONS["validate_my_approach"]
-    filtered_chunks = filter_by_section(all_chunks, allowed_sections)
-    
     print(f"[DEBUG] validate: Retrieved {len(all_chunks)} chunks, filtered to {len(filtered_chunks)}")
     
     # Build prompt with conversation context
     conversation_context = state.get("messages", [])
-    prompt_text = build_prompt(
+    prompt_messages = build_prompt_messages(
         intent="validate_my_approach",
         problem=problem,
         user_query=user_query or "Is my approach correct?",
@@ -214,7 +228,7 @@ def handle_validate_my_approach_with_rag(state) -> dict:
     
     # Call LLM
     try:
-        response = llm.invoke(prompt_text)
+        response = handler_llm().invoke(prompt_messages)
         answer = response.content
     except Exception as e:
         answer = f"Error validating approach: {str(e)}\n\nTry sharing your approach idea or code."
@@ -228,7 +242,7 @@ def handle_clarification_request_with_rag(state) -> dict:
     Clarification handler: Answer factual questions about problem.
     
     Flow:
-    1. Retrieve problem description + constraints
+    1. Load precomputed problem description + constraints (or retrieve them)
     2. Build factual clarification prompt
     3. LLM answers directly without opinion
     """
@@ -237,35 +251,40 @@ def handle_clarification_request_with_rag(state) -> dict:
     user_query = state["user_query"]
     problem = state["problem"]
     
-    all_chunks = retriever.retrieve(
-        problem_id=problem_id,
-        query=user_query,
-        k=8
-    )
-    
-    # Filter to problem statement sections
-    allowed_sections = INTENT_TO_SECTIONS["clarification_request"]
-    filtered_chunks = filter_by_section(all_chunks, allowed_sections)
-    
-    # Clarification only needs 1-2 chunks (not deep reasoning, just facts)
-    filtered_chunks = filtered_chunks[:2]
-    
-    print(f"[DEBUG] clarification: Retrieved {len(all_chunks)} chunks, filtered to {len(filtered_chunks)}")
+    # Problem statement chunks don't depend on the query: skip embedding + search when bundled
+    bundle = context_store.get_bundle(problem_id, "clarification_request")
+    note("context_bundle", "hit" if bundle is not None else "miss")
+    if bundle is not None:
+        filtered_chunks = bundle["chunks"]
+        print(f"[DEBUG] clarification: Using precomputed bundle ({len(filtered_chunks)} chunks)")
+    else:
+        # Retrieve, filtered to problem statement sections
+        all_chunks, filtered_chunks = retrieve_for_intent(
+            problem_id=problem_id,
+            intent="clarification_request",
+            query=user_query
+        )
+        
+        # Clarification only needs 1-2 chunks (not deep reasoning, just facts)
+        filtered_chunks = filtered_chunks[:2]
+        
+        print(f"[DEBUG] clarification: Retrieved {len(all_chunks)} chunks, filtered to {len(filtered_chunks)}")
     
     # Build prompt with conversation context
     conversation_context = state.get("messages", [])
-    prompt_text = build_prompt(
+    prompt_messages = build_prompt_messages(
         intent="clarification_request",
         problem=problem,
         user_query=user_query,
         user_code=None,
         context_chunks=filtered_chunks,
-        conversation_context=conversation_context
+        conversation_context=conversation_context,
+        context_text=bundle.get("context_text") if bundle else None
     )
     
     # Call LLM
     try:
-        response = llm.invoke(prompt_text)
+        response = handler_llm().invoke(prompt_messages)
         answer = response.content
     except Exception as e:
         answer = f"Error clarifying: {str(e)}\n\nTry asking about problem constraints or definitions."
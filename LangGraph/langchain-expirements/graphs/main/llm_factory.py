@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+# Repo root, for the shared model registry (Models/registry.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from Models.registry import get_model
+
+# LLM CLIENTS
+# Thin wrapper over the shared registry: clients are built on first use, one
+# per temperature, so importing the graph (warm-up, benchmarks, replay with
+# fake LLMs) neither imports langchain_groq nor needs GROQ_API_KEY. The model
+# is configured in Models/models.json like everywhere else.
+
+
+def get_llm(temperature: float = 0):
+    """
+    Shared Groq client for a temperature, built on the first call.
+
+    Args:
+        temperature: Sampling temperature (guards use 0, handlers 0.5)
+
+    Returns:
+        The chat model client
+    """
+    return get_model("groq", temperature=temperature)
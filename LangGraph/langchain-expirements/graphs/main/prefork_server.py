@@ -0,0 +1,166 @@
+"""
+Prefork HTTP server for the LearnWithAI graph.
+
+The parent imports the graph (embedding model, retriever, NumPy snapshots,
+hot problem rows) once, then forks N workers that accept on the same
+listening socket. Workers share those pages copy-on-write instead of each
+loading its own ~400 MB model copy.
+
+    python prefork_server.py --workers 4 --port 8123 --preload 10
+
+Endpoints:
+    POST /invoke    body = InputState JSON -> {"answer": ...}
+    POST /retrieve  {"problem_id", "query", "k"} -> chunks (retrieval only)
+    GET  /health    {"status", "pid", "rss_mb", "singleflight"}
+
+Use RAG_BACKEND=numpy for the read-only index: mmapped snapshots are
+fork-safe and shared, while Chroma handles are reopened per worker.
+
+CAPTURE_SAMPLE_RATE=0.05 logs 5% of graph requests (see capture.py) for
+benchmarks/replay_traffic.py.
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+# Warm-up is driven from here (without a model pass, see _init_worker), not at import
+os.environ["WARMUP_TOP_N"] = "0"
+from LearnWithAI_ import graph, engine, get_problem_by_id
+from rag_layer import retriever
+from warmup import warm_up, rss_mb
+from singleflight import flight
+
+
+class TutorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {
+                "status": "ok", "pid": os.getpid(), "rss_mb": round(rss_mb(), 1),
+                "singleflight": flight.metrics(),
+            })
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/invoke":
+                result = graph.invoke(payload)
+                self._send_json(200, {"answer": result.get("answer", "")})
+            elif self.path == "/retrieve":
+                chunks = retriever.retrieve(payload["problem_id"], payload["query"], k=payload.get("k", 5))
+                self._send_json(200, {"chunks": chunks})
+            else:
+                self._send_json(404, {"error": "not found"})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        pass  # one line per request is too noisy under load
+
+
+def _init_worker(threads: int):
+    """Per-worker setup right after fork."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    engine.dispose(close=False)  # don't reuse the parent's DB connections
+    retriever.after_fork()
+
+    # The model is first *used* here, not in the parent: an OpenMP pool
+    # started before fork can deadlock in the children.
+    import torch
+    torch.set_num_threads(threads)
+    retriever.embeddings.embed_query("warm up")
+
+
+def _run_worker(listen_sock: socket.socket, threads: int):
+    _init_worker(threads)
+    server = ThreadingHTTPServer(listen_sock.getsockname()[:2], TutorHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = listen_sock
+    print(f"👷 Worker {os.getpid()} ready (RSS {rss_mb():.1f} MB)")
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+
+def _spawn(listen_sock: socket.socket, threads: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        _run_worker(listen_sock, threads)
+    return pid
+
+
+def serve(host: str, port: int, workers: int, threads: int, preload: int):
+    # 1. Load everything read-only in the parent
+    warm_up(load_problem=get_problem_by_id, top_n=preload, warm_model=False)
+    engine.dispose()
+    listen_sock = socket.create_server((host, port), backlog=512)
+
+    # 2. Freeze the heap so the cyclic GC doesn't write to shared pages
+    gc.collect()
+    gc.freeze()
+
+    # 3. Fork workers and keep them alive
+    children = {_spawn(listen_sock, threads) for _ in range(workers)}
+    print(f"🚀 Prefork server on {host}:{port} with {workers} workers (parent RSS {rss_mb():.1f} MB)")
+
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited ({status}), respawning")
+            children.add(_spawn(listen_sock, threads))
+    listen_sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefork server for the LearnWithAI graph")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PREFORK_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=1, help="torch threads per worker")
+    parser.add_argument("--preload", type=int, default=int(os.getenv("PREFORK_PRELOAD", "10")),
+                        help="hot problems to preload in the parent")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.threads, args.preload)
@@ -1,22 +1,63 @@
+import hashlib
+import json
+import os
+import time
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 from pathlib import Path
 from typing import Optional, List
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
+from dotenv import load_dotenv
+load_dotenv()
+
+EMBEDDING_MODEL_NAME = "all-mpnet-base-v2"
+ROOT_DIR = Path(__file__).parent.parent.parent  # main -> graphs -> langchain-expirements
+SNAPSHOT_DIR = ROOT_DIR / "snapshots"
+# How often a missing or changed snapshot is looked for again (seconds)
+SNAPSHOT_RECHECK_S = float(os.getenv("SNAPSHOT_RECHECK_S", "60"))
+# Index settings chosen by benchmarks/tune_hnsw.py, e.g. {"hnsw:space": "cosine", "hnsw:M": 16, ...}
+HNSW_SETTINGS_PATH = ROOT_DIR / "hnsw_settings.json"
+
+
+def hnsw_metadata() -> Optional[dict]:
+    """
+    Collection metadata with the tuned HNSW parameters, or None for Chroma's defaults.
+    
+    Only applies when a collection is created (ingestion / rebuild); existing
+    collections keep the index they were built with.
+    """
+    if not HNSW_SETTINGS_PATH.exists():
+        return None
+    with open(HNSW_SETTINGS_PATH, encoding="utf-8") as f:
+        return json.load(f)["metadata"]
+
+def content_hash(chunks: List[dict]) -> str:
+    """Stable hash of a problem's chunks (order-independent)."""
+    items = sorted((chunk["section"], chunk["content"]) for chunk in chunks)
+    payload = json.dumps(items, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def chroma_mtime_ns(persist_dir: Path) -> Optional[int]:
+    """Last write to the Chroma store (its SQLite file and WAL), None if there is none."""
+    mtimes = []
+    for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+        try:
+            mtimes.append(os.stat(Path(persist_dir) / name).st_mtime_ns)
+        except OSError:
+            continue
+    return max(mtimes) if mtimes else None
 
 # RETRIEVER CLASS 
 
 class ChromaRetriever:
     """Handles all semantic retrieval from persistent Chroma store."""
     
-    def __init__(self):
+    def __init__(self, embedding_function=None):
         # Point to the root-level chroma_db folder (parent of graphs folder)
-        current_file = Path(__file__)
-        root_dir = current_file.parent.parent.parent  # main -> graphs -> langchain-expirements
-        self.persist_dir = root_dir / "chroma_db"
+        self.persist_dir = ROOT_DIR / "chroma_db"
         print(f"🔗 RAG Layer connecting to DB at: {self.persist_dir}")
         
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-mpnet-base-v2")
+        self.embeddings = embedding_function or HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
         self.problem_collections = {}  # Cache for opened collections
     
     def _get_collection(self, problem_id: int):
@@ -26,11 +67,24 @@ class ChromaRetriever:
             self.problem_collections[problem_id] = Chroma(
                 collection_name=collection_name,
                 embedding_function=self.embeddings,
-                persist_directory=self.persist_dir
+                persist_directory=self.persist_dir,
+                collection_metadata=hnsw_metadata()
             )
         return self.problem_collections[problem_id]
     
-    def retrieve(self, problem_id: int, query: str, k: int = 5) -> List[dict]:
+    def after_fork(self):
+        """Drop Chroma handles inherited from a parent process (SQLite is not fork-safe)."""
+        from chromadb.api.client import SharedSystemClient
+        self.problem_collections = {}
+        SharedSystemClient.clear_system_cache()
+    
+    def preload(self, problem_id: int, probe_vector: Optional[List[float]] = None):
+        """Open a collection and run one search so its HNSW segment is loaded."""
+        collection = self._get_collection(problem_id)
+        if probe_vector is not None:
+            collection.similarity_search_by_vector(probe_vector, k=1)
+    
+    def retrieve(self, problem_id: int, query: str, k: int = 5, query_vector: Optional[List[float]] = None) -> List[dict]:
         """
         Retrieve top-k most relevant chunks for a query.
         
@@ -38,13 +92,17 @@ class ChromaRetriever:
             problem_id: Problem ID to search within
             query: User query or code to search for
             k: Number of results to return
+            query_vector: Precomputed embedding of `query` (skips re-embedding)
             
         Returns:
             List of dicts with keys: content, section, distance
         """
         try:
             collection = self._get_collection(problem_id)
-            results = collection.similarity_search_with_score(query, k=k)
+            if query_vector is not None:
+                results = collection.similarity_search_by_vector_with_relevance_scores(query_vector, k=k)
+            else:
+                results = collection.similarity_search_with_score(query, k=k)
             
             chunks = []
             for doc, distance in results:
@@ -58,8 +116,194 @@ class ChromaRetriever:
         except Exception as e:
             print(f"Retrieval error: {e}")
             return []
+    
+    def get_all_chunks(self, problem_id: int) -> List[dict]:
+        """
+        Fetch every stored chunk for a problem, in insertion order.
+        
+        No embedding and no ANN search - used at ingestion time to
+        precompute query-independent context.
+        
+        Returns:
+            List of dicts with keys: content, section, distance (always 0.0)
+        """
+        try:
+            collection = self._get_collection(problem_id)
+            data = collection.get(include=["documents", "metadatas"])
+            
+            chunks = []
+            for content, metadata in zip(data["documents"], data["metadatas"]):
+                chunks.append({
+                    "content": content,
+                    "section": (metadata or {}).get("section", "Unknown"),
+                    "distance": 0.0,
+                    "problem_id": problem_id
+                })
+            return chunks
+        except Exception as e:
+            print(f"Chunk listing error: {e}")
+            return []
+    
+    def list_problem_ids(self) -> List[int]:
+        """Return the ids of all `problem_{id}` collections in the store."""
+        import chromadb
+        client = chromadb.PersistentClient(path=str(self.persist_dir))
+        problem_ids = []
+        for collection in client.list_collections():
+            # Older chromadb versions return names, newer ones return objects
+            name = getattr(collection, "name", collection)
+            if name.startswith("problem_") and name[len("problem_"):].isdigit():
+                problem_ids.append(int(name[len("problem_"):]))
+        return sorted(problem_ids)
+
+
+class NumpySnapshotRetriever:
+    """
+    Exact cosine search over memory-mapped per-problem embedding snapshots.
+    
+    A problem has only a few dozen chunks, so a brute-force matrix-vector
+    product beats Chroma's client + SQLite + HNSW round trip. Snapshots are
+    written by `snapshot_store.py` and opened with mmap, so worker processes
+    share the pages read-only. Problems without a snapshot fall back to Chroma.
+    
+    snapshots/problem_{id} is a symlink to the current version directory;
+    it is resolved once per load so all files come from the same version.
+    A snapshot is only used while it matches Chroma: every recheck_s the
+    Chroma store's mtime is compared with the one recorded at export (a
+    stat, no Chroma read); only when Chroma was written since is the
+    content_hash checked against its chunks, once per change. Misses and
+    new versions are picked up on the same recheck.
+    """
+    
+    def __init__(self, fallback: ChromaRetriever, snapshot_dir: Path = SNAPSHOT_DIR, recheck_s: float = SNAPSHOT_RECHECK_S):
+        import numpy as np
+        self.np = np
+        self.fallback = fallback
+        self.embeddings = fallback.embeddings
+        self.snapshot_dir = Path(snapshot_dir)
+        print(f"🔗 RAG Layer using NumPy snapshots at: {self.snapshot_dir}")
+        self.recheck_s = recheck_s
+        # problem_id -> (checked at, version dir or None, Chroma mtime, snapshot or None)
+        self.snapshots = {}
+    
+    def _load_snapshot(self, problem_id: int, version_dir: Path, chroma_mtime: Optional[int]) -> Optional[dict]:
+        """Memory-map one snapshot version; None if it doesn't match Chroma."""
+        with open(version_dir / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        # Chroma unchanged since the export: the hash can't differ, skip reading it
+        unchanged = chroma_mtime is not None and meta.get("chroma_mtime_ns") == chroma_mtime
+        if not unchanged and meta.get("content_hash") != content_hash(self.fallback.get_all_chunks(problem_id)):
+            print(f"⚠️ Snapshot of problem {problem_id} is stale (Chroma content changed), using Chroma until it is re-exported")
+            return None
+        snapshot = {
+            "meta": meta,
+            "matrix": self.np.load(version_dir / "embeddings.npy", mmap_mode="r"),
+            "scales": None,
+        }
+        if meta["dtype"] == "int8":
+            snapshot["scales"] = self.np.load(version_dir / "scales.npy", mmap_mode="r")
+        return snapshot
+    
+    def _get_snapshot(self, problem_id: int) -> Optional[dict]:
+        """Get or memory-map a problem's snapshot (re-checked every recheck_s)."""
+        now = time.monotonic()
+        cached = self.snapshots.get(problem_id)
+        if cached is not None and now - cached[0] < self.recheck_s:
+            return cached[3]
+        
+        link = self.snapshot_dir / f"problem_{problem_id}"
+        version_dir = link.resolve() if (link / "meta.json").exists() else None
+        chroma_mtime = chroma_mtime_ns(self.fallback.persist_dir)
+        if cached is not None and cached[1:3] == (version_dir, chroma_mtime):
+            self.snapshots[problem_id] = (now, version_dir, chroma_mtime, cached[3])  # unchanged
+            return cached[3]
+        
+        snapshot = None
+        if version_dir is not None:
+            try:
+                snapshot = self._load_snapshot(problem_id, version_dir, chroma_mtime)
+            except (OSError, ValueError) as e:
+                # Replaced while we were reading it - look again on the next call
+                print(f"Snapshot load error for problem {problem_id}: {e}")
+                self.snapshots.pop(problem_id, None)
+                return None
+        self.snapshots[problem_id] = (now, version_dir, chroma_mtime, snapshot)
+        return snapshot
+    
+    def after_fork(self):
+        # Snapshot mmaps stay valid (and shared) in the child; only Chroma needs a reset
+        self.fallback.after_fork()
+    
+    def preload(self, problem_id: int, probe_vector: Optional[List[float]] = None):
+        """Map a snapshot and fault its pages in (Chroma fallback if missing)."""
+        snapshot = self._get_snapshot(problem_id)
+        if snapshot is None:
+            self.fallback.preload(problem_id, probe_vector)
+        else:
+            float(self.np.asarray(snapshot["matrix"], dtype=self.np.float32).sum())
+    
+    def retrieve(self, problem_id: int, query: str, k: int = 5, query_vector: Optional[List[float]] = None) -> List[dict]:
+        """Same contract as ChromaRetriever.retrieve (distance = cosine distance)."""
+        np = self.np
+        try:
+            snapshot = self._get_snapshot(problem_id)
+            if snapshot is None:
+                return self.fallback.retrieve(problem_id, query, k=k, query_vector=query_vector)
+            
+            if query_vector is None:
+                query_vector = self.embeddings.embed_query(query)
+            q = np.array(query_vector, dtype=np.float32)
+            q /= (np.linalg.norm(q) or 1.0)
+            
+            # Rows are stored L2-normalised, so one mat-vec gives all cosine scores
+            scores = snapshot["matrix"] @ q
+            if snapshot["scales"] is not None:
+                scores = scores * snapshot["scales"]
+            
+            k = min(k, scores.shape[0])
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            
+            chunks = []
+            for idx in top:
+                meta = snapshot["meta"]["chunks"][idx]
+                chunks.append({
+                    "content": meta["content"],
+                    "section": meta["section"],
+                    "distance": float(1.0 - scores[idx]),
+                    "problem_id": problem_id
+                })
+            return chunks
+        except Exception as e:
+            print(f"Retrieval error: {e}")
+            return []
+    
+    def get_all_chunks(self, problem_id: int) -> List[dict]:
+        return self.fallback.get_all_chunks(problem_id)
+    
+    def list_problem_ids(self) -> List[int]:
+        return self.fallback.list_problem_ids()
+
 
-retriever = ChromaRetriever()
+def create_retriever():
+    """
+    Build the retriever selected by RAG_BACKEND ("chroma" or "numpy").
+    
+    With EMBEDDING_SERVICE set, queries are embedded by the shared
+    embedding service instead of a model loaded in this process.
+    """
+    embedding_function = None
+    if os.getenv("EMBEDDING_SERVICE"):
+        from embedding_service import EmbeddingServiceClient
+        embedding_function = EmbeddingServiceClient()
+    chroma = ChromaRetriever(embedding_function=embedding_function)
+    if os.getenv("RAG_BACKEND", "chroma").lower() == "numpy":
+        return NumpySnapshotRetriever(fallback=chroma)
+    return chroma
+
+retriever = create_retriever()
 # INTENT-TO-SECTIONS 
 INTENT_TO_SECTIONS = {
     "how_to_solve_this": [
@@ -132,6 +376,55 @@ def filter_by_section(chunks: List[dict], allowed_sections: List[str]) -> List[d
     return filtered
 
 
+# ADAPTIVE K
+# (k_start, k_max, min_filtered) per intent. Start with a small search and
+# widen it only when section filtering leaves fewer than min_filtered chunks
+# (build_prompt uses the top 3, clarification the top 2).
+# Tune with benchmarks/eval_retrieval.py.
+ADAPTIVE_K = {
+    "why_my_code_failed": (4, 16, 3),
+    "how_to_solve_this": (4, 16, 3),
+    "explain_my_code": (4, 16, 3),
+    "validate_my_approach": (4, 16, 3),
+    "clarification_request": (4, 16, 2),
+}
+
+
+def retrieve_for_intent(problem_id: int, intent: str, query: str, policy: Optional[tuple] = None):
+    """
+    Retrieve and section-filter chunks, widening k until enough survive.
+    
+    The query is embedded once; each widening step only repeats the search.
+    Stops when enough chunks pass the filter, k reaches k_max, or the
+    collection has no more chunks to give.
+    
+    Args:
+        problem_id: Problem ID to search within
+        intent: User's intent (selects sections and policy)
+        query: Search text
+        policy: Optional (k_start, k_max, min_filtered) override
+        
+    Returns:
+        (all_chunks, filtered_chunks) from the last search
+    """
+    k, k_max, min_filtered = policy or ADAPTIVE_K[intent]
+    allowed_sections = INTENT_TO_SECTIONS[intent]
+    
+    try:
+        query_vector = retriever.embeddings.embed_query(query)
+    except Exception as e:
+        print(f"Embedding error: {e}")
+        return [], []
+    
+    while True:
+        all_chunks = retriever.retrieve(problem_id, query, k=k, query_vector=query_vector)
+        filtered_chunks = filter_by_section(all_chunks, allowed_sections)
+        distinct = len({chunk["content"].strip() for chunk in filtered_chunks})
+        if distinct >= min_filtered or len(all_chunks) < k or k >= k_max:
+            return all_chunks, filtered_chunks
+        k = min(k * 2, k_max)
+
+
 # PROMPT TEMPLATES (Teaching Style per Intent)
 # Key: Different intents need different teaching styles
 # how_to_solve → Progressive hints (don't give away)
@@ -321,6 +614,20 @@ def format_chat_history(messages: list) -> str:
 
     return "\n".join(history_str)
 
+CONTEXT_BLOCK = "Reference notes for this problem:\n{context}"
+NO_CONTEXT = "(No specific context found - answer from general knowledge)"
+
+
+def format_context(context_chunks: List[dict], top_n: int = 3) -> str:
+    """The deduplicated top chunks as "[section]\\ncontent" blocks (NO_CONTEXT if there are none)."""
+    deduplicated = deduplicate_context(context_chunks or [])
+    context_text = "\n\n".join(
+        f"[{chunk['section']}]\n{chunk['content']}"
+        for chunk in deduplicated[:top_n]
+    )
+    return context_text or NO_CONTEXT
+
+
 def build_prompt(intent: str, problem: dict, user_query: str, user_code: Optional[str], context_chunks: List[dict], conversation_context: list = None) -> str:
     """
     Build a complete prompt with context chunks and user input.
@@ -347,17 +654,8 @@ def build_prompt(intent: str, problem: dict, user_query: str, user_code: Optiona
     
     template = PROMPT_TEMPLATES[intent]
     
-    # Deduplicate context chunks to prevent repetition
-    deduplicated = deduplicate_context(context_chunks)
-    
-    # Build context string from chunks
-    context_text = "\n\n".join([
-        f"[{chunk['section']}]\n{chunk['content']}"
-        for chunk in deduplicated[:3]  # Use top 3 chunks
-    ])
-    
-    if not context_text:
-        context_text = "(No specific context found - answer from general knowledge)"
+    # Deduplicated top chunks
+    context_text = format_context(context_chunks)
     
     # Inject History into System Prompt
     system_prompt = template["system"]
@@ -374,8 +672,82 @@ def build_prompt(intent: str, problem: dict, user_query: str, user_code: Optiona
     
     # Format the user prompt
     user_prompt = template["user_template"].format(**replacements)
+    user_prompt += "\n\n" + CONTEXT_BLOCK.format(context=context_text)
     # We don't add conversation_note here as it is handled by system prompt injection
     
     return f"{system_prompt}\n\n---\n\n{user_prompt}"
 
 
+# PREFIX-CACHE-FRIENDLY LAYOUT
+# Same content as build_prompt, ordered from most to least stable so that
+# provider / local-server prefix caches can reuse the longest possible prefix:
+#   1. static system instructions (per intent, identical for everyone)
+#   2. per-problem context: the problem statement, plus the notes when they
+#      come from a precomputed bundle (identical for everyone on the problem)
+#   3. conversation history (grows turn by turn, append-only)
+#   4. the current query (+ code), with the notes retrieved for this query:
+#      they change every turn, so anywhere earlier they would invalidate the
+#      cached history behind them
+
+PROBLEM_LINE = "Problem: {problem_description}\n\n"
+HISTORY_NOTE = "Use this history to understand context (e.g. 'it', 'that code')."
+
+
+def history_messages(messages: list) -> List[BaseMessage]:
+    """The turns format_chat_history would include, as plain chat messages."""
+    history = []
+    for msg in messages[:-1][-6:]:
+        if isinstance(msg, HumanMessage):
+            history.append(HumanMessage(content=msg.content))
+        elif isinstance(msg, AIMessage):
+            history.append(AIMessage(content=msg.content))
+    return history
+
+
+def build_prompt_messages(intent: str, problem: dict, user_query: str, user_code: Optional[str], context_chunks: List[dict], conversation_context: list = None, static_hint: str = "", test_report: str = "", context_text: Optional[str] = None) -> List[BaseMessage]:
+    """
+    build_prompt as a stable message sequence (see the layout above).
+    A bundle's context_text goes into message 2, after the problem
+    statement; query-dependent context chunks go into the last message.
+    
+    Args:
+        Same as build_prompt, plus
+        static_hint: Finding from static_analysis, appended to the last (per-request) message
+        test_report: Sample test outcome from the sandbox, appended the same way
+        context_text: Already rendered context (a precomputed bundle's); used instead of context_chunks
+        
+    Returns:
+        Messages ready for llm.invoke
+    """
+    if intent not in PROMPT_TEMPLATES:
+        intent = "clarification_request"  # Fallback
+    
+    template = PROMPT_TEMPLATES[intent]
+    history = history_messages(conversation_context) if conversation_context else []
+    
+    messages = [
+        SystemMessage(content=template["system"]),
+        SystemMessage(content=(
+            PROBLEM_LINE.format(problem_description=problem["description"] if problem else "Unknown")
+            + (CONTEXT_BLOCK.format(context=context_text) if context_text else "")
+        ).rstrip()),
+    ]
+    if history:
+        messages.append(SystemMessage(content=f"CONVERSATION HISTORY follows. {HISTORY_NOTE}"))
+        messages.extend(history)
+    
+    # The problem line moved up into message 2; the rest of the user template is unchanged
+    user_message = template["user_template"].replace(PROBLEM_LINE, "").format(
+        user_query=user_query,
+        user_code=user_code or "(No code provided)",
+    )
+    if not context_text:
+        user_message += "\n\n" + CONTEXT_BLOCK.format(context=format_context(context_chunks))
+    if static_hint:
+        user_message += f"\n\nStatic analysis found: {static_hint}\nStart from this finding; confirm it against the code."
+    if test_report:
+        user_message += f"\n\nWe ran the code (observed, not a guess):\n{test_report}"
+    messages.append(HumanMessage(content=user_message))
+    return messages
+
+
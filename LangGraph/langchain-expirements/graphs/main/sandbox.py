@@ -0,0 +1,421 @@
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+from rag_layer import retriever, ROOT_DIR
+from static_analysis import looks_like_python
+
+# SANDBOX
+# Runs a why_my_code_failed submission against the problem's sample tests so
+# the prompt can say what actually happens instead of asking the LLM to guess.
+# Every case is its own `python -I` child under OS isolation:
+#   - new network, PID, IPC and UTS namespaces (no network at all)
+#   - a separate unprivileged uid (nobody)
+#   - a private root: read-only /usr, /lib* and the Python install, the
+#     submission directory read-only at /sandbox, an empty tmpfs /tmp;
+#     nothing else of the host (repo, .env, /etc, /home) is visible
+#   - CPU / memory / file-size / process-count rlimits
+# Isolation comes from bubblewrap (unprivileged) or, when the server runs as
+# root, util-linux unshare + a chroot; with neither the sandbox refuses to
+# run code. The audit hook in the child is only a tripwire for clearer
+# errors, not a security boundary.
+# Cases from all requests share one pool sized to the cores, and each
+# request has a wall-clock budget. Python submissions only.
+#
+# Tests: ROOT_DIR/test_cases/problem_{id}.json ([{"input": ..., "output": ...}])
+# if present, else the **Input** / **Output** blocks of the problem statement.
+
+ENABLED = os.getenv("SANDBOX", "1") == "1"
+WORKERS = int(os.getenv("SANDBOX_WORKERS", os.cpu_count() or 1))
+CASE_TIMEOUT_S = float(os.getenv("SANDBOX_CASE_TIMEOUT", "2"))
+REQUEST_TIMEOUT_S = float(os.getenv("SANDBOX_REQUEST_TIMEOUT", "6"))
+MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "256"))
+ISOLATION = os.getenv("SANDBOX_ISOLATION", "auto")  # auto | bwrap | unshare
+NOBODY = 65534
+TEST_CASES_DIR = ROOT_DIR / "test_cases"
+MAX_FIELD_CHARS = 300
+
+# Runs inside the isolated child before the submission: limits first, then the
+# audit hook (a tripwire, see above), then the code as __main__.
+BOOTSTRAP = r"""
+import resource, sys
+cpu, memory = int(sys.argv[1]), int(sys.argv[2]) * 1024 * 1024
+resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+resource.setrlimit(resource.RLIMIT_FSIZE, (1 << 20, 1 << 20))
+resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+resource.setrlimit(resource.RLIMIT_NPROC, (64, 64))
+BLOCKED = ("socket.", "subprocess.", "os.system", "os.exec", "os.posix_spawn", "os.fork", "os.spawn", "os.kill", "ctypes.", "pty.")
+def guard(event, args):
+    if event.startswith(BLOCKED):
+        raise PermissionError(f"{event} is not allowed in the sandbox")
+sys.addaudithook(guard)
+del resource, cpu, memory
+with open("solution.py", encoding="utf-8") as f:
+    source = f.read()
+sys.argv = ["solution.py"]
+exec(compile(source, "solution.py", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+"""
+
+# unshare backend: runs as root inside the new namespaces, builds the private
+# root, chroots into it and drops to nobody before exec'ing the bootstrap
+LAUNCHER = r"""
+import os, subprocess, sys
+root, code_dir, uid = sys.argv[1], sys.argv[2], int(sys.argv[3])
+ro_paths, links, child = sys.argv[4].split(":"), sys.argv[5].split(":"), sys.argv[6:]
+def mount(*args):
+    subprocess.run(["mount", *args], check=True)
+mount("-t", "tmpfs", "-o", "size=16m,mode=755", "tmpfs", root)
+for path in filter(None, ro_paths):
+    target = root + path
+    os.makedirs(target, exist_ok=True)
+    mount("--rbind", path, target)
+    mount("-o", "remount,bind,ro", target)
+for link in filter(None, links):
+    path, dest = link.split("=")
+    os.symlink(dest, root + path)
+os.makedirs(root + "/sandbox")
+mount("--bind", code_dir, root + "/sandbox")
+mount("-o", "remount,bind,ro", root + "/sandbox")
+for name in ("tmp", "proc", "dev"):
+    os.makedirs(root + "/" + name)
+mount("-t", "tmpfs", "-o", "size=16m,mode=1777", "tmpfs", root + "/tmp")
+mount("-t", "proc", "proc", root + "/proc")
+for device in ("null", "zero", "urandom"):
+    open(root + "/dev/" + device, "w").close()
+    mount("--bind", "/dev/" + device, root + "/dev/" + device)
+os.chroot(root)
+os.chdir("/sandbox")
+os.setgroups([])
+os.setgid(uid)
+os.setuid(uid)
+os.execve(child[0], child, {"PATH": "/usr/bin:/bin", "PYTHONIOENCODING": "utf-8", "HOME": "/tmp"})
+"""
+EXAMPLE = re.compile(
+    r"\*\*Input\*\*\s*```[a-z]*\n(.*?)```.*?\*\*Output\*\*\s*```[a-z]*\n(.*?)```",
+    re.S | re.I,
+)
+
+
+# SAMPLE TESTS
+
+_tests_cache = {}
+
+
+def parse_examples(text: str) -> List[dict]:
+    """**Input** ```...``` (explanation) **Output** ```...``` pairs from markdown."""
+    return [{"input": i.strip() + "\n", "output": o.strip()} for i, o in EXAMPLE.findall(text or "")]
+
+
+def sample_tests(problem_id: int, problem: Optional[dict] = None) -> List[dict]:
+    """Test file if there is one, else the examples in the statement and stored chunks (deduplicated)."""
+    if problem_id in _tests_cache:
+        return _tests_cache[problem_id]
+
+    path = TEST_CASES_DIR / f"problem_{problem_id}.json"
+    tests = []
+    if path.exists():
+        try:
+            with open(path, encoding="utf-8") as f:
+                tests = [{"input": t["input"], "output": str(t["output"]).strip()} for t in json.load(f)]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Could not read {path}: {e}")
+    if not tests:
+        texts = [problem["description"] if problem else ""]
+        texts += [c["content"] for c in retriever.get_all_chunks(problem_id)]
+        seen = set()
+        for text in texts:
+            for test in parse_examples(text):
+                key = (test["input"], test["output"])
+                if key not in seen:
+                    seen.add(key)
+                    tests.append(test)
+    _tests_cache[problem_id] = tests
+    return tests
+
+
+def outputs_match(expected: str, got: str) -> bool:
+    """Token comparison; numbers that both parse as floats compare with 1e-6 tolerance."""
+    a, b = expected.split(), got.split()
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if x == y:
+            continue
+        try:
+            if abs(float(x) - float(y)) > 1e-6 * max(1.0, abs(float(x))):
+                return False
+        except ValueError:
+            return False
+    return True
+
+
+# ISOLATION
+
+def _host_layout() -> tuple:
+    """Read-only mounts and symlinks for the private root: system libraries and the Python install."""
+    ro_paths, links = ["/usr"], []
+    for path in ("/bin", "/sbin", "/lib", "/lib32", "/lib64"):
+        if os.path.islink(path):
+            links.append((path, os.readlink(path)))
+        elif os.path.isdir(path):
+            ro_paths.append(path)
+    prefix = os.path.realpath(sys.base_prefix)
+    if not any(prefix == p or prefix.startswith(p + "/") for p in ro_paths):
+        ro_paths.append(prefix)
+    return ro_paths, links
+
+
+def _python() -> str:
+    return os.path.realpath(sys.executable)
+
+
+def _isolated_command(backend: str, code_dir: str, root_dir: str, child: list) -> list:
+    ro_paths, links = _host_layout()
+    if backend == "bwrap":
+        command = ["bwrap", "--unshare-all", "--die-with-parent", "--new-session",
+                   "--uid", str(NOBODY), "--gid", str(NOBODY), "--clearenv",
+                   "--setenv", "PATH", "/usr/bin:/bin", "--setenv", "PYTHONIOENCODING", "utf-8",
+                   "--setenv", "HOME", "/tmp"]
+        for path in ro_paths:
+            command += ["--ro-bind", path, path]
+        for path, dest in links:
+            command += ["--symlink", dest, path]
+        command += ["--ro-bind", code_dir, "/sandbox", "--tmpfs", "/tmp", "--proc", "/proc", "--dev", "/dev",
+                    "--chdir", "/sandbox", "--"]
+        return command + child
+    # unshare: needs root; the launcher drops to nobody after building the root
+    return ["unshare", "--net", "--mount", "--pid", "--ipc", "--uts", "--fork", "--kill-child",
+            "--propagation", "private", "--",
+            _python(), "-I", "-c", LAUNCHER, root_dir, code_dir, str(NOBODY),
+            ":".join(ro_paths), ":".join(f"{p}={d}" for p, d in links)] + child
+
+
+@lru_cache(maxsize=1)
+def isolation_backend() -> Optional[str]:
+    """bwrap or unshare, whichever works here (probed once); None means code is never run."""
+    candidates = ["bwrap", "unshare"] if ISOLATION == "auto" else [ISOLATION]
+    for backend in candidates:
+        if not shutil.which(backend) or (backend == "unshare" and (os.geteuid() != 0 or not shutil.which("mount"))):
+            continue
+        with tempfile.TemporaryDirectory(prefix="sandbox_probe_") as tmp:
+            code_dir, root_dir = _prepare_dirs(tmp, "import os, socket\nprint(os.getuid())\n")
+            try:
+                probe = subprocess.run(
+                    _isolated_command(backend, code_dir, root_dir, [_python(), "-I", "solution.py"]),
+                    capture_output=True, timeout=10,
+                )
+            except (OSError, subprocess.TimeoutExpired) as e:
+                print(f"⚠️ Sandbox backend {backend} unusable: {e}")
+                continue
+        if probe.returncode == 0 and probe.stdout.strip() == str(NOBODY).encode():
+            print(f"🔒 Sandbox isolation: {backend}")
+            return backend
+        print(f"⚠️ Sandbox backend {backend} unusable: {probe.stderr.decode('utf-8', 'replace').strip()[-200:]}")
+    print("⚠️ No sandbox isolation available (install bubblewrap); sample tests will not be run")
+    return None
+
+
+def _prepare_dirs(tmp: str, code: str) -> tuple:
+    """solution.py readable by nobody, plus an empty mount point for the private root."""
+    code_dir, root_dir = os.path.join(tmp, "code"), os.path.join(tmp, "root")
+    os.makedirs(code_dir)
+    os.makedirs(root_dir)
+    with open(os.path.join(code_dir, "solution.py"), "w", encoding="utf-8") as f:
+        f.write(code)
+    os.chmod(tmp, 0o755)
+    os.chmod(code_dir, 0o755)
+    os.chmod(os.path.join(code_dir, "solution.py"), 0o644)
+    return code_dir, root_dir
+
+
+# RUNNER
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    """Created on first use, so prefork workers each get their own after fork."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="sandbox")
+        return _pool
+
+
+def _kill(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass  # already gone
+
+
+def run_case(code_dir: str, test: dict, timeout_s: float = CASE_TIMEOUT_S,
+             running: Optional[set] = None, stop: Optional[threading.Event] = None) -> Optional[dict]:
+    """
+    Run the submission in code_dir on one test, isolated (see isolation_backend).
+
+    Args:
+        running: Live processes of the request, so it can kill them when it's done
+        stop: Set once the request no longer needs this case
+
+    Returns:
+        {"verdict": "OK" | "WA" | "TLE" | "MLE" | "RE", "got", "stderr", "ms"},
+        or None if the case was stopped
+    """
+    if stop is not None and stop.is_set():
+        return None
+    start = time.perf_counter()
+    backend = isolation_backend()
+    if backend is None:
+        raise RuntimeError("no sandbox isolation available")
+    child = [_python(), "-I", "-c", BOOTSTRAP, str(max(1, int(timeout_s + 0.999))), str(MEMORY_MB)]
+    process = subprocess.Popen(
+        # Sibling "root" is only a mount point; each case mounts its own tmpfs there in a private namespace
+        _isolated_command(backend, code_dir, os.path.join(os.path.dirname(code_dir), "root"), child),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        env={"PATH": "/usr/bin:/bin"},
+        start_new_session=True,
+    )
+    if running is not None:
+        running.add(process)
+        if stop is not None and stop.is_set():
+            _kill(process)  # stopped while starting; the request may have missed it
+    try:
+        stdout, stderr = process.communicate(test["input"].encode("utf-8"), timeout=timeout_s)
+    except subprocess.TimeoutExpired:
+        _kill(process)
+        process.communicate()
+        return {"verdict": "TLE", "got": "", "stderr": "", "ms": round((time.perf_counter() - start) * 1000)}
+    finally:
+        if running is not None:
+            running.discard(process)
+    if stop is not None and stop.is_set():
+        return None  # killed by the request
+
+    ms = round((time.perf_counter() - start) * 1000)
+    got = stdout.decode("utf-8", "replace")
+    err = stderr.decode("utf-8", "replace")
+    # Killed by a signal: negative directly, 128 + signal when reported by bwrap
+    if process.returncode in (-signal.SIGXCPU, -signal.SIGKILL, 128 + signal.SIGXCPU, 128 + signal.SIGKILL):
+        verdict = "TLE"
+    elif "MemoryError" in err:
+        verdict = "MLE"
+    elif process.returncode != 0:
+        verdict = "RE"
+    else:
+        verdict = "OK" if outputs_match(test["output"], got) else "WA"
+    return {"verdict": verdict, "got": got, "stderr": err, "ms": ms}
+
+
+def run_samples(code: str, problem_id: int, problem: Optional[dict] = None,
+                deadline_s: float = REQUEST_TIMEOUT_S) -> dict:
+    """
+    Run a submission on every sample test in parallel.
+
+    Args:
+        code: The user's code
+        problem_id: Problem to take sample tests from
+        problem: Problem row (its description is searched for examples)
+        deadline_s: Wall-clock budget for the whole request
+
+    Returns:
+        {"status": "passed" | "failed" | "skipped", "reason", "passed", "total",
+         "failure": {"case", "verdict", "input", "expected", "got", "stderr"} or None,
+         "ms"}
+        The failure is the first failing case in test order.
+    """
+    start = time.perf_counter()
+    result = {"status": "skipped", "reason": "", "passed": 0, "total": 0, "failure": None, "ms": 0}
+    if not ENABLED:
+        return {**result, "reason": "sandbox disabled"}
+    if not code or not code.strip() or not looks_like_python(code):
+        return {**result, "reason": "not Python"}
+    if isolation_backend() is None:
+        return {**result, "reason": "no sandbox isolation available"}
+    tests = sample_tests(problem_id, problem)
+    if not tests:
+        return {**result, "reason": "no sample tests"}
+    result["total"] = len(tests)
+
+    with tempfile.TemporaryDirectory(prefix="sandbox_") as tmp:
+        code_dir, _ = _prepare_dirs(tmp, code)
+        pool = _get_pool()
+        running, stop = set(), threading.Event()
+        futures = {pool.submit(run_case, code_dir, test, CASE_TIMEOUT_S, running, stop): i for i, test in enumerate(tests)}
+        outcomes = {}
+        pending = set(futures)
+        while pending:
+            remaining = deadline_s - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result() is not None:
+                    outcomes[futures[future]] = future.result()
+            # Stop early once every case before the earliest failure is in
+            failing = [i for i, o in outcomes.items() if o["verdict"] != "OK"]
+            if failing and all(i in outcomes for i in range(min(failing))):
+                break
+        # Whatever is left isn't needed: drop queued cases, kill running ones
+        stop.set()
+        for future in pending:
+            future.cancel()
+        for process in list(running):
+            _kill(process)
+        wait(pending)
+
+    result["ms"] = round((time.perf_counter() - start) * 1000)
+    result["passed"] = sum(1 for o in outcomes.values() if o["verdict"] == "OK")
+    for i, test in enumerate(tests):
+        outcome = outcomes.get(i)
+        if outcome is None:
+            if len(outcomes) < len(tests):
+                result["reason"] = f"request budget ({deadline_s:g}s) ran out after {len(outcomes)}/{len(tests)} cases"
+            break
+        if outcome["verdict"] != "OK":
+            result["status"] = "failed"
+            result["failure"] = {"case": i + 1, "verdict": outcome["verdict"], "input": test["input"],
+                                 "expected": test["output"], "got": outcome["got"], "stderr": outcome["stderr"]}
+            return result
+    if len(outcomes) == len(tests):
+        result["status"] = "passed"
+    return result
+
+
+def _clip(text: str, limit: int = MAX_FIELD_CHARS) -> str:
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit] + f"... ({len(text) - limit} more chars)"
+
+
+def format_report(result: dict) -> str:
+    """Short prompt text for a run_samples result ("" when nothing was run)."""
+    if result["status"] == "passed":
+        return f"Passes all {result['total']} sample tests, so the bug only shows on other inputs (edge cases, large N)."
+    if result["status"] != "failed":
+        return ""
+    failure = result["failure"]
+    lines = [f"Sample test {failure['case']}/{result['total']} fails with {failure['verdict']}.",
+             f"Input:\n{_clip(failure['input'])}"]
+    if failure["verdict"] == "WA":
+        lines += [f"Expected:\n{_clip(failure['expected'])}", f"Got:\n{_clip(failure['got']) or '(no output)'}"]
+    elif failure["verdict"] == "TLE":
+        lines.append(f"Still running after {CASE_TIMEOUT_S:g}s.")
+    elif failure["stderr"].strip():
+        # Last traceback lines carry the location and the error
+        lines.append(f"Error:\n{_clip(chr(10).join(failure['stderr'].strip().splitlines()[-3:]))}")
+    return "\n".join(lines)
@@ -0,0 +1,124 @@
+import os
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Tuple
+
+from langchain_core.messages import AIMessage
+
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+from code_fingerprint import fingerprint
+from capture import note
+
+# SINGLEFLIGHT
+# Identical concurrent requests (a class hitting "Clarify" on the same
+# problem with the same words) share one guard run and one handler run.
+# Only requests that are in flight at the same time are merged - nothing is
+# cached afterwards. Per process: prefork workers coalesce within a worker.
+# SINGLEFLIGHT=0 turns it off.
+
+ENABLED = os.getenv("SINGLEFLIGHT", "1") == "1"
+
+# Fields a node contributes to the state; only these are shared between callers
+GUARD_FIELDS = ("is_valid", "fallback_message", "violation_type")
+HANDLER_FIELDS = ("answer",)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+def request_key(stage: str, state: dict) -> Tuple:
+    return (
+        stage,
+        state.get("user_intent", ""),
+        state.get("problem_id"),
+        normalize_query(state.get("user_query", "")),
+        # Formatting and comments never split keys; variable names only matter
+        # for handlers, whose answers quote the code back
+        fingerprint(state.get("user_code", ""), rename=stage.startswith("guard_")),
+    )
+
+
+class SingleFlight:
+    """Runs fn once per key while a call for that key is in flight; everyone gets its result."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.stats = defaultdict(lambda: {"leaders": 0, "coalesced": 0, "excluded": 0})
+
+    def do(self, key: Tuple, fn: Callable):
+        stage = key[0]
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+            self.stats[stage]["leaders" if leader else "coalesced"] += 1
+        note(f"singleflight:{stage}", "leader" if leader else "coalesced")
+
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def exclude(self, stage: str):
+        with self.lock:
+            self.stats[stage]["excluded"] += 1
+        note(f"singleflight:{stage}", "excluded")
+
+    def metrics(self) -> dict:
+        """Per stage plus total: leaders, coalesced, excluded, coalescing_ratio."""
+        with self.lock:
+            report = {stage: dict(s) for stage, s in self.stats.items()}
+        total = {"leaders": 0, "coalesced": 0, "excluded": 0}
+        for s in report.values():
+            for k in total:
+                total[k] += s[k]
+        report["total"] = total
+        for s in report.values():
+            shared = s["leaders"] + s["coalesced"]
+            s["coalescing_ratio"] = round(s["coalesced"] / shared, 4) if shared else 0.0
+        return report
+
+
+flight = SingleFlight()
+
+
+def coalesce(stage: str, node: Callable, fields: Tuple = HANDLER_FIELDS) -> Callable:
+    """
+    Wrap a guard or handler node with singleflight.
+
+    Requests carrying thread history (more than the current message) are
+    answered in context, so they never share. Coalesced calls return only
+    the node's own fields (plus a fresh AIMessage for handlers), never
+    another caller's state or messages.
+    """
+    if not ENABLED:
+        return node
+
+    def wrapped(state: dict) -> dict:
+        if len(state.get("messages", [])) > 1:
+            flight.exclude(stage)
+            return node(state)
+        result = flight.do(request_key(stage, state), lambda: node(state))
+        update = {field: result[field] for field in fields if field in result}
+        if "answer" in fields and "answer" in update:
+            update["messages"] = [AIMessage(content=update["answer"])]
+        return update
+
+    wrapped.__name__ = getattr(node, "__name__", stage)
+    return wrapped
@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Optional, List
+
+import numpy as np
+
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+from rag_layer import retriever, ChromaRetriever, NumpySnapshotRetriever, SNAPSHOT_DIR, content_hash, chroma_mtime_ns
+
+# SNAPSHOT EXPORT
+# Writes each problem_{id} collection to a new version directory
+# snapshots/problem_{id}.<version>/:
+#   embeddings.npy  - L2-normalised rows (float16, or int8 + scales.npy)
+#   meta.json       - dtype, shape, content hash, Chroma mtime, chunk texts/sections
+# and then points the snapshots/problem_{id} symlink at it with one rename,
+# so readers see either the old or the new version, never a mix or a gap.
+# NumpySnapshotRetriever memory-maps these files (RAG_BACKEND=numpy).
+
+
+def _chroma() -> ChromaRetriever:
+    return retriever.fallback if isinstance(retriever, NumpySnapshotRetriever) else retriever
+
+
+def quantize(matrix: np.ndarray, dtype: str):
+    """
+    Normalise rows and convert to the storage dtype.
+
+    Returns:
+        (stored_matrix, scales) - scales is None for float16. For int8 each
+        row is stored as round(row / scale * 127) with scale = max|row|, so
+        score = (row_i8 @ q) * scale / 127; we fold the /127 into scales.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms
+
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        row_max = np.abs(matrix).max(axis=1)
+        row_max[row_max == 0] = 1.0
+        quantized = np.round(matrix / row_max[:, None] * 127).astype(np.int8)
+        return quantized, (row_max / 127).astype(np.float32)
+    raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+
+
+def export_problem(problem_id: int, dtype: str = "float16", out_dir: Path = SNAPSHOT_DIR) -> Optional[Path]:
+    """
+    Export one problem's embeddings + metadata.
+
+    Args:
+        problem_id: Problem to export
+        dtype: "float16" or "int8"
+        out_dir: Snapshot root directory
+
+    Returns:
+        The written problem directory, or None if the collection is empty
+    """
+    # Taken before the read: a write during the export makes readers verify the hash
+    chroma_mtime = chroma_mtime_ns(_chroma().persist_dir)
+    collection = _chroma()._get_collection(problem_id)
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    if data["embeddings"] is None or len(data["embeddings"]) == 0:
+        print(f"⚠️ problem_{problem_id}: empty collection, skipped")
+        return None
+
+    chunks = [
+        {"content": content, "section": (metadata or {}).get("section", "Unknown")}
+        for content, metadata in zip(data["documents"], data["metadatas"])
+    ]
+    matrix, scales = quantize(np.asarray(data["embeddings"], dtype=np.float32), dtype)
+
+    # Write a new version directory, then swap the symlink to it
+    out_dir = Path(out_dir)
+    link = out_dir / f"problem_{problem_id}"
+    version_dir = out_dir / f"problem_{problem_id}.{time.time_ns()}"
+    version_dir.mkdir(parents=True)
+
+    np.save(version_dir / "embeddings.npy", matrix)
+    if scales is not None:
+        np.save(version_dir / "scales.npy", scales)
+    with open(version_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "problem_id": problem_id,
+            "dtype": dtype,
+            "shape": list(matrix.shape),
+            "content_hash": content_hash(chunks),
+            "chroma_mtime_ns": chroma_mtime,
+            "chunks": chunks,
+        }, f, ensure_ascii=False)
+
+    _swap_link(link, version_dir)
+    # Old versions: processes that already mapped them keep their pages
+    for old in out_dir.glob(f"problem_{problem_id}.*"):
+        if old != version_dir:
+            shutil.rmtree(old, ignore_errors=True)
+    return version_dir
+
+
+def _swap_link(link: Path, version_dir: Path):
+    """Point link at version_dir atomically (os.replace of a symlink)."""
+    if link.is_dir() and not link.is_symlink():
+        # Snapshot from before versioned directories: move it aside once
+        # (readers fall back to Chroma for that instant)
+        os.replace(link, link.with_name(f"{link.name}.0"))
+    tmp_link = link.with_name(f".{link.name}.{os.getpid()}.link")
+    if tmp_link.is_symlink():
+        tmp_link.unlink()
+    os.symlink(version_dir.name, tmp_link)
+    os.replace(tmp_link, link)
+
+
+def export_all(problem_ids: Optional[List[int]] = None, dtype: str = "float16") -> List[int]:
+    """Export snapshots for the given problems (default: every collection)."""
+    if problem_ids is None:
+        problem_ids = _chroma().list_problem_ids()
+    exported = [pid for pid in problem_ids if export_problem(pid, dtype=dtype)]
+    print(f"💾 Exported {len(exported)}/{len(problem_ids)} snapshots ({dtype}) -> {SNAPSHOT_DIR}")
+    return exported
+
+
+if __name__ == "__main__":
+    # Usage: python snapshot_store.py [--int8] [problem_id ...]
+    args = sys.argv[1:]
+    dtype = "int8" if "--int8" in args else "float16"
+    ids = [int(a) for a in args if not a.startswith("--")] or None
+    export_all(ids, dtype=dtype)
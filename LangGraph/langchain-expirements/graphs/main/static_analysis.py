@@ -0,0 +1,327 @@
+import ast
+import re
+from typing import Optional
+
+# STATIC PRE-ANALYSIS (why_my_code_failed)
+# Cheap local checks that run after the guard has accepted the request:
+#   - syntax errors (Python)                       -> instant answer
+#   - recursion without any base case              -> instant answer
+#   - recursion depth ~N past Python's limit       -> hint (answer if they report a crash)
+#   - nested loops over the input vs constraints   -> hint (answer if they report TLE
+#                                                     and every loop is a range over N)
+# Instant answers skip the model, so they stay conservative: they need code
+# that positively looks like Python, and anything less certain (loops over
+# lists or adjacency maps, whose size we can't see) only ever gets a hint. A hint is a one-liner the handler puts in the prompt
+# instead of retrieved context.
+
+PYTHON_RECURSION_LIMIT = 1000
+OPS_PER_SECOND = 10 ** 7  # rough CPython budget
+
+PYTHON_MARKERS = re.compile(
+    r"^\s*(def\s+\w+\s*\(|class\s+\w+|import\s+\w+|from\s+[\w.]+\s+import\b|print\s*\("
+    r"|(if|elif|else|for|while|with|try|except|finally)\b[^\n{};]*:(\s|$))",
+    re.M,
+)
+OTHER_LANGUAGE = re.compile(
+    r"#include|\bpublic\s+static\b|\bint\s+main\s*\(|\bstd::|\bconsole\.log\b|\bfunction\s+\w+\s*\("
+    r"|^\s*package\s+\w+|\bfunc\s+\w+\s*\(|\bfun\s+\w+\s*\(|\b(const|let|var)\s+\w+\s*=|=>|\)\s*\{\s*$|;\s*$",
+    re.M,
+)
+TLE_WORDS = re.compile(r"\btle\b|time limit|too slow|timeout|timed out|takes forever", re.I)
+CRASH_WORDS = re.compile(r"recursion|stack ?overflow|runtime error|\bre verdict|crash|segfault|maximum recursion", re.I)
+# The judge verdict "RE", matched case-sensitively so "they're" / "we're" don't count
+RE_VERDICT = re.compile(r"\bRE\b")
+
+_NUMBER = r"(10\s*\^\s*\d+|10\*\*\d+|10<sup>\d+</sup>|1e\d+|\d[\d,]*(?:\s*[x×*·]\s*10\s*\^\s*\d+)?)"
+MAX_N = re.compile(r"\b[nN]\s*(?:≤|<=|&le;|<)\s*" + _NUMBER)
+TIME_LIMIT = re.compile(r"time limit\W+(\d+(?:\.\d+)?)\s*(ms|s|sec|second)", re.I)
+
+
+def _to_int(text: str) -> int:
+    text = text.replace(",", "").replace(" ", "").replace("<sup>", "^").replace("</sup>", "").replace("**", "^")
+    if text.startswith("1e"):
+        return 10 ** int(text[2:])
+    match = re.fullmatch(r"(\d+)(?:[x×*·]10\^(\d+))?", text)
+    if match:
+        return int(match.group(1)) * (10 ** int(match.group(2)) if match.group(2) else 1)
+    base, exponent = text.split("^")
+    return int(base) ** int(exponent)
+
+
+def max_n(text: str) -> Optional[int]:
+    """Largest input size in the constraints ("1 <= N <= 10^5" -> 100000)."""
+    values = []
+    for match in MAX_N.finditer(text or ""):
+        try:
+            values.append(_to_int(match.group(1)))
+        except (ValueError, IndexError):
+            continue
+    return max(values) if values else None
+
+
+def time_limit_seconds(text: str) -> float:
+    match = TIME_LIMIT.search(text or "")
+    if not match:
+        return 1.0
+    value = float(match.group(1))
+    return value / 1000 if match.group(2).lower() == "ms" else value
+
+
+def looks_like_python(code: str) -> bool:
+    """Positive evidence of Python (def/import/print/colon blocks) and no other-language markers."""
+    return bool(PYTHON_MARKERS.search(code or "")) and not OTHER_LANGUAGE.search(code or "")
+
+
+def reports_crash(query: str) -> bool:
+    return bool(CRASH_WORDS.search(query or "") or RE_VERDICT.search(query or ""))
+
+
+def _magnitude(value: float) -> str:
+    return f"10^{len(str(int(value))) - 1}"
+
+
+# CHECKS
+
+def _syntax_error(code: str) -> Optional[str]:
+    try:
+        compile(code, "<your code>", "exec")
+    except SyntaxError as e:
+        line = (e.text or "").rstrip("\n")
+        pointer = f"\n```\n{line}\n{' ' * max((e.offset or 1) - 1, 0)}^\n```" if line.strip() else ""
+        return f"Line {e.lineno}: {e.msg}.{pointer}"
+    return None
+
+
+def _offset_of(expr: ast.AST, base: Optional[ast.AST]) -> bool:
+    """expr is a constant, or base +/- a constant (so expr - base doesn't grow with the input)."""
+    if isinstance(expr, ast.Constant):
+        return True
+    if base is None:
+        return False
+    if ast.dump(expr) == ast.dump(base):
+        return True
+    return (isinstance(expr, ast.BinOp) and isinstance(expr.op, (ast.Add, ast.Sub))
+            and ast.dump(expr.left) == ast.dump(base) and isinstance(expr.right, ast.Constant))
+
+
+def _range_scales(args: list) -> bool:
+    """range(...) whose length (stop - start) depends on the input."""
+    if not args:
+        return False
+    start, stop = (None, args[0]) if len(args) == 1 else (args[0], args[1])
+    if _offset_of(stop, start):
+        return False  # range(5), range(i, i + 3)
+    if isinstance(stop, ast.Call) and isinstance(stop.func, ast.Name) and stop.func.id == "min":
+        # range(i, min(n, i + 3)): the smallest bound wins
+        if any(_offset_of(arg, start) for arg in stop.args):
+            return False
+    return True
+
+
+def _scales(iterable: ast.AST, ranges_only: bool = False) -> bool:
+    """
+    Does this loop's length depend on the input (not a constant or bounded range)?
+
+    With ranges_only, only range(...) over an input-sized bound counts: a loop
+    over a list or graph[u] may be anything from O(1) to O(n) (an adjacency
+    list in BFS/DFS is O(V + E) overall, not O(n^2)).
+    """
+    if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) and iterable.func.id == "range":
+        return _range_scales(iterable.args)
+    if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) and iterable.func.id in ("enumerate", "reversed", "sorted"):
+        return bool(iterable.args) and _scales(iterable.args[0], ranges_only)
+    return not ranges_only and isinstance(iterable, (ast.Name, ast.Attribute, ast.Subscript))
+
+
+def _loop_depth(node: ast.AST, depth: int = 0, ranges_only: bool = False) -> int:
+    best = depth
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.For, ast.AsyncFor)) and _scales(child.iter, ranges_only):
+            best = max(best, _loop_depth(child, depth + 1, ranges_only))
+        elif isinstance(child, ast.comprehension) and _scales(child.iter, ranges_only):
+            best = max(best, depth + 1)  # generators nest at the same level in ast; counted in the parent
+        else:
+            best = max(best, _loop_depth(child, depth, ranges_only))
+    return best
+
+
+def _comprehension_depth(tree: ast.AST, ranges_only: bool = False) -> int:
+    depth = 0
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            depth = max(depth, sum(1 for g in node.generators if _scales(g.iter, ranges_only)))
+    return depth
+
+
+def _local_names(func: ast.AST) -> set:
+    """Names a function binds itself (params, assignments, imports, nested defs)."""
+    names = {a.arg for a in ast.walk(func.args) if isinstance(a, ast.arg)}
+    for node in ast.walk(func):
+        if node is func:
+            continue
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+    return names
+
+
+def _self_calls(func: ast.AST, is_method: bool) -> list:
+    """Calls in func that really call func: f(...) for functions, self.f(...) for methods."""
+    if is_method:
+        if not func.args.args:
+            return []
+        owner = func.args.args[0].arg  # self / cls
+        return [
+            node for node in ast.walk(func)
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == func.name and isinstance(node.func.value, ast.Name) and node.func.value.id == owner
+        ]
+    if func.name in _local_names(func):
+        return []  # shadowed: f(...) inside means something else
+    return [
+        node for node in ast.walk(func)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == func.name
+    ]
+
+
+def _recursion(tree: ast.AST, code: str):
+    """
+    (function, has_base_case, linear_depth) for the first directly recursive function.
+
+    Generators are skipped: calling one only builds the generator, so
+    recursing without a base case doesn't blow the stack by itself.
+    """
+    methods = {
+        id(item) for node in ast.walk(tree) if isinstance(node, ast.ClassDef)
+        for item in node.body if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    for func in ast.walk(tree):
+        if not isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if any(isinstance(node, (ast.Yield, ast.YieldFrom)) for node in ast.walk(func)):
+            continue
+        # A bare sum(...) inside `def sum(self, ...)` is the builtin, not recursion
+        calls = _self_calls(func, id(func) in methods)
+        if not calls:
+            continue
+        has_base = any(isinstance(node, (ast.If, ast.IfExp, ast.BoolOp, ast.For, ast.While, ast.Try, ast.Match)) for node in ast.walk(func))
+        # f(n - 1), f(i + 1): one frame per element
+        linear = any(
+            isinstance(arg, ast.BinOp) and isinstance(arg.op, (ast.Add, ast.Sub))
+            and isinstance(arg.right, ast.Constant) and arg.right.value == 1
+            for call in calls for arg in call.args
+        )
+        return func.name, has_base, linear and "setrecursionlimit" not in code
+    return None
+
+
+def analyze(code: str, constraints_text: str = "", query: str = "") -> dict:
+    """
+    Static checks on a why_my_code_failed submission.
+
+    Args:
+        code: The user's code
+        constraints_text: Problem description (and/or constraints section)
+        query: What the user said (decides whether a likely finding is THE answer)
+
+    Returns:
+        {"answer": str or "" (confident, reply without the LLM),
+         "hint": str or "" (compact finding for the prompt),
+         "finding": name of the check that fired or ""}
+    """
+    none = {"answer": "", "hint": "", "finding": ""}
+    if not code or not code.strip():
+        return none
+    result = _analyze(code, constraints_text, query)
+    if result["answer"] and not looks_like_python(code):
+        # Not sure it is Python at all: the LLM gets the finding, not our final word
+        result = {**result, "answer": ""}
+    return result
+
+
+def _analyze(code: str, constraints_text: str, query: str) -> dict:
+    none = {"answer": "", "hint": "", "finding": ""}
+    error = _syntax_error(code)
+    if error:
+        if not looks_like_python(code):
+            if OTHER_LANGUAGE.search(code):
+                return none  # another language; a Python parse error says nothing
+            return {"answer": "", "hint": f"Does not parse as Python (if it is meant to be): {error.splitlines()[0]}",
+                    "finding": "syntax_error"}
+        return {
+            "answer": (
+                "Your code doesn't run yet - Python stops before executing anything because of a syntax error.\n\n"
+                f"{error}\n\n"
+                "Fix that line (check brackets, colons and indentation around it) and run it again. "
+                "If it still fails after that, send me the new error and I'll help you dig in."
+            ),
+            "hint": f"Syntax error: {error.splitlines()[0]}",
+            "finding": "syntax_error",
+        }
+
+    tree = ast.parse(code)
+    n = max_n(constraints_text)
+    recursion = _recursion(tree, code)
+    if recursion:
+        name, has_base, linear = recursion
+        if not has_base:
+            return {
+                "answer": (
+                    f"`{name}` calls itself, but nothing ever stops it: there is no base case "
+                    "(no `if` that returns without recursing). Every call makes another call until Python "
+                    "gives up with `RecursionError: maximum recursion depth exceeded`.\n\n"
+                    f"Ask yourself: for which input should `{name}` return directly? Check that case first, "
+                    "and make sure every recursive call moves closer to it."
+                ),
+                "hint": f"`{name}` recurses with no base case -> infinite recursion / RecursionError.",
+                "finding": "no_base_case",
+            }
+        if linear and n and n > PYTHON_RECURSION_LIMIT - 50:
+            hint = (f"`{name}` recurses once per element: depth ~N, N up to {n}, "
+                    f"past Python's default recursion limit ({PYTHON_RECURSION_LIMIT}) -> RecursionError on big tests.")
+            if reports_crash(query):
+                return {
+                    "answer": (
+                        f"Your recursion goes one level deeper per element, so on the largest tests (N up to {n}) "
+                        f"`{name}` needs about {n} nested calls. Python's default limit is {PYTHON_RECURSION_LIMIT}, "
+                        "so it crashes with a RecursionError even though the logic can be right.\n\n"
+                        "Think about whether the same idea can be written as a loop, or how deep the recursion "
+                        "really needs to go."
+                    ),
+                    "hint": hint,
+                    "finding": "recursion_depth",
+                }
+            return {"answer": "", "hint": hint, "finding": "recursion_depth"}
+
+    depth = max(_loop_depth(tree), _comprehension_depth(tree))
+    # Loops that are certainly input-sized: range over N
+    range_depth = max(_loop_depth(tree, ranges_only=True), _comprehension_depth(tree, ranges_only=True))
+    if depth >= 2 and n:
+        operations = n ** depth
+        budget = OPS_PER_SECOND * time_limit_seconds(constraints_text)
+        if operations > budget and range_depth < depth:
+            hint = (f"{depth} nested loops over collections: up to O(n^{depth}) if each one is input-sized "
+                    f"(N up to {n}, budget ~{_magnitude(budget)} steps); check what the inner loops really "
+                    "iterate over (an adjacency list is O(V + E) overall) before calling it a TLE.")
+            return {"answer": "", "hint": hint, "finding": "complexity"}
+        if operations > budget:
+            hint = (f"{depth} nested loops over the input: O(n^{depth}), N up to {n} -> ~{_magnitude(operations)} steps, "
+                    f"budget ~{_magnitude(budget)} -> TLE.")
+            if TLE_WORDS.search(query or ""):
+                return {
+                    "answer": (
+                        f"Your logic has {depth} nested loops over the input, so it does about N^{depth} steps. "
+                        f"With N up to {n} that is roughly {_magnitude(operations)} operations, while Python manages about "
+                        f"{_magnitude(budget)} in the time limit - that's why it times out.\n\n"
+                        "Look at what the inner loop is searching for: can you find it without scanning again "
+                        "(sorting, a set/dict, or two pointers)?"
+                    ),
+                    "hint": hint,
+                    "finding": "complexity",
+                }
+            return {"answer": "", "hint": hint, "finding": "complexity"}
+
+    return none
@@ -0,0 +1,236 @@
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional, List
+
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+# rag_layer.ROOT_DIR; rag_layer (and the embedding model it loads) is only
+# imported by the warm-up itself, so rss_mb / TTLCache / TrafficStats stay cheap
+# to import (benchmarks use rss_mb)
+ROOT_DIR = current_dir.parent.parent
+
+
+def rss_mb(pid: Optional[int] = None) -> float:
+    """
+    Current resident set size in MB.
+
+    Args:
+        pid: Another process (default: this one)
+
+    Returns:
+        RSS in MB; 0.0 if another process's RSS can't be read, peak RSS if this one's can't
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid is not None and pid != os.getpid():
+        return 0.0
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# PER-PROCESS CACHES
+# Problem rows and similar per-problem data, kept per process (filled by
+# warm-up or the first request). Bounded, and entries expire so edits to a
+# problem show up without a restart.
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after ttl_s.
+
+    Args:
+        max_entries: Least recently used entries are dropped beyond this
+        ttl_s: Seconds an entry stays valid
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 600):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key, loader: Callable[[], Any]) -> Any:
+        """Cached value for key, or loader()'s (None results aren't cached)."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                return entry[1]
+        value = loader()
+        if value is not None:
+            with self.lock:
+                self.entries[key] = (time.monotonic() + self.ttl_s, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything."""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.entries)
+
+
+# TRAFFIC STATS
+# Per-problem request counts, persisted so the next deploy knows which
+# problems are hot. Every worker process adds its own new counts to the
+# file under an exclusive lock, so prefork workers don't overwrite each
+# other.
+
+class TrafficStats:
+    """Counts requests per problem and merges them into a JSON file now and then."""
+
+    def __init__(self, path: Path = ROOT_DIR / "traffic_stats.json", flush_every: int = 50, flush_seconds: float = 60):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.lock = threading.Lock()
+        self.counts = Counter(self._read())  # file totals + this process's unflushed counts
+        self.unflushed = Counter()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return {int(k): v for k, v in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, problem_id: int):
+        with self.lock:
+            self.counts[problem_id] += 1
+            self.unflushed[problem_id] += 1
+            self.pending += 1
+            due = self.pending >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add this process's new counts to the file (read-merge-write under a file lock)."""
+        with self.lock:
+            delta, self.unflushed = self.unflushed, Counter()
+            self.pending = 0
+            self.last_flush = time.monotonic()
+        if not delta:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_suffix(".lock"), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                merged = Counter(self._read())
+                merged.update(delta)
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({str(k): v for k, v in merged.items()}, f)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Traffic stats error: {e}")
+            with self.lock:
+                self.unflushed.update(delta)  # retried on the next flush
+            return
+        with self.lock:
+            # Pick up the other workers' counts too
+            self.counts = merged + self.unflushed
+
+    def top(self, n: int) -> List[int]:
+        with self.lock:
+            return [pid for pid, _ in self.counts.most_common(n)]
+
+
+traffic_stats = TrafficStats()
+
+
+# WARM-UP
+
+def select_hot_problems(top_n: int) -> List[int]:
+    """
+    Problems to preload, in priority order.
+
+    1. WARMUP_PROBLEM_IDS (comma separated) if set
+    2. Top-N by recorded traffic
+    3. Otherwise the first N collections in the store
+    """
+    from rag_layer import retriever
+    configured = os.getenv("WARMUP_PROBLEM_IDS", "").strip()
+    if configured:
+        return [int(pid) for pid in configured.split(",") if pid.strip()][:top_n or None]
+
+    hot = traffic_stats.top(top_n)
+    if len(hot) < top_n:
+        for pid in retriever.list_problem_ids():
+            if pid not in hot:
+                hot.append(pid)
+            if len(hot) >= top_n:
+                break
+    return hot
+
+
+def warm_up(load_problem: Optional[Callable[[int], Optional[dict]]] = None, top_n: int = 10,
+            with_bundles: bool = True, warm_model: bool = True) -> dict:
+    """
+    Preload the model, hot collections, problem rows and context bundles.
+
+    Args:
+        load_problem: Function that fetches (and caches) a problem row
+        top_n: How many problems to preload
+        with_bundles: Also load the precomputed context bundles
+        warm_model: Run one embedding pass to finish the model's lazy init
+
+    Returns:
+        Report dict with per-phase seconds and RSS before/after
+    """
+    from rag_layer import retriever
+    from context_store import context_store
+    report = {"rss_before_mb": round(rss_mb(), 1), "problems": [], "failed": []}
+    started = time.perf_counter()
+
+    # 1. Model - the first encode pays for lazy init (tokenizer, kernels)
+    phase = time.perf_counter()
+    if warm_model:
+        probe_vector = retriever.embeddings.embed_query("warm up")
+    else:
+        probe_vector = None
+    report["model_s"] = round(time.perf_counter() - phase, 3)
+
+    # 2. Collections / snapshots + problem rows
+    phase = time.perf_counter()
+    for problem_id in select_hot_problems(top_n):
+        try:
+            retriever.preload(problem_id, probe_vector)
+            if load_problem is not None:
+                load_problem(problem_id)
+            if with_bundles:
+                context_store.get_chunks(problem_id, "clarification_request")
+            report["problems"].append(problem_id)
+        except Exception as e:
+            print(f"Warm-up error for problem {problem_id}: {e}")
+            report["failed"].append(problem_id)
+    report["problems_s"] = round(time.perf_counter() - phase, 3)
+
+    report["total_s"] = round(time.perf_counter() - started, 3)
+    report["rss_after_mb"] = round(rss_mb(), 1)
+    print(
+        f"🔥 Warm-up: {len(report['problems'])} problems in {report['total_s']}s "
+        f"(model {report['model_s']}s, problems {report['problems_s']}s), "
+        f"RSS {report['rss_before_mb']} -> {report['rss_after_mb']} MB"
+        + (f", failed: {report['failed']}" if report["failed"] else "")
+    )
+    return report
@@ -1,9 +0,0 @@
-import os
-from dotenv import load_dotenv
-load_dotenv()
-from langchain_google_genai import ChatGoogleGenerativeAI
-GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY")
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=GOOGLE_API_KEY
-)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import importlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Provider -> (module, chat class, api key kwarg, api key env var, model kwarg).
+# The module is only imported when a model of that provider is first requested.
+PROVIDERS = {
+    "groq": ("langchain_groq", "ChatGroq", "api_key", "GROQ_API_KEY", "model_name"),
+    "google": ("langchain_google_genai", "ChatGoogleGenerativeAI", "google_api_key", "GOOGLE_API_KEY", "model"),
+    "ollama": ("langchain_ollama", "ChatOllama", None, None, "model"),
+}
+
+# name -> {"provider", "model", **extra kwargs}; MODELS_CONFIG points to another file
+CONFIG_PATH = Path(os.getenv("MODELS_CONFIG", Path(__file__).parent / "models.json"))
+
+_lock = threading.RLock()
+_clients = {}
+_config = None
+_env_loaded = False
+# name -> {"import_s": provider import, "init_s": client construction}
+TIMINGS = {}
+
+
+def load_config() -> dict:
+    global _config
+    if _config is None:
+        with open(CONFIG_PATH, encoding="utf-8") as f:
+            _config = json.load(f)
+    return _config
+
+
+def _load_env():
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_model(name: str = "groq", **overrides):
+    """
+    Chat model by config name, built on first use and cached.
+
+    Args:
+        name: Key in models.json ("groq", "flash", "local", ...)
+        **overrides: Constructor kwargs on top of the config (e.g. temperature);
+            each distinct set of overrides gets its own cached client
+
+    Returns:
+        The chat model client
+    """
+    key = (name, tuple(sorted(overrides.items())))
+    with _lock:
+        if key in _clients:
+            return _clients[key]
+
+        config = load_config()
+        if name not in config:
+            raise KeyError(f"Unknown model {name!r}, configured: {', '.join(config)}")
+        spec = {**config[name], **overrides}
+        provider = spec.pop("provider")
+        module_name, class_name, key_kwarg, key_env, model_kwarg = PROVIDERS[provider]
+
+        _load_env()
+        start = time.perf_counter()
+        chat_class = getattr(importlib.import_module(module_name), class_name)
+        imported = time.perf_counter()
+
+        kwargs = {model_kwarg: spec.pop("model"), **spec}
+        if key_kwarg:
+            kwargs[key_kwarg] = os.getenv(key_env)
+        client = chat_class(**kwargs)
+        done = time.perf_counter()
+
+        TIMINGS[name if not overrides else f"{name}{dict(overrides)}"] = {
+            "import_s": round(imported - start, 3),
+            "init_s": round(done - imported, 3),
+        }
+        _clients[key] = client
+        return client
+
+
+def timing_report() -> dict:
+    """Import/construction time of every model built so far."""
+    with _lock:
+        return {name: dict(t) for name, t in TIMINGS.items()}
+
+
+def print_timing_report():
+    for name, t in timing_report().items():
+        print(f"⏱️ {name}: import {t['import_s']}s, init {t['init_s']}s")
+
+
+if __name__ == "__main__":
+    # python -m Models.registry [names...]: build models and show what each costs at startup
+    import sys
+    for model_name in sys.argv[1:] or list(load_config()):
+        try:
+            get_model(model_name)
+        except ImportError as e:
+            print(f"⚠️ {model_name}: provider not installed ({e})")
+    print_timing_report()
@@ -0,0 +1,300 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from Models.registry import get_model
+
+
+class LatencyTracker:
+    """
+    Rolling latency/error window per provider, shared by every copy of a router
+    (bind_tools() returns a new router that must keep the same history).
+
+    Args:
+        window: Calls kept per provider
+        max_error_rate: Above this a provider is unhealthy...
+        cooldown_s: ...until this long after its last error
+    """
+
+    def __init__(self, window: int = 50, max_error_rate: float = 0.5, cooldown_s: float = 30):
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.cooldown_s = cooldown_s
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.outcomes = {}
+        self.last_error = {}
+        self.counters = {}
+
+    def _init(self, name: str):
+        if name not in self.latencies:
+            self.latencies[name] = deque(maxlen=self.window)
+            self.outcomes[name] = deque(maxlen=self.window)
+            self.counters[name] = {"calls": 0, "errors": 0, "hedges": 0, "hedge_wins": 0, "cancelled": 0}
+
+    def record(self, name: str, latency: float = None, error: bool = False):
+        with self.lock:
+            self._init(name)
+            self.counters[name]["calls"] += 1
+            self.outcomes[name].append(error)
+            if error:
+                self.counters[name]["errors"] += 1
+                self.last_error[name] = time.monotonic()
+            else:
+                self.latencies[name].append(latency)
+
+    def record_cancelled(self, name: str, elapsed: float):
+        """
+        A call cancelled after elapsed seconds. Its real latency is at least
+        that, so it goes into the window as a lower bound: a primary that keeps
+        losing to its hedge slows down on paper too, instead of keeping its old
+        fast p50 and staying ranked first.
+        """
+        with self.lock:
+            self._init(name)
+            self.counters[name]["cancelled"] += 1
+            self.latencies[name].append(elapsed)
+
+    def count(self, name: str, key: str):
+        with self.lock:
+            self._init(name)
+            self.counters[name][key] += 1
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        with self.lock:
+            values = sorted(self.latencies.get(name, ()))
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def error_rate(self, name: str) -> float:
+        with self.lock:
+            outcomes = self.outcomes.get(name)
+            return sum(outcomes) / len(outcomes) if outcomes else 0.0
+
+    def healthy(self, name: str) -> bool:
+        if self.error_rate(name) <= self.max_error_rate:
+            return True
+        return time.monotonic() - self.last_error.get(name, 0) > self.cooldown_s  # give it another try
+
+    def rank(self, names: List[str]) -> List[str]:
+        """Healthy providers by median latency (unmeasured first, to get a sample), then the rest."""
+        def speed(name):
+            p50 = self.percentile(name, 0.5)
+            return -1.0 if p50 is None else p50
+        healthy = sorted((n for n in names if self.healthy(n)), key=speed)
+        return healthy + [n for n in names if n not in healthy]
+
+    def report(self) -> dict:
+        names = list(self.counters)
+        return {
+            name: {
+                **self.counters[name],
+                "p50_s": self.percentile(name, 0.5),
+                "p95_s": self.percentile(name, 0.95),
+                "error_rate": round(self.error_rate(name), 4),
+                "healthy": self.healthy(name),
+            }
+            for name in names
+        }
+
+
+class BackgroundLoop:
+    """
+    Event loop on a daemon thread, started on first use. Sync calls run the
+    async race on it, so the losing call is cancelled instead of left to
+    finish in its thread.
+
+    Args:
+        executor: Default executor of the loop (providers without native async run on it)
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def run(self, coro):
+        """Run a coroutine on the loop and block for its result."""
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                if self.executor is not None:
+                    self.loop.set_default_executor(self.executor)
+                threading.Thread(target=self.loop.run_forever, name="router-loop", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+
+class RoutingChatModel(BaseChatModel):
+    """
+    Sends each call to the fastest healthy provider; if it has not answered
+    by its own p95 latency, fires the same call at the next provider and
+    keeps whichever answers first, cancelling the other. Errors fail over
+    down the ranking.
+
+    Sync calls run the same race on a background event loop. Providers
+    without native async go through hedge_workers threads; cancelling those
+    only drops their answer, the thread runs the call to the end.
+
+    providers: registry names (built lazily via get_model) or chat models,
+    as (name, model) pairs or bare names.
+    """
+
+    providers: List[Any]
+    tracker: Any = None
+    hedge: bool = True
+    min_hedge_delay: float = 0.05   # never hedge sooner than this (s)
+    default_hedge_delay: float = 2.0  # before the primary has a p95
+    hedge_workers: int = 8
+    pool: Any = None
+    loop: Any = None
+
+    def model_post_init(self, __context):
+        self.providers = [(p, None) if isinstance(p, str) else tuple(p) for p in self.providers]
+        if self.tracker is None:
+            self.tracker = LatencyTracker()
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.hedge_workers)
+        if self.loop is None:
+            self.loop = BackgroundLoop(self.pool)
+
+    @property
+    def _llm_type(self) -> str:
+        return "routing"
+
+    def _client(self, name: str):
+        for i, (provider, client) in enumerate(self.providers):
+            if provider == name:
+                if client is None:
+                    client = get_model(name)
+                    self.providers[i] = (name, client)
+                return client
+        raise KeyError(name)
+
+    def _hedge_delay(self, name: str) -> float:
+        p95 = self.tracker.percentile(name, 0.95)
+        return max(self.min_hedge_delay, p95 if p95 is not None else self.default_hedge_delay)
+
+    def bind_tools(self, tools, **kwargs):
+        """Bind the tools on every provider; the routing history is shared."""
+        bound = [(name, self._client(name).bind_tools(tools, **kwargs)) for name, _ in self.providers]
+        return RoutingChatModel(
+            providers=bound, tracker=self.tracker, hedge=self.hedge,
+            hedge_workers=self.hedge_workers, pool=self.pool, loop=self.loop,
+            min_hedge_delay=self.min_hedge_delay, default_hedge_delay=self.default_hedge_delay,
+        )
+
+    # Calls
+
+    async def _acall(self, name: str, messages, stop, **kwargs) -> AIMessage:
+        start = time.perf_counter()
+        try:
+            message = await self._client(name).ainvoke(messages, stop=stop, **kwargs)
+        except asyncio.CancelledError:
+            self.tracker.record_cancelled(name, time.perf_counter() - start)
+            raise
+        except Exception:
+            self.tracker.record(name, error=True)
+            raise
+        self.tracker.record(name, time.perf_counter() - start)
+        return message
+
+    @staticmethod
+    def _result(message: AIMessage) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self.loop.run(self._agenerate(messages, stop=stop, **kwargs))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        ranking = self.tracker.rank([name for name, _ in self.providers])
+        last_error = None
+        while ranking:
+            primary = ranking.pop(0)
+            tasks = {asyncio.ensure_future(self._acall(primary, messages, stop, **kwargs)): primary}
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(primary) if self.hedge and ranking else None)
+            if not done:
+                backup = ranking.pop(0)
+                self.tracker.count(primary, "hedges")
+                tasks[asyncio.ensure_future(self._acall(backup, messages, stop, **kwargs))] = backup
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = tasks[task]
+                        if winner != primary:
+                            self.tracker.count(winner, "hedge_wins")
+                        for loser in pending:
+                            loser.cancel()
+                        return self._result(task.result())
+                    last_error = task.exception()
+        raise last_error or RuntimeError("no providers configured")
+
+
+class FakeLatencyChat(BaseChatModel):
+    """Local fake provider: answers after latency_s (+ jitter), fails with error_rate."""
+
+    name: str = "fake"
+    latency_s: float = 0.1
+    jitter_s: float = 0.0
+    error_rate: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+    def _delay(self) -> float:
+        if random.random() < self.error_rate:
+            raise RuntimeError(f"{self.name} failed")
+        return self.latency_s + random.uniform(0, self.jitter_s)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer from {self.name}"))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer from {self.name}"))])
+
+
+def _demo(calls: int = 40):
+    """Routing + hedging against fake providers with injected latency."""
+    router = RoutingChatModel(providers=[
+        ("groq", FakeLatencyChat(name="groq", latency_s=0.05, jitter_s=0.4)),   # fast but long tail
+        ("flash", FakeLatencyChat(name="flash", latency_s=0.15, jitter_s=0.05)),
+        ("local", FakeLatencyChat(name="local", latency_s=0.3, error_rate=0.3)),
+    ])
+    latencies, winners = [], {}
+    for _ in range(calls):
+        start = time.perf_counter()
+        content = router.invoke("hi").content
+        latencies.append(time.perf_counter() - start)
+        winners[content] = winners.get(content, 0) + 1
+
+    async def run_async():
+        return await asyncio.gather(*(router.ainvoke("hi") for _ in range(calls)))
+    start = time.perf_counter()
+    asyncio.run(run_async())
+    async_wall = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"sync  p50 {latencies[len(latencies) // 2]:.3f}s  p95 {latencies[int(0.95 * len(latencies))]:.3f}s")
+    print(f"async {calls} concurrent calls in {async_wall:.3f}s")
+    print("winners:", winners)
+    for name, stats in router.tracker.report().items():
+        print(name, stats)
+
+
+if __name__ == "__main__":
+    # python -m Models.router
+    _demo()
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from Models.router import FakeLatencyChat, LatencyTracker, RoutingChatModel
+
+
+class ToolFakeChat(FakeLatencyChat):
+    """FakeLatencyChat that accepts bind_tools (returns itself)."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def make_router(*providers, **kwargs) -> RoutingChatModel:
+    kwargs.setdefault("min_hedge_delay", 0.1)
+    kwargs.setdefault("default_hedge_delay", 0.1)
+    return RoutingChatModel(providers=[(p.name, p) for p in providers], **kwargs)
+
+
+def wait_for(condition, timeout: float = 1.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def counters(router: RoutingChatModel, name: str) -> dict:
+    return router.tracker.report().get(name, {})
+
+
+def test_routes_to_the_fastest_healthy_provider():
+    router = make_router(FakeLatencyChat(name="slow", latency_s=0.05), FakeLatencyChat(name="fast", latency_s=0.01),
+                         hedge=False)
+    router.tracker.record("slow", 0.5)
+    router.tracker.record("fast", 0.01)
+
+    assert router.invoke("hi").content == "answer from fast"
+    assert counters(router, "slow")["calls"] == 1  # only the seeded sample
+
+
+def test_unhealthy_provider_is_ranked_last_until_cooldown():
+    tracker = LatencyTracker(max_error_rate=0.5, cooldown_s=60)
+    tracker.record("a", 0.01)
+    tracker.record("b", error=True)
+
+    assert tracker.rank(["b", "a"]) == ["a", "b"]
+
+
+def test_no_hedge_when_the_primary_answers_in_time():
+    router = make_router(FakeLatencyChat(name="primary", latency_s=0.01), FakeLatencyChat(name="backup", latency_s=0.01))
+
+    assert router.invoke("hi").content == "answer from primary"
+    assert counters(router, "primary")["hedges"] == 0
+    assert "backup" not in router.tracker.counters
+
+
+def test_hedge_fires_after_the_delay_and_the_backup_wins():
+    router = make_router(FakeLatencyChat(name="primary", latency_s=1.0), FakeLatencyChat(name="backup", latency_s=0.05))
+
+    start = time.perf_counter()
+    content = router.invoke("hi").content
+    elapsed = time.perf_counter() - start
+
+    assert content == "answer from backup"
+    assert 0.15 <= elapsed < 0.6  # hedge delay + backup latency, not the primary's 1s
+    assert counters(router, "primary")["hedges"] == 1
+    assert counters(router, "backup")["hedge_wins"] == 1
+
+
+def test_hedge_waits_for_the_primary_p95():
+    router = make_router(FakeLatencyChat(name="primary", latency_s=0.2), FakeLatencyChat(name="backup", latency_s=0.01))
+    for _ in range(10):
+        router.tracker.record("primary", 0.4)
+        router.tracker.record("backup", 1.0)
+
+    assert router.invoke("hi").content == "answer from primary"
+    assert counters(router, "primary")["hedges"] == 0
+
+
+def test_fails_over_on_error():
+    router = make_router(FakeLatencyChat(name="broken", latency_s=0.01, error_rate=1.0),
+                         FakeLatencyChat(name="backup", latency_s=0.01))
+
+    assert router.invoke("hi").content == "answer from backup"
+    assert counters(router, "broken")["errors"] == 1
+
+
+def test_raises_the_last_error_when_every_provider_fails():
+    router = make_router(FakeLatencyChat(name="a", latency_s=0.01, error_rate=1.0),
+                         FakeLatencyChat(name="b", latency_s=0.01, error_rate=1.0))
+
+    with pytest.raises(RuntimeError, match="failed"):
+        router.invoke("hi")
+
+
+def test_sync_path_cancels_the_losing_call():
+    router = make_router(FakeLatencyChat(name="primary", latency_s=1.0), FakeLatencyChat(name="backup", latency_s=0.05))
+
+    router.invoke("hi")
+
+    assert wait_for(lambda: counters(router, "primary")["cancelled"] == 1)
+    assert counters(router, "primary")["calls"] == 0  # never recorded as a finished call
+    assert router.tracker.percentile("primary", 0.5) >= 0.1  # but its time so far counts as a lower bound
+
+
+def test_async_path_cancels_the_losing_call():
+    router = make_router(FakeLatencyChat(name="primary", latency_s=1.0), FakeLatencyChat(name="backup", latency_s=0.05))
+
+    async def call():
+        message = await router.ainvoke("hi")
+        await asyncio.sleep(0.05)  # let the cancellation land
+        return message
+
+    assert asyncio.run(call()).content == "answer from backup"
+    assert counters(router, "primary")["cancelled"] == 1
+
+
+def test_degraded_primary_is_demoted():
+    router = make_router(FakeLatencyChat(name="primary", latency_s=1.0), FakeLatencyChat(name="backup", latency_s=0.05))
+    for _ in range(3):
+        router.tracker.record("primary", 0.01)  # fast before it degraded
+        router.tracker.record("backup", 0.05)
+
+    for calls in range(1, 11):
+        assert router.invoke("hi").content == "answer from backup"
+        assert wait_for(lambda: counters(router, "primary")["cancelled"] == calls)
+        if router.tracker.rank(["primary", "backup"])[0] == "backup":
+            break
+
+    assert router.tracker.rank(["primary", "backup"]) == ["backup", "primary"]
+    hedges = counters(router, "primary")["hedges"]
+    router.invoke("hi")
+    assert counters(router, "primary")["hedges"] == hedges  # backup is primary now, no hedge delay
+
+
+def test_bind_tools_keeps_settings_and_shared_state():
+    router = make_router(ToolFakeChat(name="a"), ToolFakeChat(name="b"), hedge_workers=3, min_hedge_delay=0.2)
+
+    bound = router.bind_tools([])
+
+    assert bound.hedge_workers == 3
+    assert bound.min_hedge_delay == 0.2
+    assert bound.tracker is router.tracker
+    assert bound.pool is router.pool
+    assert bound.loop is router.loop
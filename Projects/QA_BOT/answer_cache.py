@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+# TTL rules (seconds, None = never cache)
+# ambiguous questions are time-dependent ("As of today ...") - never cached
+TTL_BY_TYPE = {
+    "valid": 30 * 24 * 3600,
+    "ambiguous": None,
+    "invalid": None,
+}
+# Per-intent overrides, applied after TTL_BY_TYPE
+TTL_BY_INTENT = {
+    "opinion": None,
+}
+
+DEFAULT_DB = Path(__file__).parent / "answer_cache.db"
+
+
+def normalize(question: str) -> str:
+    """Lowercase, drop punctuation, collapse whitespace."""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+def ttl_for(type_: str, intent: str) -> Optional[int]:
+    ttl = TTL_BY_TYPE.get(type_)
+    if intent in TTL_BY_INTENT:
+        ttl = TTL_BY_INTENT[intent] if ttl is not None else None
+    return ttl
+
+
+class AnswerCache:
+    """
+    Persistent answer cache keyed on the rewritten question + intent.
+
+    Summaries are cached separately, keyed on the answer text, so a cached
+    answer (however the question was worded) also skips the summary call.
+
+    The database is opened on first use. The a* methods run the SQLite
+    calls in the default executor, so async pipelines don't block the
+    event loop on disk I/O.
+    """
+
+    def __init__(self, path: Path = DEFAULT_DB):
+        self.path = path
+        self.lock = threading.Lock()
+        self._conn = None
+        self.stats = {"hits": 0, "misses": 0, "skipped": 0, "summary_hits": 0, "summary_misses": 0}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The connection, opened (and the tables created) on first use. Call with self.lock held."""
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, question TEXT, intent TEXT, answer TEXT, expires_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT, expires_at REAL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _count(self, stat: str):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return dict(self.stats)
+
+    @staticmethod
+    async def _in_executor(func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _get(self, table: str, column: str, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute(f"SELECT {column}, expires_at FROM {table} WHERE key = ?", (key,)).fetchone()
+            if row and row[1] < time.time():
+                self.conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+                self.conn.commit()
+                row = None
+        return row[0] if row else None
+
+    # Answers
+
+    def get(self, question: str, intent: str, type_: str) -> Optional[str]:
+        """Cached answer, or None (always None for uncacheable types/intents)."""
+        if ttl_for(type_, intent) is None:
+            self._count("skipped")
+            return None
+        answer = self._get("answers", "answer", self._key(normalize(question), intent))
+        self._count("hits" if answer is not None else "misses")
+        return answer
+
+    async def aget(self, question: str, intent: str, type_: str) -> Optional[str]:
+        return await self._in_executor(self.get, question, intent, type_)
+
+    def put(self, question: str, intent: str, type_: str, answer: str):
+        ttl = ttl_for(type_, intent)
+        if ttl is None or not answer:
+            return
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)",
+                (self._key(normalize(question), intent), question, intent, answer, time.time() + ttl),
+            )
+            self.conn.commit()
+
+    async def aput(self, question: str, intent: str, type_: str, answer: str):
+        await self._in_executor(self.put, question, intent, type_, answer)
+
+    # Summaries
+
+    def get_summary(self, answer: str) -> Optional[str]:
+        summary = self._get("summaries", "summary", self._key(answer))
+        self._count("summary_hits" if summary is not None else "summary_misses")
+        return summary
+
+    async def aget_summary(self, answer: str) -> Optional[str]:
+        return await self._in_executor(self.get_summary, answer)
+
+    def put_summary(self, answer: str, summary: str, ttl: int = TTL_BY_TYPE["valid"]):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)",
+                (self._key(answer), summary, time.time() + ttl),
+            )
+            self.conn.commit()
+
+    async def aput_summary(self, answer: str, summary: str, ttl: int = TTL_BY_TYPE["valid"]):
+        await self._in_executor(self.put_summary, answer, summary, ttl)
+
+
+answer_cache = AnswerCache()
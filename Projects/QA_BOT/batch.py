@@ -0,0 +1,141 @@
+"""
+Concurrent batch mode for QA_BOT.
+
+Reads questions from a JSONL file, runs them through the staged pipeline
+with bounded concurrency and appends one JSONL result per question as soon
+as it finishes. Re-running with the same --output resumes: ids that
+already have a successful result are skipped.
+
+Usage (from the repo root):
+    python -m Projects.QA_BOT.batch questions.jsonl --output answers.jsonl --concurrency 8
+    python -m Projects.QA_BOT.batch requests.jsonl --id-field request_id --question-field title
+
+Each result line:
+    {"id", "question", "answer", ["summary"], "stage_ms": {"triage", "answer", ["summary"]}, "total_ms"}
+or  {"id", "question", "error"}  (retried on the next run)
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableLambda
+from Projects.QA_BOT.pipeline import pipeline, asummarize, INVALID_MESSAGE, OPINION_MESSAGE
+from Projects.QA_BOT.parsing import export_parse_stats
+
+STAGES = ("triage", "answer", "summary")
+
+
+class StageTimer(BaseCallbackHandler):
+    """Wall time of the named pipeline stages (and the whole run) for one question."""
+
+    run_inline = True  # record timestamps on the event loop, not in a thread pool
+
+    def __init__(self):
+        self.started = {}
+        self.stage_ms = {}
+        self.total_ms = None
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        if name in STAGES or parent_run_id is None:
+            self.started[run_id] = (name if name in STAGES else None, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id in self.started:
+            name, start = self.started.pop(run_id)
+            elapsed = round((time.perf_counter() - start) * 1000, 1)
+            if name:
+                self.stage_ms[name] = elapsed
+            else:
+                self.total_ms = elapsed
+
+
+async def _answer_and_summarize(x: dict, config) -> dict:
+    answer = await pipeline.ainvoke({"question": x["question"]}, config=config)
+    result = {"answer": answer}
+    if x["summary"] and answer not in (INVALID_MESSAGE, OPINION_MESSAGE):
+        result["summary"] = await asummarize(x["question"], answer, config=config)
+    return result
+
+batch_chain = RunnableLambda(_answer_and_summarize)
+
+
+def load_done_ids(output_path: str) -> set:
+    """Ids with a successful result in a previous run."""
+    done = set()
+    if os.path.exists(output_path):
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from a crash
+                if "error" not in record:
+                    done.add(str(record["id"]))
+    return done
+
+
+def load_questions(input_path: str, id_field: str, question_field: str) -> list:
+    items = []
+    with open(input_path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            items.append({
+                "id": str(record.get(id_field, line_no)),
+                "question": str(record[question_field]).strip().lower(),
+            })
+    return items
+
+
+async def run_batch(items: list, output_path: str, concurrency: int, with_summary: bool):
+    timers = [StageTimer() for _ in items]
+    inputs = [{"question": item["question"], "summary": with_summary} for item in items]
+    configs = [{"callbacks": [timer], "max_concurrency": concurrency} for timer in timers]
+
+    started = time.perf_counter()
+    ok = failed = 0
+    with open(output_path, "a", encoding="utf-8") as out:
+        async for index, result in batch_chain.abatch_as_completed(inputs, configs, return_exceptions=True):
+            item = items[index]
+            if isinstance(result, Exception):
+                record = {**item, "error": f"{type(result).__name__}: {result}"}
+                failed += 1
+            else:
+                record = {**item, **result, "stage_ms": timers[index].stage_ms, "total_ms": timers[index].total_ms}
+                ok += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if (ok + failed) % 50 == 0:
+                rate = (ok + failed) / (time.perf_counter() - started) * 3600
+                print(f"{ok + failed}/{len(items)} done ({failed} failed, {rate:.0f}/hour)")
+
+    elapsed = time.perf_counter() - started
+    print(f"Finished {ok} ok, {failed} failed in {elapsed:.1f}s ({(ok + failed) / max(elapsed, 1e-9) * 3600:.0f} questions/hour)")
+    export_parse_stats(output_path + ".parse_stats.json")
+    print(f"Parse stats -> {output_path}.parse_stats.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file with one question per line")
+    parser.add_argument("--output", default="answers.jsonl")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--question-field", default="question")
+    parser.add_argument("--summary", action="store_true", help="also run the summary stage")
+    args = parser.parse_args()
+
+    items = load_questions(args.input, args.id_field, args.question_field)
+    done = load_done_ids(args.output)
+    pending = [item for item in items if item["id"] not in done]
+    print(f"{len(items)} questions, {len(items) - len(pending)} already done, {len(pending)} to run")
+    if pending:
+        asyncio.run(run_batch(pending, args.output, args.concurrency, args.summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Latency of the original five-call pipeline vs the staged pipeline.
+
+Legacy: validity -> rewrite -> intent -> answer -> summary (printed result = summary)
+Staged: triage -> streamed answer (summary optional, off the critical path)
+
+Reports LLM calls per question, time to first output and total time.
+
+Usage (from the repo root):
+    python -m Projects.QA_BOT.bench [--questions questions.txt] [--rounds 1]
+"""
+import argparse
+import statistics
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from Projects.QA_BOT.legacy_pipeline import pipeline as legacy_pipeline
+from Projects.QA_BOT.pipeline import pipeline as staged_pipeline
+
+QUESTIONS = [
+    "what is photosynthesis",
+    "difference between tcp and udp",
+    "who is the current prime minister of india",
+    "what is the boiling point of water at sea level",
+    "define entropy",
+    "which is better, python or java",
+    "when did the second world war end",
+    "how many bones are in the human body",
+]
+
+
+class CallCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.calls += 1
+
+
+def run(pipeline, questions, rounds):
+    first, total, calls = [], [], []
+    for _ in range(rounds):
+        for question in questions:
+            counter = CallCounter()
+            start = time.perf_counter()
+            first_at = None
+            for _chunk in pipeline.stream({"question": question}, config={"callbacks": [counter]}):
+                if first_at is None:
+                    first_at = time.perf_counter()
+            end = time.perf_counter()
+            first.append((first_at or end) - start)
+            total.append(end - start)
+            calls.append(counter.calls)
+    return {
+        "calls": statistics.mean(calls),
+        "first_p50": statistics.median(first),
+        "total_p50": statistics.median(total),
+        "total_mean": statistics.mean(total),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", help="text file, one question per line")
+    parser.add_argument("--rounds", type=int, default=1)
+    args = parser.parse_args()
+
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip().lower() for line in f if line.strip()]
+
+    print(f"{len(questions)} questions x {args.rounds} rounds")
+    print(f"{'pipeline':<8} {'calls/q':>8} {'first p50 s':>12} {'total p50 s':>12} {'total mean s':>13}")
+    for name, pipeline in (("legacy", legacy_pipeline), ("staged", staged_pipeline)):
+        r = run(pipeline, questions, args.rounds)
+        print(f"{name:<8} {r['calls']:>8.1f} {r['first_p50']:>12.2f} {r['total_p50']:>12.2f} {r['total_mean']:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import difflib
+import json
+import re
+import threading
+import typing
+from collections import defaultdict
+from typing import Literal, Type
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, ValidationError
+
+# PARSE STATS
+# Per stage: calls, ok (parsed as-is), repaired (fixed locally),
+# failed (gave up after every retry), retries (extra LLM calls)
+_stats_lock = threading.Lock()
+PARSE_STATS = defaultdict(lambda: {"calls": 0, "ok": 0, "repaired": 0, "failed": 0, "retries": 0})
+
+
+def _count(stage: str, key: str):
+    with _stats_lock:
+        PARSE_STATS[stage][key] += 1
+
+
+def parse_stats() -> dict:
+    """Counters plus failure/repair/retry rates per stage."""
+    with _stats_lock:
+        report = {}
+        for stage, s in PARSE_STATS.items():
+            parsed = s["ok"] + s["repaired"] + s["failed"]
+            report[stage] = {
+                **s,
+                "parse_failure_rate": round((s["repaired"] + s["failed"]) / parsed, 4) if parsed else 0.0,
+                "repair_rate": round(s["repaired"] / (s["repaired"] + s["failed"]), 4) if s["repaired"] + s["failed"] else 0.0,
+                "retry_rate": round(s["retries"] / s["calls"], 4) if s["calls"] else 0.0,
+                "saved_calls": s["repaired"],
+            }
+        return report
+
+
+def export_parse_stats(path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(parse_stats(), f, indent=2)
+
+
+# LOCAL REPAIR
+
+def extract_json_object(text: str) -> str:
+    """
+    Pull the first balanced {...} out of model output.
+
+    Handles ```json fences, leading chatter and trailing text after the
+    object. Raises ValueError if there is no object at all.
+    """
+    text = re.sub(r"```(?:json)?", "", text)
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("no JSON object in output")
+
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    # Truncated output: close what is open
+    return text[start:] + ('"' if in_string else "") + "}" * depth
+
+
+def _requote_single_quoted(text: str) -> str:
+    """
+    Turn 'key': 'value' into "key": "value".
+
+    Only single-quoted tokens in key/value positions (after { [ , or : and
+    before : , } or ]) are rewritten; apostrophes inside double-quoted
+    strings and in free text are left alone.
+    """
+    out, i, n = [], 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            end = i + 1
+            while end < n and text[end] != '"':
+                end += 2 if text[end] == "\\" else 1
+            out.append(text[i:end + 1])
+            i = end + 1
+            continue
+        if ch == "'" and text[:i].rstrip()[-1:] in ("{", "[", ",", ":"):
+            end = i + 1
+            while end < n and text[end] != "'":
+                end += 2 if text[end] == "\\" else 1
+            if text[end + 1:].lstrip()[:1] in (":", ",", "}", "]"):
+                out.append(json.dumps(text[i + 1:end].replace("\\'", "'")))
+                i = end + 1
+                continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def loads_lenient(text: str) -> dict:
+    """json.loads with the usual small-model mistakes fixed."""
+    candidate = extract_json_object(text)
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    # Trailing commas, Python literals, single-quoted keys/values
+    fixed = re.sub(r",\s*([}\]])", r"\1", candidate)
+    fixed = re.sub(r"\bTrue\b", "true", fixed)
+    fixed = re.sub(r"\bFalse\b", "false", fixed)
+    fixed = re.sub(r"\bNone\b", "null", fixed)
+    try:
+        return json.loads(fixed)
+    except json.JSONDecodeError:
+        return json.loads(_requote_single_quoted(fixed))
+
+
+def coerce_to_schema(data: dict, model: Type[BaseModel]) -> dict:
+    """
+    Bend parsed JSON toward the schema before validation.
+
+    - unwraps {"properties": {...}} (the model echoing the format instructions)
+    - maps Literal fields to the closest allowed value ("Valid" -> "valid")
+    - stringifies non-string values for str fields
+    """
+    fields = model.model_fields
+    if "properties" in data and isinstance(data["properties"], dict) and not set(fields) & set(data):
+        data = data["properties"]
+
+    coerced = dict(data)
+    for name, field in fields.items():
+        if name not in coerced:
+            continue
+        value = coerced[name]
+        if typing.get_origin(field.annotation) is Literal:
+            allowed = [str(v) for v in typing.get_args(field.annotation)]
+            text = str(value).strip().strip("\"'").lower()
+            lowered = {a.lower(): a for a in allowed}
+            if text in lowered:
+                coerced[name] = lowered[text]
+            else:
+                close = difflib.get_close_matches(text, list(lowered), n=1, cutoff=0.6)
+                if close:
+                    coerced[name] = lowered[close[0]]
+        elif field.annotation is str and not isinstance(value, str) and value is not None:
+            coerced[name] = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    return coerced
+
+
+class RepairingPydanticOutputParser(PydanticOutputParser):
+    """PydanticOutputParser that repairs bad JSON locally before anyone re-asks the LLM."""
+
+    stage: str = "default"
+
+    def parse_result(self, result, *, partial: bool = False):
+        try:
+            parsed = super().parse_result(result, partial=partial)
+            _count(self.stage, "ok")
+            return parsed
+        except OutputParserException:
+            if partial:
+                raise
+        text = result[0].text
+        try:
+            data = coerce_to_schema(loads_lenient(text), self.pydantic_object)
+            parsed = self.pydantic_object.model_validate(data)
+        except (ValueError, ValidationError) as e:
+            # Counted as failed by structured_stage only once no retry fixes it
+            raise OutputParserException(f"Unrepairable output for {self.stage}: {e}", llm_output=text)
+        _count(self.stage, "repaired")
+        return parsed
+
+
+# STRUCTURED STAGES
+
+# Chat model classes that accept response_format={"type": "json_object"}
+JSON_MODE_PROVIDERS = {"ChatGroq", "ChatOpenAI"}
+
+
+def structured_stage(prompt, llm, model: Type[BaseModel], stage: str, max_retries: int = 1):
+    """
+    prompt | llm | parser with: native JSON mode when the provider has it,
+    local repair on parse errors, and only then up to max_retries LLM retries.
+    """
+    parser = RepairingPydanticOutputParser(pydantic_object=model, stage=stage)
+    if type(llm).__name__ in JSON_MODE_PROVIDERS:
+        llm = llm.bind(response_format={"type": "json_object"})
+    chain = prompt | llm | parser
+
+    def run(inputs, config):
+        for attempt in range(max_retries + 1):
+            _count(stage, "retries" if attempt else "calls")
+            try:
+                return chain.invoke(inputs, config)
+            except OutputParserException:
+                if attempt == max_retries:
+                    _count(stage, "failed")
+                    raise
+
+    async def arun(inputs, config):
+        for attempt in range(max_retries + 1):
+            _count(stage, "retries" if attempt else "calls")
+            try:
+                return await chain.ainvoke(inputs, config)
+            except OutputParserException:
+                if attempt == max_retries:
+                    _count(stage, "failed")
+                    raise
+
+    return RunnableLambda(run, afunc=arun, name=stage)
@@ -0,0 +1,177 @@
+from Models.registry import get_model
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
+from pydantic import BaseModel
+from langchain_core.runnables import RunnableLambda, RunnableBranch, RunnableGenerator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal
+from Projects.QA_BOT.answer_cache import answer_cache
+from Projects.QA_BOT.parsing import structured_stage
+
+INVALID_MESSAGE = "this is not valid,it will not be proceeded further"
+OPINION_MESSAGE = "sorry i cant answer to this"
+
+
+# Stage 1: validity + rewrite + intent in ONE structured call
+class triage_output(BaseModel):
+    question: str
+    type: Literal["valid", "ambiguous", "invalid"]
+    intent: Literal["question", "definition", "comparison", "opinion"]
+
+triage_parser = PydanticOutputParser(pydantic_object=triage_output)
+triage_prompt = PromptTemplate(
+    input_variables=["question"],
+    partial_variables={
+        "format_instructions": triage_parser.get_format_instructions()
+    },
+    template="""
+You are an expert on general topics and a query rewriter.
+
+Given the question:
+{question}
+
+1. question: rewrite it to be clear and unambiguous
+   - Preserve the original intent
+   - DO NOT answer the question
+   - DO NOT define or explain concepts
+
+2. type:
+   - valid: factual, time-independent, and semantically correct
+   - ambiguous: factual but time-dependent or missing context
+   - invalid: semantically impossible or uses incorrect roles
+
+3. intent: the PRIMARY intent only, one of question, definition, comparison, opinion
+
+Output rules:
+- Follow the JSON format exactly
+- No extra text
+
+{format_instructions}
+"""
+)
+# Built here, on first use; importing Models.registry alone builds nothing
+llm = get_model("groq")
+
+# JSON mode where supported, local repair on bad output, one retry as last resort
+triage_chain = structured_stage(triage_prompt, llm, triage_output, stage="triage")
+
+
+# Stage 2: answer as plain text, so it can be streamed token by token
+answer_prompt = PromptTemplate(
+    input_variables=["question", "type"],
+    template="""
+Answer this question, which is of type {type}, clearly and concisely.
+
+Question:
+{question}
+"""
+)
+answer_chain = (
+    RunnableLambda(lambda x: {"question": x.question, "type": x.intent})
+    | answer_prompt
+    | llm
+    | StrOutputParser()
+).with_config(run_name="answer")
+
+
+# Stage 3 (optional): summary, run in the background after the answer is shown
+class summary_output(BaseModel):
+    question: str
+    summary: str
+
+summary_parser = PydanticOutputParser(pydantic_object=summary_output)
+summary_prompt = PromptTemplate(
+    input_variables=["question", "answer"],
+    partial_variables={
+        "format_instructions": summary_parser.get_format_instructions()
+    },
+    template="""
+You are a JSON generator.
+
+Summarize the following question and answer.
+
+Question:
+{question}
+
+Answer:
+{answer}
+
+Rules:
+- Output ONLY valid JSON
+- No explanations
+- No extra text
+
+{format_instructions}
+"""
+)
+summary_chain = (
+    structured_stage(summary_prompt, llm, summary_output, stage="summary")
+    | RunnableLambda(lambda x: x.summary)
+).with_config(run_name="summary")
+
+def summarize(question: str, answer: str, config=None) -> str:
+    """Summary text, from the cache when this exact answer was summarized before."""
+    summary = answer_cache.get_summary(answer)
+    if summary is None:
+        summary = summary_chain.invoke({"question": question, "answer": answer}, config=config)
+        answer_cache.put_summary(answer, summary)
+    return summary
+
+async def asummarize(question: str, answer: str, config=None) -> str:
+    summary = await answer_cache.aget_summary(answer)
+    if summary is None:
+        summary = await summary_chain.ainvoke({"question": question, "answer": answer}, config=config)
+        await answer_cache.aput_summary(answer, summary)
+    return summary
+
+_summary_pool = ThreadPoolExecutor(max_workers=4)
+
+def summarize_in_background(question: str, answer: str):
+    """Start the summary call without blocking; returns a Future with the summary text."""
+    return _summary_pool.submit(summarize, question, answer)
+
+
+# Answer cache: only time-independent (valid) questions, see answer_cache.TTL_BY_TYPE
+def _cache_writer(triage: triage_output) -> RunnableGenerator:
+    """Pass the streamed answer through and store it once it is complete."""
+    def store(chunks):
+        answer = ""
+        for chunk in chunks:
+            answer += chunk
+            yield chunk
+        answer_cache.put(triage.question, triage.intent, triage.type, answer)
+
+    async def astore(chunks):
+        answer = ""
+        async for chunk in chunks:
+            answer += chunk
+            yield chunk
+        await answer_cache.aput(triage.question, triage.intent, triage.type, answer)
+
+    return RunnableGenerator(store, astore)
+
+def _cached_or_answer(triage: triage_output):
+    cached = answer_cache.get(triage.question, triage.intent, triage.type)
+    if cached is not None:
+        return cached  # skips the answer (and, via summarize, the summary) call
+    return answer_chain | _cache_writer(triage)  # RunnableLambda invokes it with the triage output
+
+async def _acached_or_answer(triage: triage_output):
+    cached = await answer_cache.aget(triage.question, triage.intent, triage.type)
+    if cached is not None:
+        return cached
+    return answer_chain | _cache_writer(triage)
+
+
+# valid and ambiguous share the same answer sub-chain;
+# ambiguous (time-dependent) questions are pinned to today first
+pipeline = triage_chain | RunnableBranch(
+    (lambda x: x.type == "invalid", RunnableLambda(lambda _: INVALID_MESSAGE)),
+    (lambda x: x.intent == "opinion", RunnableLambda(lambda _: OPINION_MESSAGE)),
+    (
+        lambda x: x.type == "ambiguous",
+        RunnableLambda(lambda x: x.model_copy(update={"question": "As of today, " + x.question}))
+        | answer_chain
+    ),
+    RunnableLambda(_cached_or_answer, afunc=_acached_or_answer),
+)
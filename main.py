@@ -4,7 +4,7 @@ from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableLambda
 from langchain_classic.chains.llm import LLMChain
-from Models.local_llm import llm
+from Models.registry import get_model
 parser = StrOutputParser()
 
 # Prompt 1 → Generate baby name
@@ -21,6 +21,7 @@ job_prompt = PromptTemplate.from_template(
 extract_name = RunnableLambda(lambda x: {"name": x})
 
 # Build the chain
+llm = get_model("local")
 chain = (
     name_prompt
     | llm
@@ -1,4 +1,6 @@
 from langchain_tavily import TavilySearch
+from tools_client.cache import cached
 
 
-tavily_tool=TavilySearch(max_result=5,search_depth="basic")
+# Responses are cached on disk, see tools_client/cache.py (TOOL_CACHE_MODE=replay for offline runs)
+tavily_tool=cached(TavilySearch(max_result=5,search_depth="basic"))
@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+from langchain_core.tools import BaseTool
+
+load_dotenv()
+
+# TTL per tool name (seconds, None = never expires)
+TTL_BY_TOOL = {
+    "wikipedia": 7 * 24 * 3600,   # encyclopedia pages change slowly
+    "tavily_search": 24 * 3600,   # web/news results go stale quickly
+}
+DEFAULT_TTL = 3600
+
+# TOOL_CACHE_MODE:
+#   cache  - serve fresh entries, call the API on a miss and store the result (default)
+#   record - always call the API and store the result
+#   replay - never call the API; a miss raises ToolCacheMiss (offline tests/benchmarks)
+#   off    - no caching at all
+MODES = ("cache", "record", "replay", "off")
+DEFAULT_DB = Path(os.getenv("TOOL_CACHE_PATH", Path(__file__).parent / "tool_cache.db"))
+
+
+class ToolCacheMiss(Exception):
+    """Replay mode and the call was never recorded."""
+
+
+# Returned by ToolCallStore.get when there is no usable entry (a stored response may be None)
+MISSING = object()
+
+
+def _canonical(kwargs: dict) -> str:
+    def clean(value):
+        return " ".join(value.split()) if isinstance(value, str) else value
+    return json.dumps({k: clean(v) for k, v in kwargs.items()}, sort_keys=True, default=str)
+
+
+class ToolCallStore:
+    """SQLite store of tool responses keyed on tool name + canonical arguments."""
+
+    def __init__(self, path: Path = DEFAULT_DB):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_calls (key TEXT PRIMARY KEY, tool TEXT, args TEXT, response TEXT, created_at REAL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def key(tool: str, args: str) -> str:
+        return hashlib.sha256(f"{tool}\x1f{args}".encode("utf-8")).hexdigest()
+
+    def get(self, tool: str, args: str, ttl: Optional[float]) -> Any:
+        """Stored response, or MISSING if there is none or it is older than ttl (ttl None = any age)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM tool_calls WHERE key = ?", (self.key(tool, args),)
+            ).fetchone()
+        if row is None or (ttl is not None and row[1] + ttl < time.time()):
+            return MISSING
+        return json.loads(row[0])
+
+    def put(self, tool: str, args: str, response: Any):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tool_calls VALUES (?, ?, ?, ?, ?)",
+                (self.key(tool, args), tool, args, json.dumps(response, default=str), time.time()),
+            )
+            self.conn.commit()
+
+
+class CachedTool(BaseTool):
+    """
+    Wraps a tool (WikipediaQueryRun, TavilySearch, ...) with the on-disk cache.
+
+    Same name, description and args schema as the wrapped tool, so agents
+    see no difference. Concurrent identical calls share one API request.
+    The async path runs the SQLite reads and writes in the default executor.
+    """
+
+    inner: BaseTool
+    ttl: Optional[float] = DEFAULT_TTL
+    mode: str = "cache"
+    store: Any = None
+
+    def _lookup(self, args: str):
+        """The cached response, or MISSING when the API has to be called."""
+        if self.mode in ("cache", "replay"):
+            # Recorded responses never expire in replay mode
+            response = self.store.get(self.name, args, None if self.mode == "replay" else self.ttl)
+            if response is not MISSING:
+                _count(self.name, "hits")
+                return response
+            if self.mode == "replay":
+                _count(self.name, "replay_misses")
+                raise ToolCacheMiss(f"{self.name} was never recorded for {args}")
+        return MISSING
+
+    def _claim(self, args: str):
+        """(future, leader): the leader makes the call, everyone else waits on its future."""
+        key = (self.name, args)
+        with _inflight_lock:
+            future = _inflight.get(key)
+            if future is not None:
+                _count(self.name, "coalesced")
+                return future, False
+            future = _inflight[key] = Future()
+            return future, True
+
+    def _finish(self, args: str, future: Future, response=None, error: Exception = None):
+        # Store before releasing the slot so a late caller finds the entry
+        if error is None:
+            self.store.put(self.name, args, response)
+        with _inflight_lock:
+            _inflight.pop((self.name, args), None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(response)
+
+    def _run(self, **kwargs):
+        if self.mode == "off":
+            return self.inner.invoke(kwargs)
+        args = _canonical(kwargs)
+        cached = self._lookup(args)
+        if cached is not MISSING:
+            return cached
+
+        future, leader = self._claim(args)
+        if not leader:
+            return future.result()
+        _count(self.name, "misses")
+        try:
+            response = self.inner.invoke(kwargs)
+        except Exception as e:
+            self._finish(args, future, error=e)
+            raise
+        self._finish(args, future, response)
+        return response
+
+    async def _arun(self, **kwargs):
+        if self.mode == "off":
+            return await self.inner.ainvoke(kwargs)
+        args = _canonical(kwargs)
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, self._lookup, args)
+        if cached is not MISSING:
+            return cached
+
+        future, leader = self._claim(args)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        _count(self.name, "misses")
+        try:
+            response = await self.inner.ainvoke(kwargs)
+        except Exception as e:
+            self._finish(args, future, error=e)
+            raise
+        await loop.run_in_executor(None, self._finish, args, future, response)
+        return response
+
+
+# Shared by every CachedTool in the process
+_inflight = {}
+_inflight_lock = threading.Lock()
+_stats_lock = threading.Lock()
+TOOL_CACHE_STATS = {}
+_store = None
+
+
+def _count(tool: str, key: str):
+    with _stats_lock:
+        stats = TOOL_CACHE_STATS.setdefault(tool, {"hits": 0, "misses": 0, "coalesced": 0, "replay_misses": 0})
+        stats[key] += 1
+
+
+def tool_cache_stats() -> dict:
+    with _stats_lock:
+        return {tool: dict(stats) for tool, stats in TOOL_CACHE_STATS.items()}
+
+
+def cached(tool: BaseTool, ttl: Optional[float] = ..., mode: Optional[str] = None) -> BaseTool:
+    """
+    Wrap a tool with the disk cache.
+
+    Args:
+        tool: The tool to wrap
+        ttl: Seconds a response stays fresh; defaults to TTL_BY_TOOL / DEFAULT_TTL
+        mode: One of MODES; defaults to the TOOL_CACHE_MODE env var, else "cache"
+    """
+    global _store
+    mode = mode or os.getenv("TOOL_CACHE_MODE", "cache")
+    if mode not in MODES:
+        raise ValueError(f"TOOL_CACHE_MODE must be one of {MODES}, got {mode!r}")
+    if _store is None:
+        _store = ToolCallStore()
+    return CachedTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        inner=tool,
+        ttl=TTL_BY_TOOL.get(tool.name, DEFAULT_TTL) if ttl is ... else ttl,
+        mode=mode,
+        store=_store,
+    )
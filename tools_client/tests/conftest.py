@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Repo root, so tools_client imports resolve when pytest runs from anywhere
+sys.path.insert(0, str(Path(__file__).parents[2]))
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.tools import tool
+
+from tools_client import cache as cache_module
+from tools_client.cache import ToolCacheMiss, ToolCallStore, cached
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    store = ToolCallStore(tmp_path / "tool_cache.db")
+    monkeypatch.setattr(cache_module, "_store", store)
+    return store
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def api(calls):
+    """A fake search tool that logs its (would-be paid) API calls."""
+
+    @tool
+    def search(query: str):
+        """Search for query."""
+        calls.append(query)
+        return None if query == "nothing" else f"results for {query}"
+
+    return search
+
+
+def test_replay_serves_recorded_calls_without_the_api(api, calls, monkeypatch):
+    monkeypatch.setenv("TOOL_CACHE_MODE", "record")
+    recorded = cached(api).invoke({"query": "binary search"})
+
+    monkeypatch.setenv("TOOL_CACHE_MODE", "replay")
+    replayed = cached(api).invoke({"query": "  binary   search "})  # same canonical arguments
+
+    assert replayed == recorded == "results for binary search"
+    assert calls == ["binary search"]
+
+
+def test_replay_raises_on_an_unrecorded_call(api, calls, monkeypatch):
+    monkeypatch.setenv("TOOL_CACHE_MODE", "replay")
+
+    with pytest.raises(ToolCacheMiss):
+        cached(api).invoke({"query": "never asked"})
+    assert calls == []
+
+
+def test_a_recorded_none_is_replayed_not_a_miss(api, calls, monkeypatch):
+    monkeypatch.setenv("TOOL_CACHE_MODE", "record")
+    cached(api).invoke({"query": "nothing"})
+
+    monkeypatch.setenv("TOOL_CACHE_MODE", "replay")
+
+    assert cached(api).invoke({"query": "nothing"}) is None
+    assert calls == ["nothing"]
+
+
+def test_async_record_then_replay(api, calls, monkeypatch):
+    monkeypatch.setenv("TOOL_CACHE_MODE", "record")
+    recorded = asyncio.run(cached(api).ainvoke({"query": "dijkstra"}))
+
+    monkeypatch.setenv("TOOL_CACHE_MODE", "replay")
+    replayed = asyncio.run(cached(api).ainvoke({"query": "dijkstra"}))
+
+    assert replayed == recorded
+    assert calls == ["dijkstra"]
+
+
+def test_expired_entries_are_fetched_again(api, calls, monkeypatch):
+    monkeypatch.setenv("TOOL_CACHE_MODE", "cache")
+    cached(api, ttl=0).invoke({"query": "heap"})
+    cached(api, ttl=0).invoke({"query": "heap"})
+
+    assert calls == ["heap", "heap"]